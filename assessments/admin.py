@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.templatetags.static import static
 from .models import (
     Parent, Patient, AssessmentScenario, Assessment,
-    Question, ResponseData, RecordingStep, PatientFile
+    Question, ResponseData, RecordingStep, PatientFile, UploadSession, MediaBlob, FrameStore, InferenceResult, AnalysisJob
 )
 
 @admin.register(Parent)
@@ -57,6 +57,36 @@ class RecordingStepAdmin(admin.ModelAdmin):
 
 @admin.register(PatientFile)
 class PatientFileAdmin(admin.ModelAdmin):
-    list_display = ('id', 'assessment_id', 'step_id', 'file_type', 'model_name', 'created_at')
+    list_display = ('id', 'assessment_id', 'step_id', 'file_type', 'media_status', 'duration', 'model_name', 'created_at')
     search_fields = ('file_path', 'model_name')
-    list_filter = ('file_type', 'created_at')
\ No newline at end of file
+    list_filter = ('file_type', 'media_status', 'created_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'assessment_id', 'step_id', 'file_name', 'total_size', 'committed_offset', 'status', 'created_at')
+    search_fields = ('file_name',)
+    list_filter = ('status', 'created_at')
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sha256', 'file_path', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'file_path')
+    list_filter = ('created_at',)
+
+@admin.register(FrameStore)
+class FrameStoreAdmin(admin.ModelAdmin):
+    list_display = ('id', 'patient_file_id', 'step_id', 'sample_fps', 'width', 'height', 'frame_count', 'status', 'updated_at')
+    search_fields = ('file_path',)
+    list_filter = ('status', 'created_at')
+
+@admin.register(InferenceResult)
+class InferenceResultAdmin(admin.ModelAdmin):
+    list_display = ('id', 'content_hash', 'model_name', 'model_version', 'model_response', 'last_used_at')
+    search_fields = ('content_hash', 'model_name')
+    list_filter = ('model_name', 'model_version')
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'assessment_id', 'status', 'cache_hit', 'used_fallback', 'prompt_tokens', 'created_at', 'started_at', 'finished_at')
+    search_fields = ('id',)
+    list_filter = ('status', 'created_at')
\ No newline at end of file
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AssessmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assessments'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if getattr(settings, 'LLM_CLIENT_WARMUP', False):
+            from .services.llm_client import warm_up_llm_client
+            warm_up_llm_client()
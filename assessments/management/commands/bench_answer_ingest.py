@@ -0,0 +1,94 @@
+# assessments/management/commands/bench_answer_ingest.py
+
+import datetime
+import json
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from assessments.models import Assessment, AssessmentScenario, Question, ResponseData
+from assessments.services.response_service import ingest_answers
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_ingest(answers):
+    """What ResponseDataCreateView did before: two lookups and one INSERT per answer."""
+    created_ids = []
+    for answer in answers:
+        question = Question.objects.get(pk=answer['question_id'])
+        assessment = Assessment.objects.get(pk=answer['assessment_id'])
+        created_ids.append(ResponseData.objects.create(question_id=question, assessment_id=assessment, response_text=answer['response_text']).id)
+    return created_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the per-answer insert loop with bulk answer ingestion for submissions of several sizes. '
+        'Runs inside a transaction that is rolled back, so nothing is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                answers_by_size = self.create_fixtures(max(options['sizes']))
+                for size in options['sizes']:
+                    answers = answers_by_size[:size]
+                    bulk = lambda items: ingest_answers(items)[0]
+                    results[size] = {
+                        'legacy': self.measure(legacy_ingest, answers, options['repeat']),
+                        'bulk': self.measure(bulk, answers, options['repeat']),
+                        # A retried submission: every answer already exists and is updated in place
+                        'bulk_resubmit': self.measure(bulk, answers, options['repeat'], prefill=bulk),
+                    }
+                    results[size]['speedup'] = results[size]['legacy']['p50_ms'] / results[size]['bulk']['p50_ms']
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def create_fixtures(self, count):
+        user = User.objects.create_user(email=f'bench-{uuid.uuid4().hex}@example.com', username='bench')
+        scenario = AssessmentScenario.objects.create(name='bench', description='', img_path='', level='Easy', model_name='')
+        assessment = Assessment.objects.create(as_id=scenario, patient_id=user, assessment_date=datetime.date.today(), result_summary='')
+        questions = Question.objects.bulk_create(
+            [Question(as_id=scenario, question_text=f'Question {i}?', question_order=str(i)) for i in range(count)]
+        )
+        if questions and questions[0].pk is None:
+            questions = list(Question.objects.filter(as_id=scenario).order_by('id'))
+        return [
+            {'question_id': question.pk, 'assessment_id': assessment.pk, 'response_text': f'Answer {i}'}
+            for i, question in enumerate(questions)
+        ]
+
+    def measure(self, ingest, answers, repeat, prefill=None):
+        timings = []
+        for _ in range(repeat):
+            # Every run starts from the same rows (at most one answer per question is allowed)
+            with transaction.atomic():
+                if prefill is not None:
+                    prefill(answers)
+                connection.queries_log.clear()  # The log keeps 9000 entries; a full log breaks the count
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    ingest(answers)
+                    timings.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+        timings = np.array(timings)
+        return {
+            'queries': len(queries.captured_queries),
+            'p50_ms': float(np.percentile(timings, 50)),
+            'max_ms': float(timings.max()),
+        }
@@ -0,0 +1,72 @@
+# assessments/management/commands/bench_llm_client.py
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from assessments.services.llm_client import DEFAULT_MODEL_NAME, GeminiClientManager
+from assessments.services.llm_stub_server import start_stub_server
+
+BENCH_PROMPT = "Summarize these answers: " + json.dumps({f"Question {i}?": f"Answer {i}" for i in range(55)})
+
+
+class Command(BaseCommand):
+    help = 'Compares per-call genai.configure() with the shared LLM client against a local stub server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=1)
+
+    def handle(self, *args, **options):
+        import google.generativeai as genai
+
+        server = start_stub_server()
+        client_options = {'api_endpoint': server.endpoint}
+        try:
+            def legacy_call():
+                # What gemini_service did before: reconfigure and build a model for every analysis
+                genai.configure(api_key='bench', transport='rest', client_options=client_options)
+                return genai.GenerativeModel(DEFAULT_MODEL_NAME).generate_content(BENCH_PROMPT).text
+
+            manager = GeminiClientManager(api_key='bench', transport='rest', api_endpoint=server.endpoint, timeout=10)
+            started = time.perf_counter()
+            manager.warm_up()
+            warm_up_ms = (time.perf_counter() - started) * 1000
+
+            results = {
+                'per_call_configure': self.run(server, legacy_call, options),
+                'shared_client': self.run(server, lambda: manager.generate_text(BENCH_PROMPT), options),
+            }
+        finally:
+            server.shutdown()
+
+        results['warm_up_ms'] = warm_up_ms
+        results['overhead_removed_ms_per_request'] = (
+            results['per_call_configure']['mean_ms'] - results['shared_client']['mean_ms']
+        )
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, server, call, options):
+        call()  # Exclude first-use setup from both sides
+        server.stats.reset()
+
+        def timed(_):
+            started = time.perf_counter()
+            call()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            latencies = np.array(list(pool.map(timed, range(options['requests']))))
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': options['requests'],
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'throughput_per_s': options['requests'] / elapsed,
+            'connections_opened': server.stats.snapshot()['connections'],
+        }
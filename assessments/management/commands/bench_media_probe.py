@@ -0,0 +1,64 @@
+# assessments/management/commands/bench_media_probe.py
+
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.media_probe import ContainerParseError, probe_container, probe_with_opencv
+
+SAMPLE_FORMATS = [('sample.mp4', 'mp4v'), ('sample.webm', 'VP80'), ('sample.mkv', 'MJPG')]
+
+
+def write_sample_videos(directory, seconds, fps=30, width=640, height=480):
+    """Encodes a few synthetic clips so the benchmark can run without real recordings."""
+    import cv2
+    import numpy as np
+
+    paths = []
+    frame = np.zeros((height, width, 3), np.uint8)
+    for file_name, fourcc in SAMPLE_FORMATS:
+        path = os.path.join(directory, file_name)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+        for i in range(int(seconds * fps)):
+            frame[:] = i % 255
+            writer.write(frame)
+        writer.release()
+        if os.path.exists(path) and os.path.getsize(path):
+            paths.append(path)
+    return paths
+
+
+def time_probe(probe, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = probe(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Compares header-only container probing against the OpenCV probe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Video files to probe. Synthetic samples are generated when omitted.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seconds', type=int, default=60, help='Length of generated sample clips.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = options['paths'] or write_sample_videos(workdir, options['seconds'])
+            for path in paths:
+                self.stdout.write(f'{os.path.basename(path)} ({os.path.getsize(path) / 1024:.0f} KB)')
+                cv2_ms, cv2_result = time_probe(probe_with_opencv, path, options['repeat'])
+                try:
+                    header_ms, header_result = time_probe(probe_container, path, options['repeat'])
+                except ContainerParseError as e:
+                    self.stdout.write(f'  header probe: unsupported ({e}); opencv {cv2_ms:.3f} ms')
+                    continue
+                self.stdout.write(f'  header probe: {header_ms:.3f} ms  {header_result}')
+                self.stdout.write(f'  opencv probe: {cv2_ms:.3f} ms  {cv2_result}')
+                self.stdout.write(f'  speedup: {cv2_ms / header_ms:.0f}x')
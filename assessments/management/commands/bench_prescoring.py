@@ -0,0 +1,105 @@
+# assessments/management/commands/bench_prescoring.py
+
+import json
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from assessments.services.prescoring_service import ANSWER_WIDTH, PreScorer, normalize_answer
+from assessments.services.question_bank import QUESTION_BANK
+
+
+def perturb(answer, rng, other_answers):
+    """A plausible user answer: exact, re-cased, with a typo, a wrong answer or blank."""
+    roll = rng.random()
+    if roll < 0.4:
+        return answer
+    if roll < 0.6:
+        return f"  {answer.upper()}!"
+    if roll < 0.8 and len(answer) > 2:
+        position = rng.randrange(len(answer) - 1)
+        return answer[:position] + answer[position + 1] + answer[position] + answer[position + 2:]  # Swapped letters
+    if roll < 0.95:
+        return rng.choice(other_answers)
+    return ''
+
+
+def python_similarity(scorer, texts):
+    """Reference loop: the same trigram Dice similarity with Python sets, one answer at a time."""
+    accepted = {}
+    for questions in QUESTION_BANK.values():
+        for question, answers in questions.items():
+            accepted[question] = [trigram_set(normalize_answer(answer)) for answer in answers]
+    result = np.zeros((len(texts), len(scorer.questions)), dtype=np.float32)
+    for row, answers in enumerate(texts):
+        for column, question in enumerate(scorer.questions):
+            grams = trigram_set(answers[column])
+            best = 0.0
+            for expected in accepted[question]:
+                total = len(grams) + len(expected)
+                if total:
+                    best = max(best, 2.0 * len(grams & expected) / total)
+            result[row, column] = best
+    return result
+
+
+def trigram_set(text):
+    padded = f' {text[:ANSWER_WIDTH]} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Command(BaseCommand):
+    help = 'Scores synthetic answer sets with the NumPy pre-scorer and compares it with a pure Python loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sets', type=int, default=10000)
+        parser.add_argument('--reference-sets', type=int, default=500, help='Answer sets also scored by the Python loop.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        canonical = {question: answers[0] for questions in QUESTION_BANK.values() for question, answers in questions.items()}
+        other_answers = list(canonical.values())
+        answer_sets = [
+            {question: perturb(answer, rng, other_answers) for question, answer in canonical.items()}
+            for _ in range(options['sets'])
+        ]
+
+        scorer = PreScorer()
+        scorer.score_many(answer_sets[:10])  # Warm up
+
+        started = time.perf_counter()
+        texts = scorer.answer_texts(answer_sets)
+        normalized = time.perf_counter()
+        similarity = scorer.similarity(texts)
+        scored = time.perf_counter()
+        scorer.domain_scores(similarity)
+        finished = time.perf_counter()
+
+        reference_sets = min(options['reference_sets'], len(texts))
+        reference_started = time.perf_counter()
+        reference = python_similarity(scorer, texts[:reference_sets])
+        reference_seconds = time.perf_counter() - reference_started
+
+        sets = len(answer_sets)
+        numpy_score_seconds = finished - normalized
+        results = {
+            'sets': sets,
+            'questions': len(scorer.questions),
+            'domains': len(scorer.domains),
+            'normalize_seconds': normalized - started,
+            'similarity_seconds': scored - normalized,
+            'domain_scores_seconds': finished - scored,
+            'total_seconds': finished - started,
+            'us_per_set_total': (finished - started) / sets * 1e6,
+            'us_per_set_scoring': numpy_score_seconds / sets * 1e6,
+            'python_loop_us_per_set': reference_seconds / reference_sets * 1e6 if reference_sets else None,
+            'scoring_speedup_vs_python': (
+                (reference_seconds / reference_sets) / (numpy_score_seconds / sets) if reference_sets else None
+            ),
+            'max_abs_difference_vs_python': float(np.abs(reference - similarity[:reference_sets]).max()) if reference_sets else None,
+            'mean_similarity': float(similarity.mean()),
+        }
+        self.stdout.write(json.dumps(results, indent=2))
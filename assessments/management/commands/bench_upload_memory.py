@@ -0,0 +1,85 @@
+# assessments/management/commands/bench_upload_memory.py
+
+import os
+import resource
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http.multipartparser import MultiPartParser
+
+from assessments.services.upload_service import MaxSizeUploadHandler, save_patient_media
+
+BOUNDARY = 'benchboundary7MA4YWxkTrZu0gW'
+CHUNK = 1024 * 1024
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_multipart_body(path, size):
+    """Writes a multipart body holding one `size`-byte video part, without building it in memory."""
+    head = (
+        f'--{BOUNDARY}\r\n'
+        'Content-Disposition: form-data; name="file"; filename="session.mp4"\r\n'
+        'Content-Type: video/mp4\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{BOUNDARY}--\r\n'.encode()
+    block = os.urandom(CHUNK)
+    with open(path, 'wb') as body:
+        body.write(head)
+        remaining = size
+        while remaining > 0:
+            body.write(block[:min(CHUNK, remaining)])
+            remaining -= CHUNK
+        body.write(tail)
+    return os.path.getsize(path)
+
+
+class Command(BaseCommand):
+    help = 'Measures peak RSS while streaming growing uploads through the patient file upload path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[16, 64, 256], help='Upload sizes in MB (run in increasing order).')
+        parser.add_argument('--budget-mb', type=float, default=64, help='Allowed peak RSS growth over the baseline.')
+        parser.add_argument('--legacy', action='store_true', help='Use the old read-everything path for comparison.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as workdir:
+            storage = FileSystemStorage(location=os.path.join(workdir, 'media'))
+            baseline = peak_rss_mb()
+            self.stdout.write(f'baseline peak RSS: {baseline:.1f} MB')
+
+            growth = 0
+            for size_mb in sorted(options['sizes']):
+                body_path = os.path.join(workdir, 'body.bin')
+                content_length = write_multipart_body(body_path, size_mb * CHUNK)
+                meta = {
+                    'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+                    'CONTENT_LENGTH': str(content_length),
+                }
+                handlers = [
+                    MaxSizeUploadHandler(max_size=content_length + 1),
+                    MemoryFileUploadHandler(),
+                    TemporaryFileUploadHandler(),
+                ]
+                with open(body_path, 'rb') as stream:
+                    _, files = MultiPartParser(meta, stream, handlers).parse()
+                upload = files['file']
+                if options['legacy']:
+                    storage.save(upload.name, ContentFile(upload.read()))
+                else:
+                    save_patient_media(upload, storage=storage)
+                upload.close()
+                os.remove(body_path)
+
+                growth = peak_rss_mb() - baseline
+                self.stdout.write(f'{size_mb:>6} MB upload -> peak RSS {baseline + growth:.1f} MB (+{growth:.1f} MB)')
+
+            if growth > options['budget_mb']:
+                raise CommandError(f'Peak RSS grew by {growth:.1f} MB, over the {options["budget_mb"]} MB budget.')
+            self.stdout.write(self.style.SUCCESS(f'Peak RSS growth {growth:.1f} MB is within the {options["budget_mb"]} MB budget.'))
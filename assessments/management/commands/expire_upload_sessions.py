@@ -0,0 +1,19 @@
+# assessments/management/commands/expire_upload_sessions.py
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.upload_service import expire_upload_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes resumable upload sessions that have had no chunk written for longer than '
+        'PATIENT_FILE_UPLOAD_SESSION_TTL_SECONDS, and their preallocated part files. Run it from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, default=None, help='Idle seconds before a session expires (defaults to the setting).')
+
+    def handle(self, *args, **options):
+        sessions, part_files = expire_upload_sessions(options['ttl'])
+        self.stdout.write(f'Expired {sessions} upload session(s) and deleted {part_files} part file(s).')
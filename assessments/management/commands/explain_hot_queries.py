@@ -0,0 +1,222 @@
+# assessments/management/commands/explain_hot_queries.py
+
+import datetime
+import json
+import re
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import User
+from assessments.models import Assessment, AssessmentScenario, PatientFile, Question, RecordingStep, ResponseData
+
+QUESTIONS_PER_ASSESSMENT = 50
+STEPS_PER_ASSESSMENT = 50
+INSERT_BATCH_SIZE = 10000
+REPORT_BATCH_ASSESSMENTS = 50  # Assessments in the sampled report batch prefetch
+
+
+class Rollback(Exception):
+    pass
+
+
+def hot_queries(assessment_id, assessment_ids, question_id, step_id):
+    """
+    (name, queryset, leading columns an index must start with, whether the rows must come out
+    of the index already ordered) for the lookups the API and report building run all the time.
+    """
+    return [
+        # ResponseDataViewSet, list of one assessment's answers
+        ('responses_for_assessment', ResponseData.objects.filter(assessment_id=assessment_id).order_by('created_at', 'id'),
+         ['assessment_id_id', 'created_at'], True),
+        # ResponseDataViewSet with ?question_id=, and the answer upsert
+        ('response_for_question', ResponseData.objects.filter(assessment_id=assessment_id, question_id=question_id),
+         ['assessment_id_id', 'question_id_id'], False),
+        # report_batch_service prefetch; the question order sort happens after the join
+        ('report_answers', ResponseData.objects.filter(assessment_id__in=assessment_ids).select_related('question_id')
+         .order_by('question_id__question_order', 'id'), ['assessment_id_id'], False),
+        ('files_for_step', PatientFile.objects.filter(assessment_id=assessment_id, step_id=step_id),
+         ['assessment_id_id', 'step_id_id'], False),
+    ]
+
+
+def explain(queryset):
+    """
+    Plan of the table the queryset reads from as {'indexes', 'full_scan', 'sort', 'plan'}, from
+    EXPLAIN QUERY PLAN on SQLite, EXPLAIN on MySQL/MariaDB and EXPLAIN on PostgreSQL.
+    """
+    table = queryset.model._meta.db_table
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    plan = {'indexes': set(), 'full_scan': False, 'sort': False, 'plan': []}
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                plan['plan'].append(detail)
+                match = re.match(rf'(SEARCH|SCAN) {table}\b(?: USING (?:COVERING )?INDEX (\w+))?', detail)
+                if match:
+                    if match.group(2):
+                        plan['indexes'].add(match.group(2))
+                    elif match.group(1) == 'SCAN':
+                        plan['full_scan'] = True
+                # Only the driving table's order matters; the report query sorts on the joined question
+                plan['sort'] |= detail.startswith('USE TEMP B-TREE FOR ORDER BY')
+        elif connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0].lower() for column in cursor.description]
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                plan['plan'].append({key: row[key] for key in ('table', 'type', 'key', 'rows', 'extra')})
+                if row['table'] == table:
+                    if row['key']:
+                        plan['indexes'].add(row['key'])
+                    plan['full_scan'] |= row['type'] == 'ALL'
+                plan['sort'] |= 'Using filesort' in (row['extra'] or '')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            for (line,) in cursor.fetchall():
+                plan['plan'].append(line)
+                node = line.strip().lstrip('->').strip()
+                match = re.match(rf'(?:Index Scan|Index Only Scan) using (\w+) on {table}\b|Bitmap Index Scan on (\w+)', node)
+                if match:
+                    plan['indexes'].add(match.group(1) or match.group(2))
+                plan['full_scan'] |= node.startswith(f'Seq Scan on {table}')
+                plan['sort'] |= node.startswith('Sort ')
+        else:
+            raise CommandError(f"No plan reader for the {connection.vendor} backend.")
+    return plan
+
+
+def matching_indexes(table, columns):
+    """Names of the table's indexes (and unique constraints) whose leading columns are `columns`."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        names = {
+            name for name, constraint in constraints.items()
+            if (constraint['index'] or constraint['unique']) and not constraint['primary_key']
+            and constraint['columns'][:len(columns)] == columns
+        }
+        if connection.vendor == 'sqlite':
+            # Unique constraints declared in CREATE TABLE are backed by sqlite_autoindex_* indexes,
+            # which introspection reports under the constraint name but query plans don't
+            cursor.execute(f'PRAGMA index_list({connection.ops.quote_name(table)})')
+            for index_name in [row[1] for row in cursor.fetchall() if row[1].startswith('sqlite_autoindex_')]:
+                cursor.execute(f'PRAGMA index_info({connection.ops.quote_name(index_name)})')
+                if [row[2] for row in sorted(cursor.fetchall())][:len(columns)] == columns:
+                    names.add(index_name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN for the hot ResponseData and PatientFile lookups and checks that each one reads through '
+        'an index starting with its filter columns. Seeds --rows answers and files first (inside a transaction '
+        'that is rolled back); --rows 0 checks the plans against the data already in the database. '
+        'Exits with an error when a query falls back to a full scan or a sort the index should have avoided.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Rows to seed in each of ResponseData and PatientFile.')
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                if options['rows']:
+                    sample = self.seed(options['rows'])
+                else:
+                    sample = self.existing_sample()
+                for name, queryset, columns, ordered in hot_queries(*sample):
+                    plan = explain(queryset)
+                    expected = matching_indexes(queryset.model._meta.db_table, columns)
+                    started = time.perf_counter()
+                    count = len(list(queryset))
+                    results[name] = {
+                        'ok': bool(plan['indexes'] & expected) and not plan['full_scan'] and not (ordered and plan['sort']),
+                        'indexes_used': sorted(plan['indexes']),
+                        'expected_any_of': sorted(expected),
+                        'full_scan': plan['full_scan'],
+                        'sort': plan['sort'],
+                        'rows_returned': count,
+                        'ms': (time.perf_counter() - started) * 1000,
+                        'plan': plan['plan'],
+                    }
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(json.dumps({
+            'vendor': connection.vendor,
+            'responses': options['rows'] or ResponseData.objects.count(),
+            'patient_files': options['rows'] or PatientFile.objects.count(),
+            'queries': results,
+        }, indent=2))
+        failed = [name for name, result in results.items() if not result['ok']]
+        if failed:
+            raise CommandError(f"Hot queries not served by their index: {', '.join(failed)}")
+
+    def existing_sample(self):
+        response = ResponseData.objects.order_by('id').first()
+        patient_file = PatientFile.objects.order_by('id').first()
+        if response is None or patient_file is None:
+            raise CommandError('No answers or patient files to explain against; seed some with --rows.')
+        assessment_ids = list(Assessment.objects.order_by('id').values_list('id', flat=True)[:REPORT_BATCH_ASSESSMENTS])
+        return response.assessment_id_id, assessment_ids, response.question_id_id, patient_file.step_id_id
+
+    def seed(self, rows):
+        user = User.objects.create_user(email=f'explain-{uuid.uuid4().hex}@example.com', username='explain')
+        scenario = AssessmentScenario.objects.create(name='explain', description='', img_path='', level='Easy', model_name='')
+        Question.objects.bulk_create(
+            [Question(as_id=scenario, question_text=f'Question {i}?', question_order=str(i)) for i in range(QUESTIONS_PER_ASSESSMENT)]
+        )
+        RecordingStep.objects.bulk_create([
+            RecordingStep(as_id=scenario, number=i, name=f'Step {i}', description='', img_path='', expected_duration=datetime.timedelta(seconds=30))
+            for i in range(STEPS_PER_ASSESSMENT)
+        ])
+        question_ids = list(Question.objects.filter(as_id=scenario).order_by('id').values_list('id', flat=True))
+        step_ids = list(RecordingStep.objects.filter(as_id=scenario).order_by('id').values_list('id', flat=True))
+
+        assessment_count = -(-rows // min(QUESTIONS_PER_ASSESSMENT, STEPS_PER_ASSESSMENT))
+        today = datetime.date.today()
+        for start in range(0, assessment_count, INSERT_BATCH_SIZE):
+            Assessment.objects.bulk_create([
+                Assessment(as_id=scenario, patient_id=user, assessment_date=today, result_summary='')
+                for _ in range(start, min(start + INSERT_BATCH_SIZE, assessment_count))
+            ])
+        assessment_ids = list(Assessment.objects.filter(as_id=scenario).order_by('id').values_list('id', flat=True))
+
+        self.insert(ResponseData, rows, lambda i: ResponseData(
+            assessment_id_id=assessment_ids[i // QUESTIONS_PER_ASSESSMENT],
+            question_id_id=question_ids[i % QUESTIONS_PER_ASSESSMENT],
+            response_text=f'Answer {i}',
+        ))
+        self.insert(PatientFile, rows, lambda i: PatientFile(
+            assessment_id_id=assessment_ids[i // STEPS_PER_ASSESSMENT],
+            step_id_id=step_ids[i % STEPS_PER_ASSESSMENT],
+            file_path=f'patient_files/{i}.mp4',
+            file_type='video/mp4',
+        ))
+
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Fresh statistics, as a long-lived table would have. Not on MySQL: ANALYZE TABLE commits
+            # the seeding transaction, and InnoDB's index dives see the new rows anyway
+            with connection.cursor() as cursor:
+                for model in (ResponseData, PatientFile):
+                    cursor.execute('ANALYZE ' + connection.ops.quote_name(model._meta.db_table))
+
+        middle = len(assessment_ids) // 2
+        return (
+            assessment_ids[middle],
+            assessment_ids[middle:middle + REPORT_BATCH_ASSESSMENTS],
+            question_ids[QUESTIONS_PER_ASSESSMENT // 2],
+            step_ids[STEPS_PER_ASSESSMENT // 2],
+        )
+
+    def insert(self, model, rows, build):
+        started = time.perf_counter()
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            model.objects.bulk_create([build(i) for i in range(start, min(start + INSERT_BATCH_SIZE, rows))])
+        self.stderr.write(f"Seeded {rows} {model.__name__} rows in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,37 @@
+# assessments/management/commands/extract_frames.py
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.frame_store_service import (
+    get_sampling_config,
+    queue_frame_stores,
+    requeue_stale_frame_stores,
+    run_frame_extraction,
+)
+from assessments.services.media_service import create_media_executor
+
+
+class Command(BaseCommand):
+    help = 'Decodes probed recordings once into memory-mappable .npy frame stores for the analysis models.'
+
+    def add_arguments(self, parser):
+        sample_fps, width, height = get_sampling_config()
+        parser.add_argument('--workers', type=int, default=None, help='Decode processes (defaults to MEDIA_WORKER_PROCESSES).')
+        parser.add_argument('--batch-size', type=int, default=4)
+        parser.add_argument('--fps', type=float, default=sample_fps, help='Frames sampled per second of video.')
+        parser.add_argument('--width', type=int, default=width)
+        parser.add_argument('--height', type=int, default=height)
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_frame_stores()
+        queued = queue_frame_stores(options['fps'], options['width'], options['height'])
+        self.stdout.write(f'Queued {queued} new store(s), resuming {requeued} interrupted one(s).')
+
+        total = 0
+        with create_media_executor(options['workers']) as executor:
+            while True:
+                processed = run_frame_extraction(executor, options['batch_size'])
+                if not processed:
+                    break
+                total += processed
+                self.stdout.write(f'Processed {total} store(s).')
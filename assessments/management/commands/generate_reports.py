@@ -0,0 +1,28 @@
+# assessments/management/commands/generate_reports.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Assessment
+from assessments.services.report_batch_service import ReportBatch
+
+
+class Command(BaseCommand):
+    help = 'Generates LLM summaries for many assessments with bounded concurrency and writes result_summary in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('assessment_ids', nargs='*', type=int)
+        parser.add_argument('--missing', action='store_true', help='Every assessment whose result_summary is empty.')
+        parser.add_argument('--concurrency', type=int, default=None, help='Defaults to ANALYSIS_BATCH_CONCURRENCY.')
+        parser.add_argument('--refresh', action='store_true', help='Bypass the summary cache.')
+
+    def handle(self, *args, **options):
+        assessment_ids = list(options['assessment_ids'])
+        if options['missing']:
+            assessment_ids += list(Assessment.objects.filter(result_summary='').values_list('id', flat=True))
+        if not assessment_ids:
+            raise CommandError('Pass assessment ids or --missing.')
+
+        batch = ReportBatch(assessment_ids, concurrency=options['concurrency'], bypass_cache=options['refresh'])
+        self.stdout.write(json.dumps(batch.run(), indent=2))
@@ -0,0 +1,31 @@
+# assessments/management/commands/inference_cache.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.services.inference_cache import InferenceCache
+from assessments.services.inference_service import build_registry
+
+
+class Command(BaseCommand):
+    help = 'Inspects, invalidates or trims the persistent inference result cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invalidate', metavar='MODEL_NAME', action='append', default=[], help='Drop every cached result of a model.')
+        parser.add_argument('--invalidate-stale', action='store_true', help='Drop results from versions other than the currently registered ones.')
+        parser.add_argument('--evict', action='store_true', help='Trim least recently used entries down to INFERENCE_CACHE_MAX_ENTRIES.')
+
+    def handle(self, *args, **options):
+        cache = InferenceCache()
+        registry = build_registry()
+
+        for model_name in options['invalidate']:
+            if model_name not in registry:
+                raise CommandError(f'Unregistered model: {model_name}')
+            self.stdout.write(f'Invalidated {cache.invalidate(model_name)} result(s) for {model_name}.')
+        if options['invalidate_stale']:
+            self.stdout.write(f'Invalidated {cache.invalidate_stale_versions(registry)} result(s) from old model versions.')
+        if options['evict']:
+            self.stdout.write(f'Evicted {cache.evict()} least recently used result(s).')
+        self.stdout.write(json.dumps(cache.stats()))
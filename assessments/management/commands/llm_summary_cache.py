@@ -0,0 +1,20 @@
+# assessments/management/commands/llm_summary_cache.py
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.summary_cache_service import clear_summary_cache, summary_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters of the LLM summary cache, or clears it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Drop every cached summary.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_summary_cache()
+            self.stdout.write('Cleared the LLM summary cache.')
+        self.stdout.write(json.dumps(summary_cache_stats()))
@@ -0,0 +1,121 @@
+# assessments/management/commands/load_test_reports.py
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+
+from assessments.models import AnalysisJob, Assessment
+from assessments.services.analysis_backends import FakeBackend, HTTPBackend, set_analysis_backend
+from assessments.services.analysis_job_service import get_analysis_executor
+from assessments.services.llm_stub_server import start_stub_server
+
+
+def percentiles(values):
+    if not len(values):
+        return {}
+    values = np.array(values)
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'max_ms': float(values.max()),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires concurrent analyze-autism/ requests through the full report path (view, job queue, '
+        'summary cache, backend) and reports request and job latencies. Writes result_summary!'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--assessment', type=int, action='append', default=[], help='Assessment id(s) to report on (default: first 10).')
+        parser.add_argument('--backend', choices=['configured', 'fake', 'stub'], default='fake',
+                            help='fake: in-process FakeBackend; stub: HTTPBackend against a local stub server.')
+        parser.add_argument('--latency-ms', type=float, default=800)
+        parser.add_argument('--jitter-ms', type=float, default=400)
+        parser.add_argument('--error-rate', type=float, default=0.02)
+        parser.add_argument('--use-cache', action='store_true', help='Let repeat answer sets hit the summary cache.')
+        parser.add_argument('--timeout', type=float, default=300, help='Seconds to wait for the jobs to finish.')
+
+    def handle(self, *args, **options):
+        assessment_ids = options['assessment'] or list(Assessment.objects.order_by('id').values_list('id', flat=True)[:10])
+        if not assessment_ids:
+            raise CommandError('No assessments to report on.')
+
+        server = None
+        previous_backend = None
+        if options['backend'] == 'fake':
+            previous_backend = set_analysis_backend(FakeBackend(
+                latency_ms=options['latency_ms'], jitter_ms=options['jitter_ms'], error_rate=options['error_rate'],
+            ))
+        elif options['backend'] == 'stub':
+            server = start_stub_server(latency_ms=options['latency_ms'], jitter_ms=options['jitter_ms'], error_rate=options['error_rate'])
+            previous_backend = set_analysis_backend(HTTPBackend(f'{server.endpoint}/v1/generate', model_name='stub-model'))
+
+        try:
+            results = self.run(assessment_ids, options)
+        finally:
+            if options['backend'] != 'configured':
+                set_analysis_backend(previous_backend)
+            if server is not None:
+                server.shutdown()
+        self.stdout.write(json.dumps(results, indent=2, default=str))
+
+    def run(self, assessment_ids, options):
+        bypass = 'false' if options['use_cache'] else 'true'
+
+        def post(i):
+            client = Client()
+            began = time.perf_counter()
+            response = client.post(
+                '/assessment/analyze-autism/',
+                {'assessment_id': assessment_ids[i % len(assessment_ids)], 'refresh': bypass},
+                content_type='application/json',
+            )
+            elapsed = (time.perf_counter() - began) * 1000
+            close_old_connections()
+            return response.status_code, elapsed, response.json().get('job_id')
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            responses = list(pool.map(post, range(options['requests'])))
+        submit_seconds = time.perf_counter() - began
+
+        job_ids = [job_id for status_code, _, job_id in responses if status_code == 202]
+        deadline = time.monotonic() + options['timeout']
+        while AnalysisJob.objects.filter(pk__in=job_ids, status__in=['queued', 'running']).exists():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.2)
+        drain_seconds = time.perf_counter() - began
+
+        jobs = list(AnalysisJob.objects.filter(pk__in=job_ids))
+        finished = [job for job in jobs if job.finished_at]
+        status_codes = {}
+        for status_code, _, _ in responses:
+            status_codes[status_code] = status_codes.get(status_code, 0) + 1
+        return {
+            'backend': options['backend'],
+            'analysis_workers': get_analysis_executor()._max_workers,
+            'requests': options['requests'],
+            'status_codes': status_codes,
+            'request_latency': percentiles([elapsed for _, elapsed, _ in responses]),
+            'submit_seconds': submit_seconds,
+            'jobs': {
+                'succeeded': sum(job.status == 'succeeded' for job in jobs),
+                'failed': sum(job.status == 'failed' for job in jobs),
+                'unfinished': len(jobs) - len(finished),
+                'cache_hits': sum(job.cache_hit for job in jobs),
+                'queue_wait': percentiles([(job.started_at - job.created_at).total_seconds() * 1000 for job in finished if job.started_at]),
+                'end_to_end': percentiles([(job.finished_at - job.created_at).total_seconds() * 1000 for job in finished]),
+            },
+            'drain_seconds': drain_seconds,
+            'reports_per_second': len(finished) / drain_seconds if drain_seconds else 0.0,
+        }
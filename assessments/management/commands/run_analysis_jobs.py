@@ -0,0 +1,36 @@
+# assessments/management/commands/run_analysis_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.models import AnalysisJob
+from assessments.services.analysis_job_service import requeue_stale_jobs, submit_analysis_job
+
+
+class Command(BaseCommand):
+    help = 'Runs queued analyze-autism jobs, e.g. ones left behind when a web process restarted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever.')
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale job(s).')
+
+            job_ids = list(
+                AnalysisJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if job_ids:
+                futures = [submit_analysis_job(job_id) for job_id in job_ids]
+                for future in futures:
+                    future.result()
+                self.stdout.write(f'Ran {len(job_ids)} job(s).')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
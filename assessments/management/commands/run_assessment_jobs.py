@@ -0,0 +1,56 @@
+# assessments/management/commands/run_assessment_jobs.py
+
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.assessment_pipeline import assessments_with_pending_work, build_assessment_job
+from assessments.services.inference_service import build_registry
+from assessments.services.media_service import create_media_executor
+from assessments.services.scheduler import JobScheduler
+
+
+class Command(BaseCommand):
+    help = 'Schedules assessment processing (probe, frames, inference) by scenario priority with per-model limits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Scheduler threads (concurrent assessment jobs).')
+        parser.add_argument('--processes', type=int, default=None, help='Decode/probe processes shared by all jobs.')
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--once', action='store_true', help='Process what is pending now, print stats and exit.')
+
+    def handle(self, *args, **options):
+        model_names = build_registry().names()
+        active = set()
+        lock = threading.Lock()
+
+        def done(assessment_id):
+            with lock:
+                active.discard(assessment_id)
+
+        scheduler = JobScheduler(workers=options['workers'])
+        with create_media_executor(options['processes']) as executor:
+            scheduler.start()
+            try:
+                while True:
+                    queued = 0
+                    for assessment in assessments_with_pending_work(model_names):
+                        with lock:
+                            if assessment.id in active:
+                                continue
+                            active.add(assessment.id)
+                        scheduler.submit(build_assessment_job(assessment, executor, on_done=done))
+                        queued += 1
+                    if queued:
+                        self.stdout.write(f'Queued {queued} assessment job(s).')
+
+                    if options['once']:
+                        scheduler.wait_idle()
+                        break
+                    self.stdout.write(json.dumps(scheduler.stats()))
+                    time.sleep(options['poll_interval'])
+            finally:
+                scheduler.shutdown()
+        self.stdout.write(json.dumps(scheduler.stats(), indent=2))
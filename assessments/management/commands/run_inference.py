@@ -0,0 +1,63 @@
+# assessments/management/commands/run_inference.py
+
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.services.inference_cache import InferenceCache
+from assessments.services.inference_service import InferenceEngine, MicroBatcher, build_registry
+
+
+class Command(BaseCommand):
+    help = 'Runs the registered local models over extracted frames and fills PatientFile.model_response.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models', help='Only score files for this model_name (repeatable).')
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--rescore', action='store_true', help='Backfill: score files that already have a response too.')
+        parser.add_argument('--no-cache', action='store_true', help='Run every model call instead of reusing cached results.')
+        parser.add_argument('--benchmark', action='store_true', help='Run the dummy CPU model on synthetic frames instead of the database.')
+        parser.add_argument('--items', type=int, default=256, help='Synthetic recordings in benchmark mode.')
+        parser.add_argument('--frames', type=int, default=60, help='Frames per synthetic recording.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Override the batch size in benchmark mode.')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options)
+
+        cache = None if options['no_cache'] else InferenceCache()
+        engine = InferenceEngine(cache=cache)
+        unknown = set(options['models'] or []) - set(engine.registry.names())
+        if unknown:
+            raise CommandError(f'Unregistered model(s): {", ".join(sorted(unknown))}')
+
+        started = time.perf_counter()
+        metrics = engine.run(model_names=options['models'], limit=options['limit'], rescore=options['rescore'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(json.dumps(metrics, indent=2))
+        if cache is not None:
+            self.stdout.write(f'Cache: {json.dumps(cache.stats())}')
+        self.stdout.write(f'Scored {sum(m["items"] for m in metrics.values())} file(s) and reused {engine.cache_hits} cached '
+                          f'result(s) in {elapsed:.2f}s; skipped {engine.skipped} without a registered model.')
+
+    def benchmark(self, options):
+        registry = build_registry()
+        model = registry.get('dummy_cpu_model')
+        if options['batch_size']:
+            model.batch_size = options['batch_size']
+
+        rng = np.random.default_rng(0)
+        frames = rng.integers(0, 255, size=(options['frames'], 224, 224, 3), dtype=np.uint8)
+        batcher = MicroBatcher(registry, lambda model, results: None)
+
+        started = time.perf_counter()
+        for i in range(options['items']):
+            batcher.add(model.name, i, frames)
+        batcher.flush()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(json.dumps(batcher.metrics_summary(), indent=2))
+        self.stdout.write(f'{options["items"]} recordings x {options["frames"]} frames in {elapsed:.2f}s '
+                          f'({options["items"] / elapsed:.1f} recordings/s, batch size {model.batch_size}).')
@@ -0,0 +1,38 @@
+# assessments/management/commands/run_llm_stub_server.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.llm_stub_server import start_stub_server
+
+
+class Command(BaseCommand):
+    help = 'Serves a local LLM stub (Gemini generateContent and /v1/generate) with configurable latency and errors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Fixed delay added to every response.')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Extra uniformly random delay, 0..jitter.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503.')
+        parser.add_argument('--token-ms', type=float, default=0, help='Delay between chunks of streamed responses.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        server = start_stub_server(
+            options['host'], options['port'],
+            latency_ms=options['latency_ms'], jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'], seed=options['seed'], token_ms=options['token_ms'],
+        )
+        self.stdout.write(
+            f'Stub LLM listening on {server.endpoint}: set GEMINI_API_ENDPOINT to it (with GEMINI_TRANSPORT "rest"), '
+            f'or use HTTPBackend with url {server.endpoint}/v1/generate.'
+        )
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
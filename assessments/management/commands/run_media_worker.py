@@ -0,0 +1,36 @@
+# assessments/management/commands/run_media_worker.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.services.media_service import (
+    create_media_executor,
+    process_pending_media,
+    requeue_stale_files,
+)
+
+
+class Command(BaseCommand):
+    help = 'Probes uploaded recordings in a process pool and fills in PatientFile duration and media metadata.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Probe processes (defaults to MEDIA_WORKER_PROCESSES).')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_files()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale file(s).')
+
+        with create_media_executor(options['workers']) as executor:
+            while True:
+                processed = process_pending_media(executor, options['batch_size'])
+                if processed:
+                    self.stdout.write(f'Processed {processed} file(s).')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
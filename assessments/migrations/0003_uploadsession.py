@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0002_assessment_patient_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('total_size', models.BigIntegerField()),
+                ('received_ranges', models.JSONField(default=list)),
+                ('committed_offset', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('complete', 'Complete')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assessment_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='assessments.assessment')),
+                ('patient_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='assessments.patientfile')),
+                ('step_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='assessments.recordingstep')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:13
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0003_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientfile',
+            name='media_metadata',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='patientfile',
+            name='media_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='patientfile',
+            name='duration',
+            field=models.DurationField(default=datetime.timedelta(0)),
+        ),
+    ]
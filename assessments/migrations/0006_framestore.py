@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0005_mediablob_patientfile_blob_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrameStore',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('file_path', models.CharField(max_length=255)),
+                ('sample_fps', models.FloatField()),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('frame_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('patient_file_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='assessments.patientfile')),
+                ('step_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='assessments.recordingstep')),
+            ],
+        ),
+    ]
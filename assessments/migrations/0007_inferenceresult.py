@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0006_framestore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceResult',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=255)),
+                ('model_version', models.CharField(max_length=50)),
+                ('model_response', models.CharField(max_length=255)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'model_name', 'model_version'), name='unique_inference_result')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0008_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='bypass_cache',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0009_analysisjob_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='used_fallback',
+            field=models.BooleanField(default=False),
+        ),
+    ]
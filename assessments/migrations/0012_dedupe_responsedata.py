@@ -0,0 +1,44 @@
+# Removes duplicate answers ahead of the (assessment, question) unique constraint in 0013.
+# For every duplicated pair the most recent row (highest id) is kept. Runs outside a single
+# transaction: the duplicates are found with one read-only aggregate, then deleted in small
+# batches that each commit on their own, so no lock is held on the table for long.
+# Answers written while this runs are caught by the second pass at the start of 0013.
+
+from django.db import migrations, transaction
+from django.db.models import Count, Max, Q
+
+GROUPS_PER_BATCH = 500
+
+
+def delete_duplicate_responses(apps, schema_editor):
+    ResponseData = apps.get_model('assessments', 'ResponseData')
+    db_alias = schema_editor.connection.alias
+    duplicates = list(
+        ResponseData.objects.using(db_alias)
+        .values('assessment_id', 'question_id')
+        .annotate(rows=Count('id'), keep_id=Max('id'))
+        .filter(rows__gt=1)
+        .order_by('assessment_id', 'question_id')
+    )
+    for start in range(0, len(duplicates), GROUPS_PER_BATCH):
+        batch = duplicates[start:start + GROUPS_PER_BATCH]
+        pairs = Q()
+        for group in batch:
+            pairs |= Q(assessment_id=group['assessment_id'], question_id=group['question_id'])
+        with transaction.atomic(using=db_alias):
+            ResponseData.objects.using(db_alias).filter(pairs).exclude(
+                id__in=[group['keep_id'] for group in batch]
+            ).delete()
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('assessments', '0011_analysisjob_prompt_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_responses, migrations.RunPython.noop),
+    ]
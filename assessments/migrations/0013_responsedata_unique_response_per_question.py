@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:42
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Second pass of 0012's dedupe, run in the same migration as the constraint so duplicates
+# written after 0012 finished don't make AddConstraint fail. This pass only finds what slipped
+# in since, so it is short.
+delete_duplicate_responses = import_module('assessments.migrations.0012_dedupe_responsedata').delete_duplicate_responses
+
+
+def dedupe_before_constraint(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        # Held until the migration commits: readers carry on, writers wait until the constraint exists
+        table = connection.ops.quote_name(apps.get_model('assessments', 'ResponseData')._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+    delete_duplicate_responses(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0012_dedupe_responsedata'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_before_constraint, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='responsedata',
+            constraint=models.UniqueConstraint(fields=('assessment_id', 'question_id'), name='unique_response_per_question'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0013_responsedata_unique_response_per_question'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientfile',
+            index=models.Index(fields=['assessment_id', 'step_id'], name='patientfile_assessment_step'),
+        ),
+        migrations.AddIndex(
+            model_name='responsedata',
+            index=models.Index(fields=['assessment_id', 'created_at'], name='response_assessment_created'),
+        ),
+    ]
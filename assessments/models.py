@@ -1,4 +1,8 @@
+import datetime
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 
@@ -71,6 +75,16 @@ class ResponseData(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One answer per question per assessment; resubmissions update it (see response_service)
+            models.UniqueConstraint(fields=['assessment_id', 'question_id'], name='unique_response_per_question'),
+        ]
+        indexes = [
+            # An assessment's answers in submission order; (assessment, question) lookups use the constraint above
+            models.Index(fields=['assessment_id', 'created_at'], name='response_assessment_created'),
+        ]
+
     def __str__(self):
         return f"Response {self.id} for Question {self.question.id} in Assessment {self.assessment.id}"
     
@@ -89,17 +103,120 @@ class RecordingStep(models.Model):
         return f"Recording Step {self.step_number} for Scenario {self.assessment_scenario.name}"
 
 
+class MediaBlob(models.Model):
+    id = models.AutoField(primary_key=True)
+    sha256 = models.CharField(max_length=64, unique=True)
+    file_path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)  # Number of PatientFile rows pointing at this blob
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class PatientFile(models.Model):
     id = models.AutoField(primary_key=True)
     assessment_id = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     step_id = models.ForeignKey(RecordingStep, on_delete=models.CASCADE)
     file_path = models.CharField(max_length=255)
+    blob_id = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, null=True, blank=True)
     file_type = models.CharField(max_length=50, choices=[('image', 'Image'), ('video', 'Video'), ('document', 'Document')])
-    duration = models.DurationField()
+    duration = models.DurationField(default=datetime.timedelta(0))  # Filled in by the media worker for videos
+    media_status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending')
+    media_metadata = models.JSONField(null=True, blank=True)  # fps, resolution, codec, ... as reported by the probe
     model_name = models.CharField(max_length=255)
     model_response = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assessment_id', 'step_id'], name='patientfile_assessment_step'),
+        ]
     
     def __str__(self):
-        return f"File {self.id} for Patient {self.patient_id}"
\ No newline at end of file
+        return f"File {self.id} for Patient {self.patient_id}"
+
+
+class UploadSession(models.Model):
+    STATUS_CHOICES = [('active', 'Active'), ('complete', 'Complete')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assessment_id = models.ForeignKey(Assessment, on_delete=models.CASCADE)
+    step_id = models.ForeignKey(RecordingStep, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.BigIntegerField()
+    received_ranges = models.JSONField(default=list)  # Sorted, merged [start, end) byte ranges written so far
+    committed_offset = models.BigIntegerField(default=0)  # End of the contiguous range starting at byte 0
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    patient_file = models.ForeignKey(PatientFile, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} for Assessment {self.assessment_id_id}"
+
+
+
+class FrameStore(models.Model):
+    STATUS_CHOICES = [('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')]
+
+    id = models.AutoField(primary_key=True)
+    patient_file_id = models.OneToOneField(PatientFile, on_delete=models.CASCADE)
+    step_id = models.ForeignKey(RecordingStep, on_delete=models.CASCADE)
+    file_path = models.CharField(max_length=255)  # Relative to FRAME_STORE_ROOT
+    sample_fps = models.FloatField()
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    frame_count = models.PositiveIntegerField(default=0)  # Frames actually decoded into the store
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Frames for File {self.patient_file_id_id} ({self.frame_count} @ {self.sample_fps} fps)"
+
+
+
+class InferenceResult(models.Model):
+    id = models.AutoField(primary_key=True)
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the scored media (MediaBlob.sha256)
+    model_name = models.CharField(max_length=255)
+    model_version = models.CharField(max_length=50)
+    model_response = models.CharField(max_length=255)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # Drives LRU eviction
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'model_name', 'model_version'], name='unique_inference_result'),
+        ]
+
+    def __str__(self):
+        return f"Result {self.model_name} v{self.model_version} for {self.content_hash[:12]}"
+
+
+class AnalysisJob(models.Model):
+    STATUS_CHOICES = [('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assessment_id = models.ForeignKey(Assessment, on_delete=models.CASCADE)
+    user_answers = models.JSONField(default=dict)
+    bypass_cache = models.BooleanField(default=False)  # Always call the model, even for a previously seen answer set
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    result = models.TextField(blank=True, null=True)
+    cache_hit = models.BooleanField(default=False)
+    used_fallback = models.BooleanField(default=False)  # Provider was unavailable; result is the local fallback summary
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)  # Estimated request size; empty when no model call was made
+    error = models.TextField(blank=True, null=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Analysis {self.id} for Assessment {self.assessment_id_id} ({self.status})"
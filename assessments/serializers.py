@@ -25,6 +25,16 @@ class RecordingStepSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ScenarioBundleSerializer(serializers.ModelSerializer):
+    # Filled by scenario_bundle_service's prefetches
+    questions = QuestionSerializer(source='bundle_questions', many=True, read_only=True)
+    recording_steps = RecordingStepSerializer(source='bundle_steps', many=True, read_only=True)
+
+    class Meta:
+        model = AssessmentScenario
+        fields = '__all__'
+
+
 class ResponseDataSerializer(serializers.ModelSerializer):
     question_id = Question()
     class Meta:
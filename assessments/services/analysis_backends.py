@@ -0,0 +1,165 @@
+# assessments/services/analysis_backends.py
+
+import json
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .llm_client import DEFAULT_MODEL_NAME, DEFAULT_TIMEOUT_SECONDS, get_llm_client
+from .stub_summary import STUB_SUMMARY
+
+DEFAULT_BACKEND = {'BACKEND': 'assessments.services.analysis_backends.GeminiBackend', 'OPTIONS': {}}
+
+
+class AnalysisBackendError(Exception):
+    """The backend could not produce a summary (transport error, bad status, malformed reply)."""
+
+
+class AnalysisBackend:
+    """
+    What the analysis path needs from an LLM: one prompt in, one text out. system_instruction
+    carries the fixed guidelines separately from the per-request prompt.
+    model_name takes part in the summary cache key, so two backends never share entries.
+    """
+
+    model_name = ''
+
+    def generate(self, prompt, timeout=None, system_instruction=None):
+        raise NotImplementedError
+
+    def stream(self, prompt, timeout=None, system_instruction=None):
+        """Yields text deltas as they are produced. Backends without streaming yield the whole text once."""
+        yield self.generate(prompt, timeout=timeout, system_instruction=system_instruction)
+
+
+class GeminiBackend(AnalysisBackend):
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        self.model_name = model_name
+
+    def generate(self, prompt, timeout=None, system_instruction=None):
+        return get_llm_client().generate_text(prompt, model_name=self.model_name, timeout=timeout, system_instruction=system_instruction)
+
+    def stream(self, prompt, timeout=None, system_instruction=None):
+        return get_llm_client().stream_text(prompt, model_name=self.model_name, timeout=timeout, system_instruction=system_instruction)
+
+
+class HTTPBackend(AnalysisBackend):
+    """
+    Generic JSON-over-HTTP backend: POSTs {"model": ..., "prompt": ..., "system": ...} to URL and
+    reads "text" from the reply. Fits self-hosted model servers and the local stub server.
+    """
+
+    def __init__(self, url, model_name='http-model', timeout=DEFAULT_TIMEOUT_SECONDS, headers=None):
+        self.url = url
+        self.model_name = model_name
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session is not documented as thread-safe; one pooled session per thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def payload(self, prompt, system_instruction, **extra):
+        payload = {'model': self.model_name, 'prompt': prompt, **extra}
+        if system_instruction:
+            payload['system'] = system_instruction
+        return payload
+
+    def generate(self, prompt, timeout=None, system_instruction=None):
+        try:
+            response = self.session.post(self.url, json=self.payload(prompt, system_instruction), timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return response.json()['text']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise AnalysisBackendError(f"{self.url}: {e}") from e
+
+    def stream(self, prompt, timeout=None, system_instruction=None):
+        """Asks for {"stream": true} and reads NDJSON {"text": delta} lines; plain JSON replies are accepted too."""
+        try:
+            with self.session.post(
+                self.url, json=self.payload(prompt, system_instruction, stream=True), timeout=timeout or self.timeout, stream=True,
+            ) as response:
+                response.raise_for_status()
+                if 'ndjson' not in response.headers.get('Content-Type', ''):
+                    yield response.json()['text']
+                    return
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)['text']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise AnalysisBackendError(f"{self.url}: {e}") from e
+
+
+class FakeBackend(AnalysisBackend):
+    """In-process stand-in with configurable latency and failure rate, for load tests without network."""
+
+    def __init__(self, model_name='fake-model', latency_ms=0, jitter_ms=0, error_rate=0.0, response=STUB_SUMMARY, seed=None, token_ms=0):
+        self.model_name = model_name
+        self.token_ms = token_ms  # Delay between streamed words; latency_ms is the time to the first one
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.response = response
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None, system_instruction=None):
+        self._wait(timeout)
+        return self.response
+
+    def stream(self, prompt, timeout=None, system_instruction=None):
+        self._wait(timeout)
+        words = self.response.split(' ')
+        for i, word in enumerate(words):
+            if i and self.token_ms:
+                time.sleep(self.token_ms / 1000.0)
+            yield word if i == len(words) - 1 else word + ' '
+
+    def _wait(self, timeout):
+        with self._lock:
+            delay_ms = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            fail = self._random.random() < self.error_rate
+        delay = delay_ms / 1000.0
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise AnalysisBackendError(f"Fake backend timed out after {timeout}s")
+        time.sleep(delay)
+        if fail:
+            raise AnalysisBackendError("Fake backend error")
+
+
+def build_analysis_backend(config=None):
+    """Backend from an ANALYSIS_BACKEND-style dict: {'BACKEND': dotted path, 'OPTIONS': kwargs}."""
+    config = config or getattr(settings, 'ANALYSIS_BACKEND', DEFAULT_BACKEND)
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_analysis_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_analysis_backend()
+    return _backend
+
+
+def set_analysis_backend(backend):
+    """Swaps the process-wide backend, e.g. for a load test run. Returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
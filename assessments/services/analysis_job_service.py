@@ -0,0 +1,117 @@
+# assessments/services/analysis_job_service.py
+
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from assessments.models import AnalysisJob, Assessment
+from .gemini_service import analyze_with_cache
+
+DEFAULT_ANALYSIS_WORKERS = 4
+DEFAULT_MAX_PENDING_JOBS = 200
+DEFAULT_STALE_AFTER = datetime.timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class AnalysisQueueFull(Exception):
+    pass
+
+
+def get_max_pending_jobs():
+    return getattr(settings, 'ANALYSIS_MAX_PENDING_JOBS', DEFAULT_MAX_PENDING_JOBS)
+
+
+def pending_job_count():
+    return AnalysisJob.objects.filter(status__in=['queued', 'running']).count()
+
+
+def claim_analysis_job(job_id):
+    """
+    Marks a queued job as running, starting its clock now. Returns False when someone else
+    (the pool, run_analysis_jobs or a report batch) already claimed it, so every job runs once.
+    """
+    return bool(AnalysisJob.objects.filter(pk=job_id, status='queued').update(status='running', started_at=timezone.now()))
+
+
+def get_analysis_executor():
+    """
+    Process-wide thread pool for LLM analysis, created on first use.
+    Its size (ANALYSIS_WORKERS) bounds how many provider calls one process has in flight.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ANALYSIS_WORKERS', DEFAULT_ANALYSIS_WORKERS),
+                thread_name_prefix='analysis',
+            )
+        return _executor
+
+
+def enqueue_analysis(assessment, user_answers, bypass_cache=False):
+    """
+    Records an AnalysisJob and hands it to the pool once the surrounding transaction commits.
+    Returns (job, error); error is set when too many jobs are already waiting.
+    """
+    if pending_job_count() >= get_max_pending_jobs():
+        return None, 'Too many analyses are pending. Please try again shortly.'
+
+    job = AnalysisJob.objects.create(assessment_id=assessment, user_answers=user_answers, bypass_cache=bypass_cache)
+    transaction.on_commit(lambda: submit_analysis_job(job.id))
+    return job, None
+
+
+def submit_analysis_job(job_id):
+    return get_analysis_executor().submit(run_analysis_job, job_id)
+
+
+def run_analysis_job(job_id):
+    """Runs one queued job: calls the model, then writes Assessment.result_summary and the job outcome."""
+    try:
+        if not claim_analysis_job(job_id):
+            return
+        job = AnalysisJob.objects.get(pk=job_id)
+        try:
+            result = analyze_with_cache(job.user_answers, bypass_cache=job.bypass_cache)
+        except Exception as e:
+            print(f"Analysis job {job_id} failed: {e}")
+            AnalysisJob.objects.filter(pk=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+            return
+
+        with transaction.atomic():
+            Assessment.objects.filter(pk=job.assessment_id_id).update(result_summary=result.summary)
+            AnalysisJob.objects.filter(pk=job_id).update(
+                status='succeeded', result=result.summary, cache_hit=result.cache_hit, used_fallback=result.fallback,
+                prompt_tokens=result.prompt_tokens, finished_at=timezone.now(),
+            )
+    finally:
+        # Pool threads outlive requests, so their connections are not closed by Django
+        close_old_connections()
+
+
+def requeue_stale_jobs(stale_after=DEFAULT_STALE_AFTER):
+    """Jobs left running by a process that died go back to queued."""
+    cutoff = timezone.now() - stale_after
+    return AnalysisJob.objects.filter(status='running', started_at__lt=cutoff).update(status='queued', started_at=None)
+
+
+def analysis_job_payload(job):
+    return {
+        'job_id': str(job.id),
+        'assessment_id': job.assessment_id_id,
+        'job_status': job.status,
+        'result': job.result,
+        'cache_hit': job.cache_hit,
+        'used_fallback': job.used_fallback,
+        'prompt_tokens': job.prompt_tokens,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,79 @@
+# assessments/services/analysis_stream_service.py
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from assessments.models import Assessment
+from .gemini_service import stream_autism_analysis
+
+DEFAULT_STREAM_WORKERS = 16
+KEEPALIVE_SECONDS = 15.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_stream_executor():
+    """Threads that drive the (blocking) backend streams; its size bounds concurrent streams per process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ANALYSIS_STREAM_WORKERS', DEFAULT_STREAM_WORKERS),
+                thread_name_prefix='analysis-stream',
+            )
+        return _executor
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def produce_analysis(assessment_id, user_answers, bypass_cache, emit):
+    """
+    Runs in a worker thread: streams the summary through emit(event, data) and saves it.
+    The summary is saved even if the client has gone away, since the model call is already paid for.
+    """
+    try:
+        stream = stream_autism_analysis(user_answers, bypass_cache=bypass_cache)
+        pieces = []
+        for piece in stream:
+            pieces.append(piece)
+            emit('token', {'text': piece})
+        summary = ''.join(pieces)
+        Assessment.objects.filter(pk=assessment_id).update(result_summary=summary)
+        emit('done', {'assessment_id': assessment_id, 'cache_hit': stream.cache_hit, 'fallback': stream.fallback, 'prompt_tokens': stream.prompt_tokens, 'length': len(summary)})
+    except Exception as e:
+        print(f"Streaming analysis for assessment {assessment_id} failed: {e}")
+        emit('error', {'message': str(e)})
+    finally:
+        close_old_connections()
+
+
+async def analysis_event_stream(assessment_id, user_answers, bypass_cache=False):
+    """
+    Server-Sent Events for one analysis: token events as text arrives, then done (or error).
+    A comment goes out first so headers reach the client before the model answers.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    yield ': analysis started\n\n'
+    loop.run_in_executor(get_stream_executor(), produce_analysis, assessment_id, user_answers, bypass_cache, emit)
+    while True:
+        try:
+            event, data = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            yield ': keep-alive\n\n'  # Keeps proxies from closing an idle connection while the model thinks
+            continue
+        yield sse_event(event, data)
+        if event in ('done', 'error'):
+            return
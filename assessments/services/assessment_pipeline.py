@@ -0,0 +1,58 @@
+# assessments/services/assessment_pipeline.py
+
+from django.db import close_old_connections
+from django.db.models import Q
+
+from assessments.models import Assessment
+from .frame_store_service import get_sampling_config, queue_frame_stores, run_frame_extraction
+from .inference_cache import InferenceCache
+from .inference_service import InferenceEngine
+from .media_service import process_pending_media
+from .scheduler import Job, scenario_priority
+
+
+def assessments_with_pending_work(model_names):
+    """Assessments with recordings still waiting to be probed, decoded or scored by a registered model."""
+    return (
+        Assessment.objects.filter(
+            Q(patientfile__media_status='pending')
+            | Q(patientfile__media_status='ready', patientfile__file_type__startswith='video/', patientfile__framestore__isnull=True)
+            | Q(patientfile__framestore__status='pending')
+            | Q(patientfile__framestore__status='ready', patientfile__model_response='', as_id__model_name__in=model_names)
+        )
+        .select_related('as_id')
+        .distinct()
+    )
+
+
+def process_assessment(assessment_id, executor):
+    """Runs one assessment's recordings through probing, frame extraction and inference."""
+    try:
+        while process_pending_media(executor, assessment_id=assessment_id):
+            pass
+        queue_frame_stores(*get_sampling_config(), assessment_id=assessment_id)
+        while run_frame_extraction(executor, assessment_id=assessment_id):
+            pass
+        InferenceEngine(cache=InferenceCache()).run(assessment_ids=[assessment_id])
+    finally:
+        # Scheduler threads are long-lived; don't let them hold on to stale connections
+        close_old_connections()
+
+
+def build_assessment_job(assessment, executor, on_done=None):
+    """A scheduler job for one assessment, prioritized by its scenario and limited by the scenario's model."""
+    def run(assessment_id):
+        try:
+            process_assessment(assessment_id, executor)
+        finally:
+            if on_done:
+                on_done(assessment_id)
+
+    return Job(
+        run,
+        args=(assessment.id,),
+        model_name=assessment.as_id.model_name,
+        patient_id=assessment.patient_id_id,
+        priority=scenario_priority(assessment.as_id),
+        key=assessment.id,
+    )
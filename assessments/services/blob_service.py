@@ -0,0 +1,99 @@
+# assessments/services/blob_service.py
+
+from django.core.files.storage import storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from assessments.models import MediaBlob
+from assessments.storage import ContentAddressedStorage
+
+
+def get_media_storage():
+    return storages['patient_media']
+
+
+def find_blob(sha256):
+    return MediaBlob.objects.filter(sha256=sha256.lower()).first()
+
+
+class BlobMissing(Exception):
+    """The blob's file is gone and there is no content at hand to write it again."""
+
+
+def store_blob(name, content, storage=None):
+    """
+    Stores an upload content-addressed and takes one reference to its blob in the same step, so
+    a concurrent release_blob cannot delete the file between the write being skipped and the
+    reference being counted. Returns (stored_path, blob); blob is None for storages that are not
+    content-addressed, which just save() the file.
+    """
+    storage = storage or get_media_storage()
+    if not isinstance(storage, ContentAddressedStorage):
+        return storage.save(name, content), None
+    with storage.stage(name, content) as (blob_name, staged_path):
+        blob = acquire_blob(blob_name, storage=storage, staged_path=staged_path)
+    return blob_name, blob
+
+
+def acquire_blob(stored_path, storage=None, references=1, staged_path=None):
+    """
+    Adds references to the blob behind stored_path, creating its MediaBlob row on first use.
+    The row is locked while the file is checked: a missing file is written from staged_path,
+    or BlobMissing is raised when there is none. Returns None for files that were not stored
+    content-addressed.
+    """
+    storage = storage or get_media_storage()
+    digest = ContentAddressedStorage.digest_from_name(stored_path)
+    if digest is None:
+        return None
+
+    while True:
+        try:
+            with transaction.atomic():
+                blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+                if blob is None:
+                    # Registered with no references until the file is in place
+                    blob = MediaBlob.objects.create(sha256=digest, file_path=stored_path, size=0, ref_count=0)
+                if not storage.exists(stored_path):
+                    if staged_path is None:
+                        raise BlobMissing(f"{stored_path} is no longer stored.")
+                    storage.place(staged_path, stored_path)
+                # Zero rows updated means the last reference was released in between (no row locks on SQLite); start over
+                if MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + references, size=storage.size(stored_path)):
+                    blob.refresh_from_db(fields=['ref_count', 'size'])
+                    return blob
+        except IntegrityError:
+            # Another upload of the same content registered the blob first
+            continue
+
+
+def release_blob(blob_pk, storage=None):
+    """
+    Drops one reference; the blob row is deleted once nothing points at it, and its file after
+    the transaction commits, so a rolled back delete (of the PatientFile that held the reference)
+    leaves both in place.
+    """
+    storage = storage or get_media_storage()
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=blob_pk).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1 or not MediaBlob.objects.filter(pk=blob.pk, ref_count__lte=1).delete()[0]:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+        transaction.on_commit(lambda: delete_unreferenced_file(blob.sha256, blob.file_path, storage))
+
+
+def delete_unreferenced_file(digest, stored_path, storage):
+    """
+    Deletes a released blob's file unless the same content was stored again since. A placeholder
+    row claims the digest while the file goes, so acquire_blob registering it concurrently waits
+    on the unique index and then finds the file missing and rewrites it.
+    """
+    try:
+        with transaction.atomic():
+            placeholder = MediaBlob.objects.create(sha256=digest, file_path=stored_path, size=0, ref_count=0)
+            storage.delete(stored_path)
+            placeholder.delete()
+    except IntegrityError:
+        pass  # Registered again in the meantime; the file is in use
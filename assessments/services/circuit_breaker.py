@@ -0,0 +1,274 @@
+# assessments/services/circuit_breaker.py
+
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+DEFAULT_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+DEFAULT_RECOVERY_SECONDS = 30.0  # Time open before a trial call is let through
+DEFAULT_HALF_OPEN_CALLS = 1
+DEFAULT_DEADLINE_SECONDS = 45.0  # Whole analysis, retries included
+DEFAULT_ATTEMPT_TIMEOUT_SECONDS = 20.0
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_SECONDS = 0.5
+DEFAULT_RETRY_MAX_SECONDS = 8.0
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+TRANSITIONS_KEPT = 100
+
+
+class ProviderUnavailable(Exception):
+    """No answer from the provider within the deadline, after retries, or with the circuit open."""
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts in milliseconds, Prometheus-style, per outcome."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = {}
+        self._sums = {}
+        self._lock = threading.Lock()
+
+    def observe(self, outcome, milliseconds):
+        with self._lock:
+            counts = self._counts.setdefault(outcome, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if milliseconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1  # +Inf
+            self._sums[outcome] = self._sums.get(outcome, 0.0) + milliseconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                outcome: {
+                    'buckets': {**{str(bound): counts[i] for i, bound in enumerate(self.buckets)}, '+Inf': counts[-1]},
+                    'count': counts[-1],
+                    'sum_ms': self._sums[outcome],
+                }
+                for outcome, counts in self._counts.items()
+            }
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures; open -> half_open once
+    recovery_seconds have passed; half_open lets half_open_calls trial calls through and
+    closes on a success or re-opens on a failure.
+    """
+
+    def __init__(self, name, failure_threshold=None, recovery_seconds=None, half_open_calls=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or getattr(settings, 'ANALYSIS_BREAKER_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)
+        self.recovery_seconds = recovery_seconds or getattr(settings, 'ANALYSIS_BREAKER_RECOVERY_SECONDS', DEFAULT_RECOVERY_SECONDS)
+        self.half_open_calls = half_open_calls or getattr(settings, 'ANALYSIS_BREAKER_HALF_OPEN_CALLS', DEFAULT_HALF_OPEN_CALLS)
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_calls = 0
+        self.rejected = 0
+        self.transitions = deque(maxlen=TRANSITIONS_KEPT)
+        self.transition_counts = {}
+        self._lock = threading.Lock()
+
+    def _move(self, state):
+        key = f'{self.state}->{state}'
+        self.transitions.append({'at': time.time(), 'from': self.state, 'to': state})
+        self.transition_counts[key] = self.transition_counts.get(key, 0) + 1
+        print(f"Circuit {self.name}: {self.state} -> {state}")
+        self.state = state
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.recovery_seconds:
+                    self.rejected += 1
+                    return False
+                self._move('half_open')
+                self.trial_calls = 0
+            if self.state == 'half_open':
+                if self.trial_calls >= self.half_open_calls:
+                    self.rejected += 1
+                    return False
+                self.trial_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == 'half_open':
+                self._move('closed')
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.consecutive_failures >= self.failure_threshold):
+                self._move('open')
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'rejected_calls': self.rejected,
+                'transition_counts': dict(self.transition_counts),
+                'recent_transitions': list(self.transitions)[-10:],
+            }
+
+
+class ProviderGuard:
+    """Circuit breaker, overall deadline, per-attempt timeout and jittered retries around one provider."""
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyHistogram()
+        self.deadline_seconds = getattr(settings, 'ANALYSIS_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS)
+        self.attempt_timeout = getattr(settings, 'ANALYSIS_ATTEMPT_TIMEOUT_SECONDS', DEFAULT_ATTEMPT_TIMEOUT_SECONDS)
+        self.attempts = getattr(settings, 'ANALYSIS_RETRY_ATTEMPTS', DEFAULT_RETRY_ATTEMPTS)
+        self.retry_base = getattr(settings, 'ANALYSIS_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS)
+        self.retry_max = getattr(settings, 'ANALYSIS_RETRY_MAX_SECONDS', DEFAULT_RETRY_MAX_SECONDS)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        # Full jitter: spreads retries from many workers instead of hammering the provider in step
+        return random.uniform(0, min(self.retry_max, self.retry_base * (2 ** attempt)))
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def call(self, fn):
+        """
+        Runs fn(timeout) until it succeeds, attempts run out or the deadline passes.
+        Raises CircuitOpenError without calling fn while the circuit is open, and
+        ProviderUnavailable when every attempt failed.
+        """
+        self._count('calls')
+        deadline = time.monotonic() + self.deadline_seconds
+        last_error = None
+        for attempt in range(self.attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name}: circuit open") from last_error
+            started = time.monotonic()
+            try:
+                result = fn(min(self.attempt_timeout, remaining))
+            except Exception as e:
+                self.latency.observe('failure', (time.monotonic() - started) * 1000)
+                self.breaker.record_failure()
+                last_error = e
+                pause = self.backoff(attempt)
+                if attempt + 1 < self.attempts and time.monotonic() + pause < deadline:
+                    self._count('retries')
+                    time.sleep(pause)
+                    continue
+                break
+            self.latency.observe('success', (time.monotonic() - started) * 1000)
+            self.breaker.record_success()
+            return result
+        self._count('failures')
+        raise ProviderUnavailable(f"{self.name}: {last_error or 'deadline exceeded'}") from last_error
+
+    def stream(self, fn):
+        """
+        Streaming version of call(): fn(timeout) returns an iterator of pieces, which are passed on.
+        A failed attempt is only retried if it had not produced anything yet.
+        """
+        self._count('calls')
+        deadline = time.monotonic() + self.deadline_seconds
+        last_error = None
+        for attempt in range(self.attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name}: circuit open") from last_error
+            started = time.monotonic()
+            produced = False
+            try:
+                for piece in fn(min(self.attempt_timeout, remaining)):
+                    produced = True
+                    yield piece
+            except Exception as e:
+                self.latency.observe('failure', (time.monotonic() - started) * 1000)
+                self.breaker.record_failure()
+                last_error = e
+                pause = self.backoff(attempt)
+                if not produced and attempt + 1 < self.attempts and time.monotonic() + pause < deadline:
+                    self._count('retries')
+                    time.sleep(pause)
+                    continue
+                break
+            self.latency.observe('success', (time.monotonic() - started) * 1000)
+            self.breaker.record_success()
+            return
+        self._count('failures')
+        raise ProviderUnavailable(f"{self.name}: {last_error or 'deadline exceeded'}") from last_error
+
+    def snapshot(self):
+        return {
+            'circuit': self.breaker.snapshot(),
+            'calls': self.calls,
+            'retries': self.retries,
+            'failures': self.failures,
+            'latency_ms': self.latency.snapshot(),
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_provider_guard(provider):
+    with _guards_lock:
+        guard = _guards.get(provider)
+        if guard is None:
+            guard = _guards[provider] = ProviderGuard(provider)
+        return guard
+
+
+def provider_metrics():
+    with _guards_lock:
+        guards = dict(_guards)
+    return {name: guard.snapshot() for name, guard in guards.items()}
+
+
+def prometheus_metrics():
+    """The same metrics in Prometheus text exposition format."""
+    state_values = {'closed': 0, 'half_open': 1, 'open': 2}
+    lines = [
+        '# TYPE analysis_circuit_state gauge',
+        '# TYPE analysis_circuit_transitions_total counter',
+        '# TYPE analysis_provider_calls_total counter',
+        '# TYPE analysis_provider_latency_ms histogram',
+    ]
+    for name, metrics in provider_metrics().items():
+        circuit = metrics['circuit']
+        lines.append(f'analysis_circuit_state{{provider="{name}"}} {state_values[circuit["state"]]}')
+        for transition, count in circuit['transition_counts'].items():
+            source, target = transition.split('->')
+            lines.append(f'analysis_circuit_transitions_total{{provider="{name}",from="{source}",to="{target}"}} {count}')
+        for counter in ('calls', 'retries', 'failures'):
+            lines.append(f'analysis_provider_calls_total{{provider="{name}",kind="{counter}"}} {metrics[counter]}')
+        lines.append(f'analysis_provider_calls_total{{provider="{name}",kind="rejected"}} {circuit["rejected_calls"]}')
+        for outcome, histogram in metrics['latency_ms'].items():
+            labels = f'provider="{name}",outcome="{outcome}"'
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'analysis_provider_latency_ms_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'analysis_provider_latency_ms_sum{{{labels}}} {histogram["sum_ms"]}')
+            lines.append(f'analysis_provider_latency_ms_count{{{labels}}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,90 @@
+# assessments/services/frame_extractor.py
+#
+# Runs inside frame extraction worker processes, so it must stay free of Django imports.
+
+import math
+import os
+
+import cv2
+import numpy as np
+
+from .media_probe import probe_media
+
+CHECKPOINT_EVERY = 32  # Frames between flushes of the store and its progress file
+
+
+def progress_path(store_path):
+    return f'{store_path}.progress'
+
+
+def read_progress(store_path):
+    """Number of frames already flushed to the store by an earlier, possibly interrupted, run."""
+    if not os.path.exists(store_path):
+        return 0
+    try:
+        with open(progress_path(store_path)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def write_progress(store_path, frames_written):
+    tmp_path = f'{progress_path(store_path)}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(frames_written))
+    os.replace(tmp_path, progress_path(store_path))
+
+
+def estimate_frame_count(video_path, sample_fps, duration_seconds=None):
+    if not duration_seconds:
+        duration_seconds = probe_media(video_path)['duration_seconds']
+    return max(1, math.ceil(duration_seconds * sample_fps))
+
+
+def extract_frames(video_path, store_path, sample_fps, width, height, duration_seconds=None):
+    """
+    Decodes video_path once and writes frames sampled at sample_fps, resized to width x height (RGB),
+    into a (frames, height, width, 3) uint8 .npy file at store_path.
+
+    Progress is checkpointed next to the store, so a run that dies part way resumes from the
+    last flushed frame instead of starting over. Returns (frames_written, frames_allocated).
+    """
+    start_index = read_progress(store_path)
+    if start_index:
+        frames = np.load(store_path, mmap_mode='r+')
+    else:
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        frame_count = estimate_frame_count(video_path, sample_fps, duration_seconds)
+        frames = np.lib.format.open_memmap(store_path, mode='w+', dtype=np.uint8, shape=(frame_count, height, width, 3))
+    frame_count = frames.shape[0]
+    if start_index >= frame_count:
+        return start_index, frame_count
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open media file: {video_path}")
+    try:
+        index = start_index
+        next_ms = index * 1000.0 / sample_fps
+        if index:
+            cap.set(cv2.CAP_PROP_POS_MSEC, next_ms)
+        # grab() demuxes and decodes without converting the frame; retrieve() only the sampled ones
+        while index < frame_count and cap.grab():
+            if cap.get(cv2.CAP_PROP_POS_MSEC) + 0.5 < next_ms:
+                continue
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frames[index])
+            index += 1
+            next_ms = index * 1000.0 / sample_fps
+            if index % CHECKPOINT_EVERY == 0:
+                frames.flush()
+                write_progress(store_path, index)
+    finally:
+        cap.release()
+
+    frames.flush()
+    write_progress(store_path, index)
+    return index, frame_count
@@ -0,0 +1,116 @@
+# assessments/services/frame_store_service.py
+
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from assessments.models import FrameStore, PatientFile
+from .blob_service import get_media_storage
+from .frame_extractor import extract_frames
+from .media_service import DEFAULT_STALE_AFTER
+
+DEFAULT_SAMPLE_FPS = 2
+DEFAULT_SAMPLE_SIZE = (224, 224)
+
+
+def get_frame_store_root():
+    return str(getattr(settings, 'FRAME_STORE_ROOT', os.path.join(settings.MEDIA_ROOT, 'frame_store')))
+
+
+def get_sampling_config():
+    sample_fps = getattr(settings, 'FRAME_SAMPLE_FPS', DEFAULT_SAMPLE_FPS)
+    width, height = getattr(settings, 'FRAME_SAMPLE_SIZE', DEFAULT_SAMPLE_SIZE)
+    return sample_fps, width, height
+
+
+def queue_frame_stores(sample_fps, width, height, assessment_id=None):
+    """Creates pending FrameStore rows for every probed video that does not have one yet. Returns how many were queued."""
+    videos = PatientFile.objects.filter(
+        media_status='ready', file_type__startswith='video/', framestore__isnull=True
+    ).only('id', 'step_id')
+    if assessment_id is not None:
+        videos = videos.filter(assessment_id=assessment_id)
+    stores = [
+        FrameStore(
+            patient_file_id=video,
+            step_id_id=video.step_id_id,
+            file_path=os.path.join(str(video.step_id_id), f'{video.id}.npy'),
+            sample_fps=sample_fps,
+            width=width,
+            height=height,
+        )
+        for video in videos
+    ]
+    FrameStore.objects.bulk_create(stores, batch_size=500)
+    return len(stores)
+
+
+def claim_frame_stores(limit, assessment_id=None):
+    queryset = FrameStore.objects.select_for_update(skip_locked=True).select_related('patient_file_id').filter(status='pending')
+    if assessment_id is not None:
+        queryset = queryset.filter(patient_file_id__assessment_id=assessment_id)
+    with transaction.atomic():
+        stores = list(queryset.order_by('id')[:limit])
+        if stores:
+            FrameStore.objects.filter(id__in=[s.id for s in stores]).update(status='processing', updated_at=timezone.now())
+    return stores
+
+
+def requeue_stale_frame_stores(stale_after=DEFAULT_STALE_AFTER):
+    """Interrupted extractions go back to pending; they resume from their last checkpoint."""
+    cutoff = timezone.now() - stale_after
+    return FrameStore.objects.filter(status='processing', updated_at__lt=cutoff).update(status='pending')
+
+
+def run_frame_extraction(executor, batch_size=4, assessment_id=None):
+    """Claims a batch of pending stores and decodes them in the process pool. Returns the batch size."""
+    stores = claim_frame_stores(batch_size, assessment_id=assessment_id)
+    media_storage = get_media_storage()
+    root = get_frame_store_root()
+    futures = {}
+    for store in stores:
+        metadata = store.patient_file_id.media_metadata or {}
+        futures[executor.submit(
+            extract_frames,
+            media_storage.path(store.patient_file_id.file_path),
+            os.path.join(root, store.file_path),
+            store.sample_fps,
+            store.width,
+            store.height,
+            metadata.get('duration_seconds'),
+        )] = store
+
+    for future, store in futures.items():
+        try:
+            frames_written, _ = future.result()
+            store.frame_count = frames_written
+            store.status = 'ready'
+            store.error = None
+        except Exception as e:
+            store.status = 'failed'
+            store.error = str(e)
+        store.save(update_fields=['frame_count', 'status', 'error', 'updated_at'])
+    return len(stores)
+
+
+def open_frames(store):
+    """
+    Returns the decoded frames of a ready store as a read-only memory map of shape
+    (frames, height, width, 3). Slicing it reads straight from the page cache without copying.
+    """
+    frames = np.load(os.path.join(get_frame_store_root(), store.file_path), mmap_mode='r')
+    return frames[:store.frame_count]
+
+
+def frames_for_step(step_id):
+    """Yields (patient_file_id, frames) for every ready store recorded for a RecordingStep."""
+    for store in FrameStore.objects.filter(step_id=step_id, status='ready').order_by('patient_file_id'):
+        yield store.patient_file_id_id, open_frames(store)
+
+
+def frames_for_patient_file(patient_file_id):
+    store = FrameStore.objects.filter(patient_file_id=patient_file_id, status='ready').first()
+    return open_frames(store) if store else None
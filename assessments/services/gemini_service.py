@@ -0,0 +1,156 @@
+# assessments/services/gemini_service.py
+
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .analysis_backends import get_analysis_backend
+from .circuit_breaker import ProviderUnavailable, get_provider_guard
+from .prescoring_service import prescore_answers
+from .prompt_builder import build_prompt, get_token_budget, record_prompt
+from .rate_limit import RateLimitTimeout, get_provider_limiter
+from .summary_cache_service import cached_summary, count_bypass, lookup_summary, store_summary, summary_cache_enabled
+
+PROMPT_VERSION = "3" # Bump whenever prompt_builder's output changes, so cached summaries are not reused
+
+AnalysisResult = namedtuple('AnalysisResult', ['summary', 'cache_hit', 'fallback', 'prompt_tokens'], defaults=(None,))
+
+def format_domain_scores(prescore):
+    return "; ".join(
+        f"{domain}: score {scores['score']:.2f}, correct {scores['correct']}/{scores['questions']}"
+        for domain, scores in prescore['domains'].items()
+    )
+
+def prompt_cache_version():
+    # The token budget decides which answers reach the model, so it is part of the prompt version
+    return f"{PROMPT_VERSION}:{get_token_budget()}"
+
+def backend_cache_name(backend):
+    return f"{type(backend).__name__}:{backend.model_name}"
+
+def wait_for_provider(backend, timeout):
+    """
+    Takes a token from the provider's rate limit, waiting at most timeout seconds, and returns
+    what is left of timeout for the call itself. Raises RateLimitTimeout, which the guard counts
+    as a failed attempt, rather than blocking past the attempt's deadline.
+    """
+    limiter = get_provider_limiter(type(backend).__name__)
+    if limiter is None:
+        return timeout
+    started = time.monotonic()
+    if not limiter.acquire(timeout=timeout):
+        raise RateLimitTimeout(f"{type(backend).__name__}: no rate limit slot within {timeout:.1f}s")
+    return timeout - (time.monotonic() - started)
+
+def generate_autism_analysis(user_answers, backend=None, prompt=None):
+    """
+    Sends the prompt to the configured ANALYSIS_BACKEND and returns the summary text.
+    Calls go through the provider's circuit breaker, deadline and retries; raises ProviderUnavailable.
+    """
+    backend = backend or get_analysis_backend()
+    prompt = prompt or build_prompt(user_answers)
+    record_prompt(prompt)
+
+    def attempt(timeout):
+        timeout = wait_for_provider(backend, timeout)
+        return backend.generate(prompt.text, timeout=timeout, system_instruction=prompt.system_instruction)
+
+    return get_provider_guard(type(backend).__name__).call(attempt)
+
+def local_fallback_summary(user_answers):
+    """Cheap summary built without the model, used while the provider is unavailable."""
+    answered = sum(1 for answer in user_answers.values() if str(answer).strip())
+    return (
+        f"A detailed summary could not be generated right now. {answered} of {len(user_answers)} questions were answered, "
+        "and the responses have been saved, so a full summary can be created later. "
+        f"Answer scores by area: {format_domain_scores(prescore_answers(user_answers))}. "
+        "This tool is for informational purposes only and is not a substitute for professional medical advice, "
+        "diagnosis, or treatment. Please discuss any concerns with a qualified healthcare professional, such as a "
+        "doctor, psychologist, or developmental specialist."
+    )
+
+def fallback_enabled():
+    return getattr(settings, 'ANALYSIS_FALLBACK_ENABLED', True)
+
+class AnalysisStream:
+    """Iterable of summary pieces; cache_hit and fallback describe where the text came from."""
+
+    def __init__(self, pieces=None, cache_hit=False, prompt_tokens=None):
+        self.pieces = pieces
+        self.cache_hit = cache_hit
+        self.fallback = False
+        self.prompt_tokens = prompt_tokens
+
+    def __iter__(self):
+        return iter(self.pieces)
+
+def stream_autism_analysis(user_answers, bypass_cache=False):
+    """
+    Returns an AnalysisStream that yields the summary in pieces as the backend produces them.
+    A cached summary, or the local fallback when the provider is unavailable before anything
+    was produced, comes back as a single piece. Model output is cached once the stream ends.
+    """
+    backend = get_analysis_backend()
+    cache_name = backend_cache_name(backend)
+    use_cache = summary_cache_enabled()
+    if bypass_cache or not use_cache:
+        count_bypass()
+    else:
+        summary = lookup_summary(user_answers, prompt_cache_version(), cache_name)
+        if summary is not None:
+            return AnalysisStream([summary], cache_hit=True)
+
+    prompt = build_prompt(user_answers)
+    record_prompt(prompt)
+    stream = AnalysisStream(prompt_tokens=prompt.tokens)
+
+    def attempt(timeout):
+        timeout = wait_for_provider(backend, timeout)
+        return backend.stream(prompt.text, timeout=timeout, system_instruction=prompt.system_instruction)
+
+    def pieces():
+        produced = []
+        try:
+            for piece in get_provider_guard(type(backend).__name__).stream(attempt):
+                produced.append(piece)
+                yield piece
+        except ProviderUnavailable:
+            if produced or not fallback_enabled():
+                raise
+            stream.fallback = True
+            yield local_fallback_summary(user_answers)
+            return
+        if use_cache:
+            store_summary(user_answers, ''.join(produced), prompt_cache_version(), cache_name)
+
+    stream.pieces = pieces()
+    return stream
+
+def analyze_with_cache(user_answers, bypass_cache=False):
+    """
+    Returns an AnalysisResult; identical answer sets reuse the stored summary. When the provider
+    is unavailable the local fallback summary is returned (never cached) unless disabled.
+    prompt_tokens is the estimated size of the request sent to the model, None on a cache hit.
+    """
+    backend = get_analysis_backend()
+    prompts = []  # Built only on a cache miss
+
+    def generate(answers):
+        prompts.append(build_prompt(answers))
+        return generate_autism_analysis(answers, backend=backend, prompt=prompts[-1])
+
+    try:
+        summary, cache_hit = cached_summary(
+            user_answers,
+            generate,
+            prompt_cache_version(),
+            backend_cache_name(backend),
+            bypass=bypass_cache,
+        )
+    except ProviderUnavailable as e:
+        if not fallback_enabled():
+            raise
+        print(f"Analysis provider unavailable, using fallback summary: {e}")
+        return AnalysisResult(local_fallback_summary(user_answers), False, True, prompts[-1].tokens if prompts else None)
+    return AnalysisResult(summary, cache_hit, False, prompts[-1].tokens if prompts else None)
@@ -0,0 +1,86 @@
+# assessments/services/inference_cache.py
+
+from django.conf import settings
+from django.utils import timezone
+
+from assessments.models import InferenceResult
+
+DEFAULT_MAX_ENTRIES = 200000
+EVICT_CHUNK_SIZE = 1000
+
+
+class InferenceCache:
+    """
+    Persistent model results keyed on (content hash, model name, model version).
+    Identical media scored by the same model version is never run twice; bumping a
+    model's version makes its old entries unreachable until they are invalidated.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or getattr(settings, 'INFERENCE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model, content_hashes):
+        """Returns {content_hash: response} for the cached subset and refreshes their LRU timestamp."""
+        content_hashes = set(content_hashes)
+        if not content_hashes:
+            return {}
+        found = dict(
+            InferenceResult.objects.filter(
+                model_name=model.name, model_version=model.version, content_hash__in=content_hashes
+            ).values_list('content_hash', 'model_response')
+        )
+        if found:
+            InferenceResult.objects.filter(
+                model_name=model.name, model_version=model.version, content_hash__in=found
+            ).update(last_used_at=timezone.now())
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def set_many(self, model, responses):
+        """Stores {content_hash: response}; existing entries are left as they are."""
+        InferenceResult.objects.bulk_create(
+            [
+                InferenceResult(content_hash=content_hash, model_name=model.name, model_version=model.version, model_response=response)
+                for content_hash, response in responses.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+    def invalidate(self, model_name, keep_version=None):
+        """Drops a model's entries, or only those from versions other than keep_version. Returns the number deleted."""
+        queryset = InferenceResult.objects.filter(model_name=model_name)
+        if keep_version is not None:
+            queryset = queryset.exclude(model_version=str(keep_version))
+        return queryset.delete()[0]
+
+    def invalidate_stale_versions(self, registry):
+        """Drops entries written by earlier versions of every registered model."""
+        return sum(self.invalidate(name, keep_version=registry.get(name).version) for name in registry.names())
+
+    def evict(self):
+        """Deletes least recently used entries until the cache is back under max_entries. Returns the number deleted."""
+        excess = InferenceResult.objects.count() - self.max_entries
+        deleted = 0
+        while excess > 0:
+            ids = list(
+                InferenceResult.objects.order_by('last_used_at').values_list('id', flat=True)[:min(excess, EVICT_CHUNK_SIZE)]
+            )
+            if not ids:
+                break
+            InferenceResult.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            excess -= len(ids)
+        return deleted
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': InferenceResult.objects.count(),
+            'max_entries': self.max_entries,
+        }
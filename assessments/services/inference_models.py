@@ -0,0 +1,29 @@
+# assessments/services/inference_models.py
+#
+# Local CPU model callables for the inference engine. Each takes a list of inputs
+# (decoded frame arrays of shape (frames, height, width, 3)) and returns one response per input.
+
+import numpy as np
+
+FRAMES_PER_CHUNK = 32  # Frames widened to int16 at a time, so a memmapped video is never copied whole
+
+
+def dummy_cpu_model(batch):
+    """
+    Stand-in model for benchmarks and wiring checks: mean absolute difference between
+    consecutive frames ("motion energy"). Pure NumPy, no weights, deterministic.
+    """
+    responses = []
+    for frames in batch:
+        if len(frames) < 2:
+            responses.append('motion_energy=0.0000')
+            continue
+        # int16 avoids uint8 wrap-around. Casting copies, so it happens one slice of the memmap
+        # at a time; each slice overlaps the next by one frame to keep every consecutive pair
+        total = 0.0
+        for start in range(0, len(frames) - 1, FRAMES_PER_CHUNK):
+            chunk = frames[start:start + FRAMES_PER_CHUNK + 1].astype(np.int16)
+            total += np.abs(np.diff(chunk, axis=0)).sum(dtype=np.float64)
+        mean = total / ((len(frames) - 1) * frames[0].size)
+        responses.append(f'motion_energy={mean / 255.0:.4f}')
+    return responses
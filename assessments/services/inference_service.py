@@ -0,0 +1,222 @@
+# assessments/services/inference_service.py
+
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from assessments.models import PatientFile
+from .frame_store_service import open_frames
+from .inference_models import dummy_cpu_model
+
+DEFAULT_BATCH_SIZE = 8
+LOOKUP_CHUNK_SIZE = 500
+MODEL_RESPONSE_MAX_LENGTH = 255
+
+
+class LocalModel:
+    """A registered model: a CPU callable mapping a batch of inputs to one response string each."""
+
+    def __init__(self, name, predict, version='1', batch_size=DEFAULT_BATCH_SIZE):
+        self.name = name
+        self.predict = predict
+        self.version = str(version)
+        self.batch_size = batch_size
+
+    def __repr__(self):
+        return f'<LocalModel {self.name} v{self.version}>'
+
+
+class ModelRegistry:
+    """Maps AssessmentScenario.model_name strings to local model callables."""
+
+    def __init__(self):
+        self._models = {}
+
+    def register(self, name, predict, version='1', batch_size=DEFAULT_BATCH_SIZE):
+        self._models[name] = LocalModel(name, predict, version=version, batch_size=batch_size)
+        return self._models[name]
+
+    def get(self, name):
+        return self._models.get(name)
+
+    def names(self):
+        return sorted(self._models)
+
+    def __contains__(self, name):
+        return name in self._models
+
+
+def build_registry():
+    """
+    Registry from the INFERENCE_MODELS setting, e.g.
+    {'joint_attention_model': {'CALLABLE': 'myproject.models.joint_attention', 'VERSION': '3', 'BATCH_SIZE': 16}}.
+    The dummy CPU model is always available for benchmarks.
+    """
+    registry = ModelRegistry()
+    registry.register('dummy_cpu_model', dummy_cpu_model)
+    for name, config in getattr(settings, 'INFERENCE_MODELS', {}).items():
+        registry.register(
+            name,
+            import_string(config['CALLABLE']),
+            version=config.get('VERSION', '1'),
+            batch_size=config.get('BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        )
+    return registry
+
+
+class ModelMetrics:
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.batch_latencies = []
+
+    def record(self, batch_size, seconds):
+        self.items += batch_size
+        self.batches += 1
+        self.busy_seconds += seconds
+        self.batch_latencies.append(seconds)
+
+    def summary(self):
+        if not self.batches:
+            return {'items': 0, 'batches': 0}
+        latencies_ms = np.array(self.batch_latencies) * 1000
+        return {
+            'items': self.items,
+            'batches': self.batches,
+            'throughput_per_s': self.items / self.busy_seconds if self.busy_seconds else 0.0,
+            'batch_latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+            'batch_latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+            'item_latency_mean_ms': float(latencies_ms.sum() / self.items),
+        }
+
+
+class MicroBatcher:
+    """
+    Buffers (key, input) pairs per model and runs a model call whenever a buffer reaches
+    that model's batch size, so work from different assessments shares the same calls.
+    """
+
+    def __init__(self, registry, on_results):
+        self.registry = registry
+        self.on_results = on_results  # Called with (model, [(key, response), ...]) after every batch
+        self.metrics = defaultdict(ModelMetrics)
+        self._buffers = defaultdict(list)
+
+    def add(self, model_name, key, model_input):
+        model = self.registry.get(model_name)
+        buffer = self._buffers[model_name]
+        buffer.append((key, model_input))
+        if len(buffer) >= model.batch_size:
+            self._run(model, buffer)
+            self._buffers[model_name] = []
+
+    def flush(self):
+        for model_name, buffer in self._buffers.items():
+            if buffer:
+                self._run(self.registry.get(model_name), buffer)
+        self._buffers.clear()
+
+    def _run(self, model, buffer):
+        keys = [key for key, _ in buffer]
+        started = time.perf_counter()
+        responses = model.predict([model_input for _, model_input in buffer])
+        self.metrics[model.name].record(len(buffer), time.perf_counter() - started)
+        self.on_results(model, list(zip(keys, responses)))
+
+    def metrics_summary(self):
+        return {name: metrics.summary() for name, metrics in self.metrics.items()}
+
+
+class InferenceEngine:
+    """
+    Fills PatientFile.model_name/model_response for files whose frames have been extracted.
+    Pending files are read in id-ordered chunks; each chunk is first looked up in the result
+    cache, and only the misses are micro-batched per scenario model across assessments.
+    Every batch is written back with one bulk_update.
+    """
+
+    def __init__(self, registry=None, cache=None):
+        self.registry = registry or build_registry()
+        self.cache = cache
+        self.skipped = 0
+        self.cache_hits = 0
+
+    def pending_files(self, model_names=None, rescore=False, assessment_ids=None):
+        queryset = (
+            PatientFile.objects.filter(framestore__status='ready')
+            .annotate(scenario_model=F('assessment_id__as_id__model_name'), content_hash=F('blob_id__sha256'))
+            .select_related('framestore')
+            .order_by('id')
+        )
+        if not rescore:
+            queryset = queryset.filter(model_response='')
+        if model_names:
+            queryset = queryset.filter(assessment_id__as_id__model_name__in=model_names)
+        if assessment_ids:
+            queryset = queryset.filter(assessment_id__in=assessment_ids)
+        return queryset
+
+    def save_responses(self, model, results):
+        files = []
+        for patient_file, response in results:
+            patient_file.model_name = model.name
+            patient_file.model_response = str(response)[:MODEL_RESPONSE_MAX_LENGTH]
+            patient_file.updated_at = timezone.now()
+            files.append(patient_file)
+        PatientFile.objects.bulk_update(files, ['model_name', 'model_response', 'updated_at'])
+
+    def write_results(self, model, results):
+        self.save_responses(model, results)
+        if self.cache is not None:
+            self.cache.set_many(model, {
+                patient_file.content_hash: str(response)[:MODEL_RESPONSE_MAX_LENGTH]
+                for patient_file, response in results if patient_file.content_hash
+            })
+
+    def score_chunk(self, batcher, files):
+        by_model = defaultdict(list)
+        for patient_file in files:
+            if patient_file.scenario_model not in self.registry:
+                self.skipped += 1
+                continue
+            by_model[patient_file.scenario_model].append(patient_file)
+
+        for model_name, model_files in by_model.items():
+            model = self.registry.get(model_name)
+            cached = {}
+            if self.cache is not None:
+                cached = self.cache.get_many(model, [f.content_hash for f in model_files if f.content_hash])
+            hits = [(f, cached[f.content_hash]) for f in model_files if f.content_hash in cached]
+            if hits:
+                self.save_responses(model, hits)
+                self.cache_hits += len(hits)
+            for patient_file in model_files:
+                if patient_file.content_hash not in cached:
+                    batcher.add(model_name, patient_file, open_frames(patient_file.framestore))
+
+    def run(self, model_names=None, limit=None, rescore=False, assessment_ids=None):
+        """Scores pending files (or every extracted file with rescore=True). Returns per-model metrics."""
+        batcher = MicroBatcher(self.registry, self.write_results)
+        queryset = self.pending_files(model_names, rescore=rescore, assessment_ids=assessment_ids)
+        last_id = 0
+        remaining = limit
+        # Keyset pagination instead of a long-lived cursor, since rows are updated as we go
+        while remaining is None or remaining > 0:
+            size = LOOKUP_CHUNK_SIZE if remaining is None else min(LOOKUP_CHUNK_SIZE, remaining)
+            files = list(queryset.filter(id__gt=last_id)[:size])
+            if not files:
+                break
+            self.score_chunk(batcher, files)
+            last_id = files[-1].id
+            if remaining is not None:
+                remaining -= len(files)
+        batcher.flush()
+        if self.cache is not None:
+            self.cache.evict()
+        return batcher.metrics_summary()
@@ -0,0 +1,105 @@
+# assessments/services/llm_client.py
+
+import threading
+
+from django.conf import settings
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+
+class GeminiClientManager:
+    """
+    Process-wide Gemini client.
+
+    google.generativeai is imported and configured once, on first use, and GenerativeModel
+    handles are kept per model name. genai.configure() throws away the library's cached
+    service clients, so calling it per request meant a new transport (and a new TLS
+    connection) for every analysis; here the transport and its connection pool are reused.
+    """
+
+    def __init__(self, api_key=None, transport=None, api_endpoint=None, timeout=None):
+        self.api_key = api_key
+        self.transport = transport
+        self.api_endpoint = api_endpoint
+        self.timeout = timeout
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        import google.generativeai as genai  # Heavy import, deferred until the first call
+
+        client_options = {}
+        endpoint = self.api_endpoint or getattr(settings, 'GEMINI_API_ENDPOINT', None)
+        if endpoint:
+            client_options['api_endpoint'] = endpoint
+        genai.configure(
+            api_key=self.api_key or settings.GEMINI_API_KEY,
+            transport=self.transport or getattr(settings, 'GEMINI_TRANSPORT', None),
+            client_options=client_options or None,
+        )
+        self._genai = genai
+
+    def get_model(self, model_name=DEFAULT_MODEL_NAME, system_instruction=None):
+        # One handle per (model, system instruction): the instruction is converted to its
+        # request form once instead of on every call
+        key = (model_name, system_instruction)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            if self._genai is None:
+                self._configure()
+            if key not in self._models:
+                self._models[key] = self._genai.GenerativeModel(model_name, system_instruction=system_instruction)
+            return self._models[key]
+
+    def get_timeout(self):
+        return self.timeout or getattr(settings, 'GEMINI_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)
+
+    def generate_text(self, prompt, model_name=DEFAULT_MODEL_NAME, timeout=None, system_instruction=None):
+        model = self.get_model(model_name, system_instruction)
+        response = model.generate_content(prompt, request_options={'timeout': timeout or self.get_timeout()})
+        return response.text
+
+    def stream_text(self, prompt, model_name=DEFAULT_MODEL_NAME, timeout=None, system_instruction=None):
+        """Yields the response text in pieces as the model produces them."""
+        model = self.get_model(model_name, system_instruction)
+        response = model.generate_content(prompt, stream=True, request_options={'timeout': timeout or self.get_timeout()})
+        for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+
+    def warm_up(self, model_name=DEFAULT_MODEL_NAME, system_instruction=None):
+        """Does the import, configuration and client construction ahead of the first request."""
+        self.get_model(model_name, system_instruction)
+        from google.generativeai import client
+        client.get_default_generative_client()
+
+    def reset(self):
+        with self._lock:
+            self._genai = None
+            self._models = {}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_llm_client():
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = GeminiClientManager()
+    return _manager
+
+
+def warm_up_llm_client():
+    try:
+        from .prompt_builder import SYSTEM_INSTRUCTION
+        get_llm_client().warm_up(system_instruction=SYSTEM_INSTRUCTION)
+    except Exception as e:
+        # Never keep a worker from starting; the first request will retry
+        print(f"LLM client warm-up failed: {e}")
@@ -0,0 +1,143 @@
+# assessments/services/llm_stub_server.py
+#
+# Minimal local stand-in for LLM providers, for benchmarks and load tests without network:
+# - POST /v1beta/models/<model>:generateContent / :streamGenerateContent answer like the Gemini REST API,
+# - POST /v1/generate answers {"text": ...} for HTTPBackend, or NDJSON deltas with {"stream": true}.
+# Latency and error rate are configurable. Standard library only.
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .stub_summary import STUB_SUMMARY
+
+
+def stub_tokens():
+    """STUB_SUMMARY split into word-sized deltas that concatenate back to the full text."""
+    words = STUB_SUMMARY.split(' ')
+    return [word + ' ' for word in words[:-1]] + [words[-1]]
+
+
+def gemini_response(text):
+    return {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP', 'index': 0}]}
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = set()
+
+    def record(self, client_address):
+        with self.lock:
+            self.requests += 1
+            self.connections.add(client_address)
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.connections = set()
+
+    def snapshot(self):
+        with self.lock:
+            return {'requests': self.requests, 'connections': len(self.connections)}
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse shows up in the stats
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes; avoid the delayed-ACK stall
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        self.server.stats.record(self.client_address)
+        delay, fail = self.server.next_outcome()
+        time.sleep(delay)
+
+        if self.path.startswith('/v1/generate'):
+            if fail:
+                self.send_json(503, {'error': 'stub failure'})
+                return
+            try:
+                stream = bool(json.loads(body or b'{}').get('stream'))
+            except ValueError:
+                stream = False
+            if stream:
+                # NDJSON, one {"text": delta} per line
+                self.send_chunked([json.dumps({'text': token}) + '\n' for token in stub_tokens()], 'application/x-ndjson')
+            else:
+                self.send_json(200, {'text': STUB_SUMMARY})
+            return
+        if ':generateContent' not in self.path and ':streamGenerateContent' not in self.path:
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+            return
+        if fail:
+            self.send_json(503, {'error': {'code': 503, 'message': 'Stub failure', 'status': 'UNAVAILABLE'}})
+            return
+        if ':streamGenerateContent' in self.path:
+            # The REST transport reads a JSON array of partial responses as it arrives
+            parts = [json.dumps(gemini_response(token)) for token in stub_tokens()]
+            self.send_chunked(['[' + parts[0]] + [',' + part for part in parts[1:]] + [']'], 'application/json')
+            return
+        self.send_json(200, {
+            **gemini_response(STUB_SUMMARY),
+            'usageMetadata': {'promptTokenCount': length // 4, 'candidatesTokenCount': len(STUB_SUMMARY) // 4},
+        })
+
+    def send_chunked(self, pieces, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+            if self.server.token_ms:
+                time.sleep(self.server.token_ms / 1000.0)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None, token_ms=0):
+        super().__init__((host, port), StubGeminiHandler)
+        self.stats = StubStats()
+        self.token_ms = token_ms  # Delay between streamed chunks
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def next_outcome(self):
+        """(seconds to wait, whether to fail) for the next request."""
+        with self._random_lock:
+            delay_ms = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            return delay_ms / 1000.0, self._random.random() < self.error_rate
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None, token_ms=0):
+    """Starts the stub on a background thread and returns the server (call shutdown() when done)."""
+    server = StubGeminiServer(host, port, latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, seed=seed, token_ms=token_ms)
+    threading.Thread(target=server.serve_forever, name='llm-stub-server', daemon=True).start()
+    return server
@@ -0,0 +1,298 @@
+# assessments/services/media_probe.py
+#
+# Runs inside media worker processes, so it must stay free of Django imports.
+# Container headers are parsed straight from a memory-mapped file: only the pages holding
+# the moov box (MP4/MOV) or the Segment Info/Tracks elements (Matroska/WebM) are touched,
+# and no decoder is initialized. OpenCV is only loaded when header parsing fails.
+
+import mmap
+import os
+import struct
+
+MP4_CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMESTAMP_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_DEFAULT_DURATION = 0x23E383
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+
+
+class ContainerParseError(Exception):
+    """The file is not a supported container or its headers are incomplete."""
+
+
+def fourcc_to_str(value):
+    code = int(value)
+    if code <= 0:
+        return ''
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00').strip()
+
+
+# --- MP4 / MOV ---
+
+def iter_mp4_boxes(buf, start, end):
+    """Yields (type, payload_start, box_end) for the boxes in buf[start:end]."""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise ContainerParseError("Truncated 64-bit box header.")
+            size = struct.unpack_from('>Q', buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ContainerParseError(f"Invalid size for box {box_type!r}.")
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def read_mp4_time_header(buf, offset):
+    """Parses the version-dependent (timescale, duration) pair shared by mvhd and mdhd."""
+    version = buf[offset]
+    if version == 1:
+        return struct.unpack_from('>IQ', buf, offset + 20)
+    return struct.unpack_from('>II', buf, offset + 12)
+
+
+def parse_mp4_track(buf, start, end):
+    track = {}
+    for box_type, payload, box_end in iter_mp4_boxes(buf, start, end):
+        if box_type == b'tkhd':
+            # Width and height are 16.16 fixed point at the end of the box
+            width, height = struct.unpack_from('>II', buf, box_end - 8)
+            track['width'], track['height'] = width >> 16, height >> 16
+        elif box_type == b'hdlr':
+            track['handler'] = bytes(buf[payload + 8:payload + 12])
+        elif box_type == b'mdhd':
+            track['timescale'], track['duration'] = read_mp4_time_header(buf, payload)
+        elif box_type == b'stsd':
+            entry_count = struct.unpack_from('>I', buf, payload + 4)[0]
+            if entry_count:
+                track['codec'] = bytes(buf[payload + 12:payload + 16]).decode('latin-1').strip()
+        elif box_type == b'stts':
+            entry_count = struct.unpack_from('>I', buf, payload + 4)[0]
+            counts = struct.unpack_from(f'>{entry_count * 2}I', buf, payload + 8)
+            track['sample_count'] = sum(counts[0::2])
+        elif box_type in MP4_CONTAINER_BOXES:
+            track.update(parse_mp4_track(buf, payload, box_end))
+    return track
+
+
+def parse_mp4(buf):
+    moov = next(((payload, box_end) for box_type, payload, box_end in iter_mp4_boxes(buf, 0, len(buf)) if box_type == b'moov'), None)
+    if moov is None:
+        raise ContainerParseError("No moov box found.")
+
+    movie_duration = None
+    video = None
+    for box_type, payload, box_end in iter_mp4_boxes(buf, *moov):
+        if box_type == b'mvhd':
+            timescale, duration = read_mp4_time_header(buf, payload)
+            if timescale:
+                movie_duration = duration / timescale
+        elif box_type == b'trak' and video is None:
+            track = parse_mp4_track(buf, payload, box_end)
+            if track.get('handler') == b'vide':
+                video = track
+
+    if video is None:
+        raise ContainerParseError("No video track found.")
+    track_duration = video['duration'] / video['timescale'] if video.get('timescale') else 0.0
+    duration = movie_duration or track_duration
+    if not duration:
+        # Fragmented files keep timing in moof boxes; leave those to the fallback
+        raise ContainerParseError("Movie header has no duration.")
+
+    frame_count = video.get('sample_count', 0)
+    # Averaging over the sample table stays correct for variable frame rate phone recordings
+    fps = frame_count / track_duration if track_duration else 0.0
+    return {
+        'duration_seconds': duration,
+        'fps': fps,
+        'frame_count': frame_count,
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+        'codec': video.get('codec', ''),
+        'source': 'mp4',
+    }
+
+
+# --- Matroska / WebM ---
+
+def read_vint(buf, offset, keep_marker=False):
+    """Reads an EBML variable-length integer. Returns (value, length); value is None for 'unknown size'."""
+    if offset >= len(buf):
+        raise ContainerParseError("Unexpected end of file.")
+    first = buf[offset]
+    length = 9 - first.bit_length()
+    if length > 8 or offset + length > len(buf):
+        raise ContainerParseError("Invalid EBML variable-length integer.")
+    value = int.from_bytes(buf[offset:offset + length], 'big')
+    if keep_marker:
+        return value, length
+    value &= (1 << (7 * length)) - 1
+    if value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+def iter_ebml_elements(buf, start, end):
+    """Yields (element_id, data_start, data_end) for elements in buf[start:end]."""
+    offset = start
+    while offset < end:
+        element_id, id_length = read_vint(buf, offset, keep_marker=True)
+        size, size_length = read_vint(buf, offset + id_length)
+        data_start = offset + id_length + size_length
+        data_end = end if size is None else data_start + size
+        if data_end > end:
+            raise ContainerParseError(f"Element {element_id:#x} overruns its parent.")
+        yield element_id, data_start, data_end
+        offset = data_end
+
+
+def read_ebml_uint(buf, start, end):
+    return int.from_bytes(buf[start:end], 'big')
+
+
+def read_ebml_float(buf, start, end):
+    if end - start == 4:
+        return struct.unpack_from('>f', buf, start)[0]
+    if end - start == 8:
+        return struct.unpack_from('>d', buf, start)[0]
+    raise ContainerParseError("Invalid EBML float size.")
+
+
+def parse_matroska_track(buf, start, end):
+    track = {}
+    for element_id, data_start, data_end in iter_ebml_elements(buf, start, end):
+        if element_id == MKV_TRACK_TYPE:
+            track['type'] = read_ebml_uint(buf, data_start, data_end)
+        elif element_id == MKV_CODEC_ID:
+            track['codec'] = bytes(buf[data_start:data_end]).decode('ascii', 'replace').rstrip('\x00')
+        elif element_id == MKV_DEFAULT_DURATION:
+            track['default_duration'] = read_ebml_uint(buf, data_start, data_end)
+        elif element_id == MKV_VIDEO:
+            for video_id, video_start, video_end in iter_ebml_elements(buf, data_start, data_end):
+                if video_id == MKV_PIXEL_WIDTH:
+                    track['width'] = read_ebml_uint(buf, video_start, video_end)
+                elif video_id == MKV_PIXEL_HEIGHT:
+                    track['height'] = read_ebml_uint(buf, video_start, video_end)
+    return track
+
+
+def parse_matroska(buf):
+    elements = iter_ebml_elements(buf, 0, len(buf))
+    element_id, data_start, data_end = next(elements)
+    if element_id != EBML_HEADER:
+        raise ContainerParseError("Missing EBML header.")
+    doc_type = b''
+    for child_id, child_start, child_end in iter_ebml_elements(buf, data_start, data_end):
+        if child_id == EBML_DOCTYPE:
+            doc_type = bytes(buf[child_start:child_end])
+
+    segment = next(((s, e) for element_id, s, e in elements if element_id == MKV_SEGMENT), None)
+    if segment is None:
+        raise ContainerParseError("No Segment element found.")
+
+    timestamp_scale = 1000000
+    duration = None
+    video = None
+    for element_id, data_start, data_end in iter_ebml_elements(buf, *segment):
+        if element_id == MKV_INFO:
+            for info_id, info_start, info_end in iter_ebml_elements(buf, data_start, data_end):
+                if info_id == MKV_TIMESTAMP_SCALE:
+                    timestamp_scale = read_ebml_uint(buf, info_start, info_end)
+                elif info_id == MKV_DURATION:
+                    duration = read_ebml_float(buf, info_start, info_end)
+        elif element_id == MKV_TRACKS:
+            for entry_id, entry_start, entry_end in iter_ebml_elements(buf, data_start, data_end):
+                if entry_id == MKV_TRACK_ENTRY:
+                    track = parse_matroska_track(buf, entry_start, entry_end)
+                    if track.get('type') == 1 and video is None:
+                        video = track
+        elif element_id == MKV_CLUSTER:
+            # Headers always precede the media clusters; never walk the frame data
+            break
+        if duration is not None and video is not None:
+            break
+
+    if video is None:
+        raise ContainerParseError("No video track found.")
+    if not duration:
+        # Live recordings (e.g. MediaRecorder) often omit Duration
+        raise ContainerParseError("Segment info has no duration.")
+
+    duration_seconds = duration * timestamp_scale / 1e9
+    fps = 1e9 / video['default_duration'] if video.get('default_duration') else 0.0
+    return {
+        'duration_seconds': duration_seconds,
+        'fps': fps,
+        'frame_count': int(round(duration_seconds * fps)),
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+        'codec': video.get('codec', ''),
+        'source': doc_type.decode('ascii', 'replace') or 'matroska',
+    }
+
+
+def probe_container(path):
+    """Reads media metadata from container headers only. Raises ContainerParseError if that is not possible."""
+    if os.path.getsize(path) < 8:
+        raise ContainerParseError("File is too small to be a media container.")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            if buf[:4] == b'\x1a\x45\xdf\xa3':
+                return parse_matroska(buf)
+            if buf[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                return parse_mp4(buf)
+        except (struct.error, IndexError, ValueError, StopIteration) as e:
+            raise ContainerParseError(f"Malformed container: {e}") from e
+    raise ContainerParseError("Unrecognized container format.")
+
+
+def probe_with_opencv(path):
+    """Full decoder-based probe. Slower, but copes with containers the header parser does not handle."""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Could not open media file: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return {
+            'duration_seconds': frame_count / fps if fps > 0 else 0.0,
+            'fps': fps,
+            'frame_count': int(frame_count),
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'codec': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+            'source': 'opencv',
+        }
+    finally:
+        cap.release()
+
+
+def probe_media(path):
+    """
+    Reads duration, fps, resolution and codec of a video file.
+    Returns a metadata dict; raises ValueError when the file cannot be read at all.
+    """
+    try:
+        return probe_container(path)
+    except ContainerParseError:
+        return probe_with_opencv(path)
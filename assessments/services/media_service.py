@@ -0,0 +1,90 @@
+# assessments/services/media_service.py
+
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from assessments.models import PatientFile
+from .blob_service import get_media_storage
+from .media_probe import probe_media
+
+DEFAULT_MEDIA_WORKERS = 2
+DEFAULT_STALE_AFTER = datetime.timedelta(minutes=15)
+
+
+def initial_media_status(content_type):
+    """Videos wait for the media worker; other files have nothing to probe."""
+    return 'pending' if content_type.startswith('video/') else 'ready'
+
+
+def patient_file_status_payload(patient_file):
+    return {
+        'id': patient_file.id,
+        'step_id': patient_file.step_id_id,
+        'file_path': patient_file.file_path,
+        'media_status': patient_file.media_status,
+        'duration': str(patient_file.duration),
+        'media_metadata': patient_file.media_metadata,
+    }
+
+
+def create_media_executor(max_workers=None):
+    """
+    Process pool for probing. Spawned (not forked) children avoid inheriting
+    the parent's DB connections and OpenCV thread state.
+    """
+    max_workers = max_workers or getattr(settings, 'MEDIA_WORKER_PROCESSES', DEFAULT_MEDIA_WORKERS)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def claim_pending_files(limit, assessment_id=None):
+    """Marks up to `limit` pending files as processing and returns them. Safe to run from several workers."""
+    queryset = PatientFile.objects.select_for_update(skip_locked=True).filter(media_status='pending')
+    if assessment_id is not None:
+        queryset = queryset.filter(assessment_id=assessment_id)
+    with transaction.atomic():
+        files = list(queryset.order_by('id')[:limit])
+        if files:
+            PatientFile.objects.filter(id__in=[f.id for f in files]).update(
+                media_status='processing', updated_at=timezone.now()
+            )
+    return files
+
+
+def requeue_stale_files(stale_after=DEFAULT_STALE_AFTER):
+    """Puts files left in processing by a crashed worker back in the queue."""
+    cutoff = timezone.now() - stale_after
+    return PatientFile.objects.filter(media_status='processing', updated_at__lt=cutoff).update(media_status='pending')
+
+
+def apply_probe_result(patient_file, metadata):
+    patient_file.media_metadata = metadata
+    patient_file.duration = datetime.timedelta(seconds=int(metadata.get('duration_seconds') or 0))
+    patient_file.media_status = 'ready'
+    patient_file.save(update_fields=['media_metadata', 'duration', 'media_status', 'updated_at'])
+
+
+def mark_probe_failed(patient_file, error):
+    patient_file.media_metadata = {'error': str(error)}
+    patient_file.media_status = 'failed'
+    patient_file.save(update_fields=['media_metadata', 'media_status', 'updated_at'])
+
+
+def process_pending_media(executor, batch_size=10, assessment_id=None):
+    """Claims a batch of pending files, probes them in the process pool and stores the results. Returns the batch size."""
+    files = claim_pending_files(batch_size, assessment_id=assessment_id)
+    storage = get_media_storage()
+    futures = {
+        executor.submit(probe_media, storage.path(patient_file.file_path)): patient_file
+        for patient_file in files
+    }
+    for future, patient_file in futures.items():
+        try:
+            apply_probe_result(patient_file, future.result())
+        except Exception as e:
+            mark_probe_failed(patient_file, e)
+    return len(files)
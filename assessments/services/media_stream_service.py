@@ -0,0 +1,203 @@
+# assessments/services/media_stream_service.py
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from assessments.models import PatientFile
+from .blob_service import get_media_storage
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 512 * 1024
+BLOB_CACHE_CONTROL = 'private, max-age=86400, immutable'  # Blob content never changes under its name
+FILE_CACHE_CONTROL = 'private, no-cache'
+STREAM_TOKEN_SALT = 'assessments.patient-file-stream'
+DEFAULT_STREAM_URL_TTL_SECONDS = 15 * 60
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def get_stream_url_ttl():
+    return getattr(settings, 'PATIENT_FILE_STREAM_URL_TTL_SECONDS', DEFAULT_STREAM_URL_TTL_SECONDS)
+
+
+def viewable_patient_files(user):
+    """Patients can stream their own files, staff any file."""
+    patient_files = PatientFile.objects.all()
+    if not user.is_staff:
+        patient_files = patient_files.filter(assessment_id__patient_id=user)
+    return patient_files
+
+
+def sign_stream_token(patient_file):
+    """
+    Token for a `?token=` stream link. <video>/<audio> elements can't send an Authorization
+    header, so the player gets a link that names one file and expires after get_stream_url_ttl().
+    """
+    return signing.dumps(patient_file.pk, salt=STREAM_TOKEN_SALT)
+
+
+def stream_token_allows(token, pk):
+    try:
+        return signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=get_stream_url_ttl()) == pk
+    except signing.BadSignature:  # Includes SignatureExpired
+        return False
+
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) byte positions, inclusive, for a single-range Range header,
+    or None when the header should be ignored and the whole file served (absent, malformed,
+    or asking for several ranges, which players don't do). Raises RangeNotSatisfiable for
+    ranges that start past the end of the file.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        raise RangeNotSatisfiable()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """A Range is only honoured when If-Range, if sent, still names the current file."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return not if_range.startswith('W/') and if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+class RangeFile:
+    """
+    Read-only view of one byte range of an open file.
+    It exposes fileno() with the file positioned at the range start, so WSGI servers that
+    implement wsgi.file_wrapper (gunicorn, uWSGI) send the range with sendfile() using the
+    response's Content-Length; everywhere else read() stops at the end of the range.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def media_etag(patient_file, stat):
+    if patient_file.blob_id_id is not None:
+        # Content-addressed: the blob name is its SHA-256, so that is a strong validator
+        return quote_etag(os.path.basename(patient_file.file_path).split('.', 1)[0])
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def media_content_type(patient_file):
+    if '/' in (patient_file.file_type or ''):
+        return patient_file.file_type
+    return mimetypes.guess_type(patient_file.file_path)[0] or 'application/octet-stream'
+
+
+def sendfile_response(patient_file, full_path, content_type):
+    """
+    Hands the actual transfer to the front-end server when PATIENT_MEDIA_SENDFILE is set:
+    'x-accel-redirect' (nginx, internal location at PATIENT_MEDIA_ACCEL_PREFIX) or
+    'x-sendfile' (Apache mod_xsendfile, lighttpd). The server then applies Range itself.
+    """
+    backend = getattr(settings, 'PATIENT_MEDIA_SENDFILE', None)
+    if not backend:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'PATIENT_MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + patient_file.file_path.lstrip('/')
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f"Unknown PATIENT_MEDIA_SENDFILE backend: {backend}")
+    return response
+
+
+def build_media_response(request, patient_file, storage=None):
+    """
+    Streams a PatientFile with byte-range and conditional GET support.
+    Returns 200/206 with the file, 304/412 for conditional requests, 416 for unsatisfiable ranges.
+    """
+    storage = storage or get_media_storage()
+    full_path = storage.path(patient_file.file_path)
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        return None
+
+    etag = media_etag(patient_file, stat)
+    last_modified = int(stat.st_mtime)
+    content_type = media_content_type(patient_file)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = sendfile_response(patient_file, full_path, content_type)
+    if response is None:
+        size = stat.st_size
+        byte_range = None
+        if if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+        if response is None:
+            file = open(full_path, 'rb')
+            if byte_range is None:
+                response = FileResponse(file, content_type=content_type)
+                response.block_size = STREAM_BLOCK_SIZE
+            else:
+                start, end = byte_range
+                response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+                response.block_size = STREAM_BLOCK_SIZE
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = BLOB_CACHE_CONTROL if patient_file.blob_id_id is not None else FILE_CACHE_CONTROL
+    return response
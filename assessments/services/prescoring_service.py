@@ -0,0 +1,252 @@
+# assessments/services/prescoring_service.py
+
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from .question_bank import QUESTION_BANK
+from .summary_cache_service import normalize_text
+
+ANSWER_WIDTH = 32  # Normalized answers are cut to this many characters before scoring
+DEFAULT_MATCH_THRESHOLD = 0.75  # Similarity at or above this counts as a correct answer
+NORMALIZE_CACHE_SIZE = 65536  # Distinct raw answers kept normalized; real answers repeat a lot
+WIDTH_BANDS = (4, 8, 12, 16, 24)  # Answer length bands scored separately; longer ones use ANSWER_WIDTH
+CHUNK_ANSWERS = 65536  # Answers scored per NumPy pass, bounds the temporary arrays to a few MB
+MAX_ACCEPTED_ANSWERS = 8  # Per question, one bit each in the lookup masks
+MAX_CODEPOINT = 0xFFFF  # Characters are packed 16 bits each; rarer ones share the top code
+TRIGRAM_BITS = 48
+SENTINEL = np.uint64(np.iinfo(np.uint64).max)
+
+ARTICLES = {'a', 'an', 'the'}
+NUMBER_WORDS = {
+    word: str(value) for value, word in enumerate((
+        'zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+        'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen',
+    ))
+}
+TENS_WORDS = {'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90}
+NON_WORD = re.compile(r'[\W_]+')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_answer(value):
+    words = NON_WORD.sub(' ', unicodedata.normalize('NFKC', value).casefold()).split()
+    normalized = []
+    previous_word = None
+    for word in words:
+        if word in ARTICLES:
+            continue
+        if word in TENS_WORDS:
+            normalized.append(str(TENS_WORDS[word]))
+        elif word in NUMBER_WORDS:
+            units = int(NUMBER_WORDS[word])
+            if normalized and previous_word in TENS_WORDS and 0 < units < 10:
+                normalized[-1] = str(TENS_WORDS[previous_word] + units)  # "twenty four" -> 24
+            else:
+                normalized.append(NUMBER_WORDS[word])
+        else:
+            normalized.append(word)
+        previous_word = word
+    return ' '.join(normalized)
+
+
+def normalize_answer(value):
+    """Casefolded words without punctuation or articles, with number words written as digits."""
+    return _normalize_answer(str(value))
+
+
+def encode_answers(texts, width=None):
+    """
+    (n, width + 2) uint64 code points of the normalized texts, space padded at both ends and 0 after.
+    width defaults to the longest text, capped at ANSWER_WIDTH; longer texts are cut.
+    """
+    if width is None:
+        width = min(ANSWER_WIDTH, max(map(len, texts), default=0))
+    width = max(width, 1)
+    chars = np.array(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), width)
+    codes = np.zeros((len(texts), width + 2), dtype=np.uint64)
+    codes[:, 0] = ord(' ')
+    codes[:, 1:-1] = np.minimum(chars, MAX_CODEPOINT)
+    codes[np.arange(len(texts)), np.count_nonzero(chars, axis=1) + 1] = ord(' ')
+    return codes
+
+
+def trigram_codes(codes):
+    """
+    Character trigrams packed into one integer each, shape (..., width); positions past
+    the end of the text are SENTINEL. Each row is sorted with repeats replaced by SENTINEL,
+    so a row holds the text's set of trigrams.
+    """
+    trigrams = (codes[..., :-2] << np.uint64(32)) | (codes[..., 1:-1] << np.uint64(16)) | codes[..., 2:]
+    trigrams[codes[..., 2:] == 0] = SENTINEL
+    trigrams.sort(axis=-1)
+    trigrams[..., 1:][trigrams[..., 1:] == trigrams[..., :-1]] = SENTINEL
+    return trigrams
+
+
+def match_threshold():
+    return getattr(settings, 'PRESCORING_MATCH_THRESHOLD', DEFAULT_MATCH_THRESHOLD)
+
+
+class PreScorer:
+    """
+    Scores answer sets against the question bank without the model. Each answer is compared
+    with every accepted answer for its question by Dice similarity over character trigrams
+    (2 * shared / (answer + accepted)), keeping the best; typos and small wording differences
+    still score high. Per-domain scores are the mean similarity and the share of answers at or
+    above the match threshold.
+
+    All answer sets in a call are scored together: each answer's trigram set is a sorted NumPy
+    row, and the shared trigrams for every accepted answer are found with one searchsorted
+    against the bank's (question, trigram) keys.
+    """
+
+    def __init__(self, bank=None, threshold=None):
+        bank = bank or QUESTION_BANK
+        self.threshold = match_threshold() if threshold is None else threshold
+        self.domains = list(bank)
+        self.questions = []
+        domain_of_question = []
+        accepted_answers = []
+        for domain_index, questions in enumerate(bank.values()):
+            for question, accepted in questions.items():
+                self.questions.append(question)
+                domain_of_question.append(domain_index)
+                accepted_answers.append([normalize_answer(answer) for answer in accepted])
+        if len(self.questions) >= 1 << (64 - TRIGRAM_BITS):
+            raise ValueError('Question bank has too many questions to score.')
+        self.alternatives = max(map(len, accepted_answers), default=0)
+        if self.alternatives > MAX_ACCEPTED_ANSWERS:
+            raise ValueError(f'At most {MAX_ACCEPTED_ANSWERS} accepted answers per question can be scored.')
+
+        # Exact question text first, then its normalized form
+        self.question_index = {normalize_text(question): index for index, question in enumerate(self.questions)}
+        self.question_index.update((question, index) for index, question in enumerate(self.questions))
+        self.domain_of_question = np.array(domain_of_question)
+        self.questions_per_domain = np.bincount(self.domain_of_question, minlength=len(self.domains))
+        self.question_offsets = np.arange(len(self.questions), dtype=np.uint64) << np.uint64(TRIGRAM_BITS)
+
+        # Every (question, trigram) of an accepted answer becomes one sorted key, mapped to a
+        # bitmask of the question's accepted answers that contain it
+        self.accepted_sizes = np.zeros((len(self.questions), self.alternatives))
+        masks = {}
+        for question_index, answers in enumerate(accepted_answers):
+            for alternative, trigrams in enumerate(trigram_codes(encode_answers(answers))):
+                trigrams = trigrams[trigrams != SENTINEL] | self.question_offsets[question_index]
+                self.accepted_sizes[question_index, alternative] = len(trigrams)
+                for key in trigrams.tolist():
+                    masks[key] = masks.get(key, 0) | (1 << alternative)
+        self.accepted_keys = np.array(sorted(masks), dtype=np.uint64)
+        self.accepted_masks = np.array([masks[key] for key in sorted(masks)], dtype=np.uint8)
+
+    def question_position(self, question):
+        """Index of the question in the bank, matched exactly first and then normalized; None if unknown."""
+        index = self.question_index.get(question)
+        if index is None:
+            index = self.question_index.get(normalize_text(question))
+        return index
+
+    def answer_texts(self, answer_sets):
+        """Normalized answers in bank order, one row per answer set; unknown questions are ignored."""
+        texts = [[''] * len(self.questions) for _ in answer_sets]
+        for row, user_answers in zip(texts, answer_sets):
+            for question, answer in user_answers.items():
+                index = self.question_position(question)
+                if index is not None:
+                    row[index] = normalize_answer(answer or '')
+        return texts
+
+    def similarity(self, texts):
+        """(sets, questions) float32 best Dice similarity per answer, for rows of normalized answers."""
+        answers = np.array([text for row in texts for text in row], dtype=object)
+        question_ids = np.tile(np.arange(len(self.questions)), len(texts))
+        lengths = np.fromiter(map(len, answers), dtype=np.int64, count=len(answers))
+        result = np.zeros(len(answers), dtype=np.float32)  # Blank answers stay 0
+        # Answers are scored in bands of similar length, so short ones are not padded to the longest
+        for shorter, width in zip((0,) + WIDTH_BANDS, WIDTH_BANDS + (None,)):
+            in_band = lengths > shorter if width is None else (lengths > shorter) & (lengths <= width)
+            members = np.flatnonzero(in_band)
+            for start in range(0, len(members), CHUNK_ANSWERS):
+                chunk = members[start:start + CHUNK_ANSWERS]
+                codes = encode_answers(answers[chunk], width=width or ANSWER_WIDTH)
+                result[chunk] = self._similarity_chunk(codes, question_ids[chunk])
+        return result.reshape(len(texts), len(self.questions))
+
+    def _similarity_chunk(self, codes, question_ids):
+        trigrams = trigram_codes(codes)
+        valid = trigrams != SENTINEL
+        # Only real trigrams are looked up, keyed by their question
+        owners = np.nonzero(valid)[0]
+        keys = (trigrams | self.question_offsets[question_ids, None])[valid]
+        found = np.minimum(np.searchsorted(self.accepted_keys, keys), len(self.accepted_keys) - 1)
+        matched = self.accepted_keys[found] == keys
+        masks = self.accepted_masks[found[matched]]
+        owners = owners[matched]
+
+        sizes = valid.sum(axis=1)
+        best = np.zeros(len(codes))
+        for alternative in range(self.alternatives):
+            shared = np.bincount(owners, weights=(masks >> alternative) & 1, minlength=len(codes))
+            total = sizes + self.accepted_sizes[question_ids, alternative]
+            dice = np.divide(2.0 * shared, total, out=np.zeros(len(codes)), where=total > 0)
+            np.maximum(best, dice, out=best)
+        return best
+
+    def domain_scores(self, similarity):
+        """(mean similarity, share correct), each (sets, domains), from a similarity matrix."""
+        one_hot = np.eye(len(self.domains), dtype=np.float32)[self.domain_of_question]
+        per_domain = self.questions_per_domain.astype(np.float32)
+        scores = similarity @ one_hot / per_domain
+        correct = (similarity >= self.threshold).astype(np.float32) @ one_hot / per_domain
+        return scores, correct
+
+    def score_many(self, answer_sets):
+        """Scores for a list of {question: answer} dicts, as arrays with one row per set."""
+        texts = self.answer_texts(answer_sets)
+        similarity = self.similarity(texts)
+        scores, correct = self.domain_scores(similarity)
+        answered = np.array([[bool(text) for text in row] for row in texts], dtype=bool)
+        return {
+            'similarity': similarity,
+            'domain_scores': scores,
+            'domain_correct': correct,
+            'answered': answered,
+        }
+
+    def score(self, user_answers):
+        """Per-domain report for one answer set."""
+        result = self.score_many([user_answers])
+        answered = np.bincount(self.domain_of_question, weights=result['answered'][0], minlength=len(self.domains))
+        correct = result['domain_correct'][0] * self.questions_per_domain
+        return {
+            'overall': round(float(result['similarity'][0].mean()), 3) if self.questions else 0.0,
+            'domains': {
+                domain: {
+                    'score': round(float(result['domain_scores'][0][index]), 3),
+                    'correct': int(round(correct[index])),
+                    'answered': int(answered[index]),
+                    'questions': int(self.questions_per_domain[index]),
+                }
+                for index, domain in enumerate(self.domains)
+            },
+        }
+
+
+_prescorer = None
+_prescorer_lock = threading.Lock()
+
+
+def get_prescorer():
+    global _prescorer
+    with _prescorer_lock:
+        if _prescorer is None:
+            _prescorer = PreScorer()
+        return _prescorer
+
+
+def prescore_answers(user_answers):
+    return get_prescorer().score(user_answers)
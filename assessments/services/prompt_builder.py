@@ -0,0 +1,194 @@
+# assessments/services/prompt_builder.py
+
+import math
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+from .prescoring_service import get_prescorer
+
+CHARS_PER_TOKEN = 4  # Rough average for English text; good enough for budgeting, not for billing
+DEFAULT_TOKEN_BUDGET = 1500  # System instruction plus answers, per request
+DEFAULT_ANSWER_MAX_CHARS = 200
+OTHER_DOMAIN = 'other'  # Questions that are not in the question bank
+
+# Sent as the model's system instruction, so it is not repeated inside every prompt
+SYSTEM_INSTRUCTION = """You write short, neutral summaries of answers to a questionnaire designed to explore potential autistic traits. Base the summary ONLY on the answers given and on generally understood characteristics of Autism Spectrum Disorder (ASD): challenges in social communication and interaction, and restricted, repetitive patterns of behavior, interests, or activities, as outlined in diagnostic manuals like the DSM-5.
+
+Answers are grouped by domain. Each domain header carries a local score (mean similarity of the answers to the expected ones, 0 to 1) and how many answers matched; use these scores as given instead of re-grading the answers.
+
+CRITICAL GUIDELINES:
+1. DO NOT make any form of medical diagnosis.
+2. DO NOT assign a "level of autism" (Level 1, 2, or 3).
+3. DO NOT use language that implies certainty about a diagnosis.
+4. Clearly state that this tool is for informational purposes only and is not a substitute for professional medical advice, diagnosis, or treatment.
+5. Encourage the user to consult a qualified healthcare professional (e.g., a doctor, psychologist, or developmental specialist) for an accurate assessment.
+6. Focus on general insights into how the responses might align with characteristics sometimes associated with ASD, without confirming or denying a diagnosis.
+7. Keep a supportive, non-judgmental, and empathetic tone, and suggest discussing these observations with a professional.
+
+Example of the desired format (adapt as needed): 'Based on your answers, some of the patterns described, such as [specific areas], are sometimes observed in individuals with characteristics related to autism spectrum disorder. It's important to remember that this tool cannot provide a diagnosis. For a comprehensive evaluation and personalized guidance, we strongly recommend consulting a healthcare professional who specializes in developmental conditions.'"""
+
+PROMPT_HEADER = "Questionnaire answers by domain (question? answer):"
+
+AnalysisPrompt = namedtuple('AnalysisPrompt', ['system_instruction', 'text', 'tokens', 'system_tokens', 'omitted_answers'])
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def get_token_budget():
+    return getattr(settings, 'ANALYSIS_PROMPT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)
+
+
+def compact(value, max_chars):
+    """Single-line text with collapsed whitespace, cut to max_chars."""
+    text = ' '.join(str(value).split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + '…'
+
+
+def answer_entries(user_answers, max_chars):
+    """
+    Per domain, in question bank order: (header, [(similarity, line), ...]). Answers to questions
+    outside the bank go under OTHER_DOMAIN without a score.
+    """
+    scorer = get_prescorer()
+    scores = scorer.score_many([user_answers])
+    similarity = scores['similarity'][0]
+    correct = scores['domain_correct'][0] * scorer.questions_per_domain
+
+    by_domain = {}
+    for question, answer in user_answers.items():
+        index = scorer.question_position(question)
+        domain = OTHER_DOMAIN if index is None else scorer.domains[scorer.domain_of_question[index]]
+        line = f"{compact(question, max_chars)} {compact(answer if answer not in (None, '') else '-', max_chars)}"
+        by_domain.setdefault(domain, []).append((None if index is None else float(similarity[index]), line))
+
+    entries = []
+    for domain_index, domain in enumerate(scorer.domains):
+        if domain in by_domain:
+            header = (
+                f"## {domain} {scores['domain_scores'][0][domain_index]:.2f} "
+                f"{int(round(correct[domain_index]))}/{scorer.questions_per_domain[domain_index]}"
+            )
+            entries.append((header, by_domain[domain]))
+    if OTHER_DOMAIN in by_domain:
+        entries.append((f"## {OTHER_DOMAIN}", by_domain[OTHER_DOMAIN]))
+    return entries
+
+
+def omission_note(count):
+    return f"({count} more answers omitted)"
+
+
+def render(entries, kept):
+    lines = [PROMPT_HEADER]
+    for (header, answers), keep in zip(entries, kept):
+        lines.append(header)
+        lines.extend(line for (_, line), kept_line in zip(answers, keep) if kept_line)
+        omitted = len(answers) - sum(keep)
+        if omitted:
+            lines.append(omission_note(omitted))
+    return '\n'.join(lines)
+
+
+def build_prompt(user_answers, budget=None, max_chars=None):
+    """
+    Compact prompt for one analysis: the fixed guidelines go in the system instruction, and the
+    prompt lists one "question? answer" line per answer under a scored header per domain.
+
+    When the estimate exceeds the token budget, answers are left out until it fits: first those
+    that matched the expected answer (their domain header still counts them), best match first,
+    then any others from the end. Domain headers are always kept.
+    """
+    budget = budget or get_token_budget()
+    max_chars = max_chars or getattr(settings, 'ANALYSIS_PROMPT_ANSWER_MAX_CHARS', DEFAULT_ANSWER_MAX_CHARS)
+    system_tokens = estimate_tokens(SYSTEM_INSTRUCTION)
+    entries = answer_entries(user_answers, max_chars)
+    kept = [[True] * len(answers) for _, answers in entries]
+    text = render(entries, kept)
+
+    allowed_chars = (budget - system_tokens) * CHARS_PER_TOKEN
+    if len(text) > allowed_chars:
+        # Drop order: matched answers by descending similarity, then unmatched ones from the end
+        threshold = get_prescorer().threshold
+        positions = [(d, a) for d, (_, answers) in enumerate(entries) for a in range(len(answers))]
+        similarity = lambda position: entries[position[0]][1][position[1]][0]
+        matched = sorted((p for p in positions if (similarity(p) or 0) >= threshold), key=similarity, reverse=True)
+        matched_set = set(matched)
+        drop_order = matched + [p for p in reversed(positions) if p not in matched_set]
+
+        length = len(text)
+        omitted_in_domain = [0] * len(entries)
+        for domain_index, answer_index in drop_order:
+            if length <= allowed_chars:
+                break
+            kept[domain_index][answer_index] = False
+            length -= len(entries[domain_index][1][answer_index][1]) + 1
+            # The domain's "(N more answers omitted)" line appears or grows
+            count = omitted_in_domain[domain_index]
+            length += len(omission_note(count + 1)) - (len(omission_note(count)) if count else -1)
+            omitted_in_domain[domain_index] = count + 1
+        text = render(entries, kept)
+
+    omitted = sum(len(keep) - sum(keep) for keep in kept)
+    return AnalysisPrompt(SYSTEM_INSTRUCTION, text, system_tokens + estimate_tokens(text), system_tokens, omitted)
+
+
+class PromptStats:
+    """Estimated prompt sizes of the analysis calls made by this process."""
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.max_tokens = 0
+        self.trimmed_requests = 0
+        self.omitted_answers = 0
+        self._lock = threading.Lock()
+
+    def record(self, prompt):
+        with self._lock:
+            self.requests += 1
+            self.tokens += prompt.tokens
+            self.max_tokens = max(self.max_tokens, prompt.tokens)
+            if prompt.omitted_answers:
+                self.trimmed_requests += 1
+                self.omitted_answers += prompt.omitted_answers
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'estimated_tokens': self.tokens,
+                'mean_estimated_tokens': self.tokens / self.requests if self.requests else 0.0,
+                'max_estimated_tokens': self.max_tokens,
+                'token_budget': get_token_budget(),
+                'trimmed_requests': self.trimmed_requests,
+                'omitted_answers': self.omitted_answers,
+            }
+
+
+prompt_stats = PromptStats()
+
+
+def record_prompt(prompt):
+    prompt_stats.record(prompt)
+
+
+def prompt_metrics():
+    return prompt_stats.snapshot()
+
+
+def prometheus_prompt_metrics():
+    stats = prompt_metrics()
+    return '\n'.join([
+        '# TYPE analysis_prompt_requests_total counter',
+        f'analysis_prompt_requests_total {stats["requests"]}',
+        '# TYPE analysis_prompt_estimated_tokens_total counter',
+        f'analysis_prompt_estimated_tokens_total {stats["estimated_tokens"]}',
+        '# TYPE analysis_prompt_trimmed_requests_total counter',
+        f'analysis_prompt_trimmed_requests_total {stats["trimmed_requests"]}',
+        '# TYPE analysis_prompt_token_budget gauge',
+        f'analysis_prompt_token_budget {stats["token_budget"]}',
+    ]) + '\n'
@@ -0,0 +1,90 @@
+# assessments/services/question_bank.py
+#
+# Questionnaire used by the analysis views, grouped by domain. Each question lists its
+# accepted answers; the first one is the canonical answer used for SAMPLE_USER_ANSWERS.
+
+QUESTION_BANK = {
+    'factual': {
+        "What is the color of a fire truck?": ("Red",),
+        "How many legs does a spider have?": ("Eight",),
+        "What is the shape of a soccer ball?": ("Sphere", "Round", "Ball"),
+        "What sound does a cat make?": ("Meow",),
+        "What do you use to write on paper?": ("Pencil", "Pen"),
+        "What is frozen water called?": ("Ice",),
+        "What planet do humans live on?": ("Earth",),
+        "How many hours are in one day?": ("24",),
+        "What is the opposite of 'day'?": ("Night",),
+        "What comes after the number 5?": ("6",),
+    },
+    'safety': {
+        "What should you do before crossing the street?": ("Look both ways", "Look left and right"),
+        "Where do you go when there's a fire?": ("Exit", "Outside"),
+        "What do you wear when it's raining?": ("Raincoat", "Rain coat", "Umbrella"),
+        "How often should you brush your teeth?": ("Twice daily", "Twice a day", "2 times a day"),
+        "What do you do when lights turn red?": ("Stop",),
+    },
+    'sensory': {
+        "What texture is sandpaper?": ("Rough",),
+        "What is the taste of lemon?": ("Sour",),
+        "What instrument has black and white keys?": ("Piano",),
+        "What animal has black and white stripes?": ("Zebra",),
+        "Where do you find refrigerator?": ("Kitchen",),
+    },
+    'nature': {
+        "What plant grows from acorn?": ("Oak tree", "Oak"),
+        "What is the largest ocean?": ("Pacific",),
+        "What gas do humans breathe?": ("Oxygen",),
+        "What season comes after winter?": ("Spring",),
+        "What melts in sunshine?": ("Snow", "Ice"),
+    },
+    'time': {
+        "How many days in one week?": ("7",),
+        "What month comes after April?": ("May",),
+        "What holiday is on December 25?": ("Christmas",),
+        "What meal comes after lunch?": ("Dinner", "Supper"),
+        "When does sunrise happen?": ("Morning",),
+    },
+    'food': {
+        "What fruit is yellow and curved?": ("Banana",),
+        "What do you pour on cereal?": ("Milk",),
+        "Where does honey come from?": ("Bees", "Bee"),
+        "What vegetable makes you cry?": ("Onion",),
+        "What is frozen dessert?": ("Ice cream",),
+    },
+    'body': {
+        "How many fingers on one hand?": ("5",),
+        "Where is your elbow?": ("Arm",),
+        "What helps you see?": ("Eyes", "Glasses"),
+        "What exercise makes heart beat faster?": ("Running",),
+        "What do bandages protect?": ("Cuts", "Wounds"),
+    },
+    'transportation': {
+        "What vehicle flies in sky?": ("Airplane", "Plane"),
+        "What has two wheels?": ("Bicycle", "Bike"),
+        "Where do trains run?": ("Tracks", "Rails"),
+        "What color is school bus?": ("Yellow",),
+        "What moves boats?": ("Motor", "Wind", "Sails"),
+    },
+    'home': {
+        "Where do you sleep?": ("Bed",),
+        "What keeps room bright?": ("Light", "Lamp"),
+        "What appliance cooks food?": ("Stove", "Oven"),
+        "Where do clothes go?": ("Closet", "Wardrobe"),
+        "What cleans dishes?": ("Dishwasher",),
+    },
+    'animals': {
+        "What bird says 'hoot'?": ("Owl",),
+        "What sea animal has tentacles?": ("Octopus",),
+        "What farm animal gives milk?": ("Cow",),
+        "What insect makes web?": ("Spider",),
+        "What is fastest land animal?": ("Cheetah",),
+    },
+}
+
+# Fixed answer set the analysis views use while the app does not send real answers yet.
+# In production, read user_answers from request.data instead.
+SAMPLE_USER_ANSWERS = {
+    question: accepted[0]
+    for questions in QUESTION_BANK.values()
+    for question, accepted in questions.items()
+}
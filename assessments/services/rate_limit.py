@@ -0,0 +1,59 @@
+# assessments/services/rate_limit.py
+
+import threading
+import time
+
+from django.conf import settings
+
+
+class RateLimitTimeout(Exception):
+    """No token became available within the caller's timeout."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, at most burst saved up."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Blocks until a token is available. Returns False if that would take longer than timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(provider):
+    """
+    Process-wide limiter for one LLM provider from ANALYSIS_RATE_LIMITS, e.g.
+    {'GeminiBackend': {'RATE': 2, 'BURST': 5}} (requests per second). None means unlimited.
+    """
+    config = getattr(settings, 'ANALYSIS_RATE_LIMITS', {}).get(provider)
+    if not config:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = TokenBucket(config['RATE'], config.get('BURST'))
+        return limiter
@@ -0,0 +1,192 @@
+# assessments/services/report_batch_service.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from assessments.models import AnalysisJob, Assessment, ResponseData
+from .analysis_job_service import AnalysisQueueFull, claim_analysis_job, get_max_pending_jobs, pending_job_count
+from .gemini_service import analyze_with_cache
+
+DEFAULT_BATCH_CONCURRENCY = 8
+MAX_BATCH_SIZE = 1000
+WRITE_BACK_EVERY = 100  # Finished reports are flushed with bulk_update in chunks of this size
+WRITE_BACK_MAX_SECONDS = 30  # ... or once the oldest unflushed one has waited this long
+
+
+def get_batch_concurrency():
+    return getattr(settings, 'ANALYSIS_BATCH_CONCURRENCY', DEFAULT_BATCH_CONCURRENCY)
+
+
+def load_user_answers(assessment_ids):
+    """{assessment id: {question text: answer}} for all assessments, with one prefetch query for the answers."""
+    responses = ResponseData.objects.select_related('question_id').order_by('question_id__question_order', 'id')
+    assessments = Assessment.objects.filter(id__in=assessment_ids).prefetch_related(
+        Prefetch('responsedata_set', queryset=responses, to_attr='answers')
+    )
+    return {
+        assessment.id: {answer.question_id.question_text: answer.response_text or '' for answer in assessment.answers}
+        for assessment in assessments
+    }
+
+
+class ReportBatch:
+    """
+    Generates summaries for many assessments: a bounded thread pool calls the backend
+    (which applies the provider rate limit), and results are written back with bulk_update.
+    Optionally tracks one AnalysisJob per assessment so progress shows on the status endpoint.
+    """
+
+    def __init__(self, assessment_ids, concurrency=None, bypass_cache=False, jobs=None):
+        self.assessment_ids = list(dict.fromkeys(assessment_ids))
+        self.concurrency = concurrency or get_batch_concurrency()
+        self.bypass_cache = bypass_cache
+        self.jobs = jobs or {}  # assessment id -> AnalysisJob
+        self.succeeded = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+        self.prompt_tokens = 0  # Estimated, over the model calls made
+        self.failures = {}  # assessment id -> error
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.Lock()
+
+    def claim(self, assessment_id):
+        """
+        Moves the assessment's job from queued to running as its work starts. False when
+        run_analysis_jobs got to it first (e.g. after a restart), in which case it is left alone.
+        """
+        job = self.jobs.get(assessment_id)
+        if job is None:
+            return True
+        if not claim_analysis_job(job.pk):
+            del self.jobs[assessment_id]
+            return False
+        job.status = 'running'
+        job.started_at = timezone.now()
+        return True
+
+    def analyze(self, assessment_id, user_answers):
+        """Returns (assessment id, result, error), or None when the job was claimed elsewhere."""
+        try:
+            if not self.claim(assessment_id):
+                return None
+            return assessment_id, analyze_with_cache(user_answers, bypass_cache=self.bypass_cache), None
+        except Exception as e:
+            return assessment_id, None, str(e)
+        finally:
+            close_old_connections()
+
+    def record(self, assessment_id, result, error):
+        now = timezone.now()
+        job = self.jobs.get(assessment_id)
+        summary = result.summary if result is not None else None
+        if error is not None:
+            self.failures[assessment_id] = error
+        else:
+            self.succeeded += 1
+            self.cache_hits += int(result.cache_hit)
+            self.fallbacks += int(result.fallback)
+            self.prompt_tokens += result.prompt_tokens or 0
+        if job is not None:
+            job.status = 'failed' if error is not None else 'succeeded'
+            job.result = summary
+            job.error = error
+            job.cache_hit = bool(result and result.cache_hit)
+            job.used_fallback = bool(result and result.fallback)
+            job.prompt_tokens = result.prompt_tokens if result else None
+            job.finished_at = now
+            job.updated_at = now
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((assessment_id, summary, job))
+        # Unflushed jobs still look running; flushing by age keeps them clear of requeue_stale_jobs
+        if len(self._pending) >= WRITE_BACK_EVERY or time.monotonic() - self._pending_since >= WRITE_BACK_MAX_SECONDS:
+            self.write_back()
+
+    def write_back(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        assessments = [Assessment(id=assessment_id, result_summary=summary) for assessment_id, summary, _ in pending if summary is not None]
+        jobs = [job for _, _, job in pending if job is not None]
+        with transaction.atomic():
+            Assessment.objects.bulk_update(assessments, ['result_summary'])
+            AnalysisJob.objects.bulk_update(jobs, ['status', 'result', 'error', 'cache_hit', 'used_fallback', 'prompt_tokens', 'finished_at', 'updated_at'])
+
+    def run(self, answers=None):
+        """Runs the batch and returns counts, timings and per-assessment errors."""
+        started = time.perf_counter()
+        if answers is None:
+            answers = load_user_answers(self.assessment_ids)
+        for assessment_id in self.assessment_ids:
+            if not answers.get(assessment_id) and self.claim(assessment_id):
+                error = 'Assessment not found.' if assessment_id not in answers else 'No answers recorded for this assessment.'
+                self.record(assessment_id, None, error)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='report-batch') as pool:
+            futures = [
+                pool.submit(self.analyze, assessment_id, user_answers)
+                for assessment_id, user_answers in answers.items() if user_answers
+            ]
+            for future in as_completed(futures):
+                outcome = future.result()
+                if outcome is not None:
+                    self.record(*outcome)
+        self.write_back()
+
+        elapsed = time.perf_counter() - started
+        return {
+            'requested': len(self.assessment_ids),
+            'succeeded': self.succeeded,
+            'failed': len(self.failures),
+            'cache_hits': self.cache_hits,
+            'fallbacks': self.fallbacks,
+            'estimated_prompt_tokens': self.prompt_tokens,
+            'concurrency': self.concurrency,
+            'seconds': elapsed,
+            'reports_per_second': self.succeeded / elapsed if elapsed else 0.0,
+            'failures': self.failures,
+        }
+
+
+def enqueue_report_batch(assessment_ids, bypass_cache=False):
+    """
+    Creates one queued AnalysisJob per known assessment and runs the batch on a background thread,
+    which claims each job as it starts on it. Returns (jobs, error); unknown assessment ids get no job.
+    Raises AnalysisQueueFull when the jobs would take the queue past ANALYSIS_MAX_PENDING_JOBS.
+    """
+    assessment_ids = list(dict.fromkeys(assessment_ids))
+    if not assessment_ids:
+        return None, 'No assessment ids provided.'
+    if len(assessment_ids) > MAX_BATCH_SIZE:
+        return None, f'At most {MAX_BATCH_SIZE} assessments per batch.'
+
+    answers = load_user_answers(assessment_ids)
+    # The batch's jobs count against the same cap as single analyze-autism requests
+    free = get_max_pending_jobs() - pending_job_count()
+    if len(answers) > free:
+        raise AnalysisQueueFull(f'Too many analyses are pending: room for {max(free, 0)} more, {len(answers)} requested. Please try again shortly.')
+    # Answers are stored on the job, so run_analysis_jobs can finish it if this process dies
+    jobs = [
+        AnalysisJob(assessment_id_id=assessment_id, user_answers=answers[assessment_id], bypass_cache=bypass_cache)
+        for assessment_id in assessment_ids if assessment_id in answers
+    ]
+    AnalysisJob.objects.bulk_create(jobs)
+    batch = ReportBatch([job.assessment_id_id for job in jobs], bypass_cache=bypass_cache, jobs={job.assessment_id_id: job for job in jobs})
+
+    def run():
+        try:
+            batch.run(answers)
+        except Exception as e:
+            print(f"Report batch failed: {e}")
+        finally:
+            close_old_connections()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, name='report-batch-driver', daemon=True).start())
+    return jobs, None
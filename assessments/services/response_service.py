@@ -0,0 +1,189 @@
+# assessments/services/response_service.py
+
+import json
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from assessments.models import Assessment, Question, ResponseData
+
+BULK_CREATE_BATCH_SIZE = 500  # Rows per INSERT statement, keeps statements under max_allowed_packet
+UPSERT_UNIQUE_FIELDS = ['assessment_id', 'question_id']  # ResponseData's unique_response_per_question
+UPSERT_UPDATE_FIELDS = ['response_text', 'updated_at']
+DEFAULT_IMPORT_BATCH_SIZE = 1000  # NDJSON lines per upsert
+DEFAULT_IMPORT_MAX_LINE_BYTES = 64 * 1024
+DEFAULT_IMPORT_MAX_ERRORS = 1000  # Rejected lines reported one by one; later ones are only counted
+
+
+def parse_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def validate_answers(answers):
+    """
+    Checks every submitted answer in memory after resolving all referenced questions and
+    assessments with one in_bulk query each; a question must belong to the assessment's
+    scenario. Returns ([(index, ResponseData), ...], errors)
+    where errors is a list of {'index': ..., 'message': ...} for the answers that were rejected.
+    """
+    parsed = []
+    for answer in answers:
+        if not isinstance(answer, dict):
+            parsed.append(None)
+            continue
+        parsed.append((parse_id(answer.get('question_id')), parse_id(answer.get('assessment_id')), answer.get('response_text', '')))
+
+    question_ids = {item[0] for item in parsed if item and item[0]}
+    assessment_ids = {item[1] for item in parsed if item and item[1]}
+    questions = Question.objects.only('id', 'as_id').in_bulk(question_ids)
+    assessments = Assessment.objects.only('id', 'as_id').in_bulk(assessment_ids)
+
+    valid, errors = [], []
+    for index, item in enumerate(parsed):
+        if item is None:
+            errors.append({'index': index, 'message': 'Each answer must be an object.'})
+            continue
+        question_id, assessment_id, response_text = item
+        if not question_id or not assessment_id:
+            errors.append({'index': index, 'message': 'question_id and assessment_id must be positive integers.'})
+            continue
+        question = questions.get(question_id)
+        assessment = assessments.get(assessment_id)
+        if question is None:
+            errors.append({'index': index, 'message': f'Question {question_id} not found.'})
+        elif assessment is None:
+            errors.append({'index': index, 'message': f'Assessment {assessment_id} not found.'})
+        elif question.as_id_id != assessment.as_id_id:
+            errors.append({'index': index, 'message': f"Question {question_id} is not part of assessment {assessment_id}'s scenario."})
+        else:
+            if response_text is not None and not isinstance(response_text, str):
+                response_text = str(response_text)
+            valid.append((index, ResponseData(question_id=question, assessment_id=assessment, response_text=response_text)))
+    return valid, errors
+
+
+def ingest_answers(answers):
+    """
+    Upserts a submission of answers with one bulk insert inside a single transaction: an answer
+    to a question the assessment already has updates that row in place, so a retried submission
+    leaves no duplicates. Within one submission the last answer to a question wins.
+    Invalid answers are skipped and reported; the rest are saved together or not at all.
+    Returns (responses, errors); responses hold one stored row per question, ids set.
+    """
+    valid, errors = validate_answers(answers)
+    latest = {}
+    for _, response in valid:
+        latest[(response.assessment_id_id, response.question_id_id)] = response
+    responses = list(latest.values())
+    if not responses:
+        return responses, errors
+
+    upsert = {'update_conflicts': True, 'update_fields': UPSERT_UPDATE_FIELDS}
+    if connections[ResponseData.objects.db].features.supports_update_conflicts_with_target:
+        # PostgreSQL and SQLite name the conflict target; MySQL's ON DUPLICATE KEY UPDATE can't
+        upsert['unique_fields'] = UPSERT_UNIQUE_FIELDS
+
+    with transaction.atomic():
+        ResponseData.objects.bulk_create(responses, batch_size=BULK_CREATE_BATCH_SIZE, **upsert)
+
+        if responses[0].pk is None:
+            # Backends without RETURNING (MySQL) don't set primary keys on bulk_create; read them back
+            rows = ResponseData.objects.filter(
+                assessment_id__in={r.assessment_id_id for r in responses},
+                question_id__in={r.question_id_id for r in responses},
+            ).values_list('id', 'assessment_id', 'question_id')
+            ids = {(assessment_id, question_id): pk for pk, assessment_id, question_id in rows}
+            for response in responses:
+                response.pk = ids[(response.assessment_id_id, response.question_id_id)]
+    return responses, errors
+
+
+class LineTooLong(Exception):
+    pass
+
+
+def iter_lines(stream, max_line_bytes):
+    """
+    Yields (line number, bytes) for each line of a file-like stream, reading at most
+    max_line_bytes at a time. Longer lines yield LineTooLong instead and are skipped
+    without being held in memory.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_number, LineTooLong(f'Line is longer than {max_line_bytes} bytes.')
+        else:
+            yield line_number, line
+
+
+def import_ndjson_answers(stream, batch_size=None, max_line_bytes=None, max_errors=None):
+    """
+    Imports newline-delimited JSON answers ({"question_id", "assessment_id", "response_text"}
+    per line) from a file-like stream. Lines are parsed as they arrive and upserted with
+    ingest_answers every batch_size lines, each batch in its own transaction, so memory use
+    does not depend on the payload size.
+
+    Yields events as they happen: {'event': 'error', 'line', 'message'} for each rejected line
+    (only the first max_errors are reported one by one), {'event': 'progress', ...} after every
+    batch and a final {'event': 'done', ...} with the totals.
+    """
+    batch_size = batch_size or getattr(settings, 'ANSWER_IMPORT_BATCH_SIZE', DEFAULT_IMPORT_BATCH_SIZE)
+    max_line_bytes = max_line_bytes or getattr(settings, 'ANSWER_IMPORT_MAX_LINE_BYTES', DEFAULT_IMPORT_MAX_LINE_BYTES)
+    max_errors = max_errors if max_errors is not None else getattr(settings, 'ANSWER_IMPORT_MAX_REPORTED_ERRORS', DEFAULT_IMPORT_MAX_ERRORS)
+    started = time.monotonic()
+    totals = {'lines': 0, 'saved': 0, 'rejected': 0, 'batches': 0}
+
+    def reject(line_number, message):
+        totals['rejected'] += 1
+        if totals['rejected'] <= max_errors:
+            return {'event': 'error', 'line': line_number, 'message': message}
+        return None
+
+    def flush(batch):
+        totals['batches'] += 1
+        line_numbers = [line_number for line_number, _ in batch]
+        try:
+            responses, errors = ingest_answers([answer for _, answer in batch])
+        except DatabaseError as e:
+            print(f"Answer import batch at lines {line_numbers[0]}-{line_numbers[-1]} failed: {e}")
+            events = [reject(line_number, f'Could not be saved: {e}') for line_number in line_numbers]
+        else:
+            totals['saved'] += len(responses)
+            events = [reject(line_numbers[error['index']], error['message']) for error in errors]
+        events.append({'event': 'progress', **totals})
+        return [event for event in events if event is not None]
+
+    batch = []
+    for line_number, line in iter_lines(stream, max_line_bytes):
+        totals['lines'] = line_number
+        if isinstance(line, LineTooLong):
+            event = reject(line_number, str(line))
+        elif not line.strip():
+            continue
+        else:
+            try:
+                batch.append((line_number, json.loads(line)))
+                event = None
+            except ValueError:
+                event = reject(line_number, 'Invalid JSON.')
+        if event is not None:
+            yield event
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+    yield {'event': 'done', **totals, 'seconds': round(time.monotonic() - started, 3)}
@@ -0,0 +1,84 @@
+# assessments/services/scenario_bundle_service.py
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Length
+
+from assessments.models import AssessmentScenario, Question, RecordingStep
+from assessments.serializers import ScenarioBundleSerializer
+
+DEFAULT_CACHE_ALIAS = 'default'
+DEFAULT_TTL_SECONDS = 3600  # Bounds staleness after bulk writes, which send no signals
+KEY_PREFIX = 'scenario-bundle'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+BUNDLE_CACHE_CONTROL = 'public, no-cache'  # Clients keep the bundle but revalidate it with its ETag
+
+
+def numeric_order(field):
+    """
+    Ordering for the numeric strings kept in CharFields (priority, question_order): shorter
+    first, then by value, so '2' sorts before '10' without casting in SQL.
+    """
+    return [Length(field), field]
+
+
+def bundle_queryset():
+    """Scenarios with their questions and recording steps: one query per table."""
+    return AssessmentScenario.objects.order_by(*numeric_order('priority'), 'id').prefetch_related(
+        Prefetch('question_set', queryset=Question.objects.order_by(*numeric_order('question_order'), 'id'), to_attr='bundle_questions'),
+        Prefetch('recordingstep_set', queryset=RecordingStep.objects.order_by('number', 'id'), to_attr='bundle_steps'),
+    )
+
+
+def build_scenario_bundle():
+    scenarios = ScenarioBundleSerializer(bundle_queryset(), many=True).data
+    canonical = json.dumps(scenarios, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return {'scenarios': scenarios, 'etag': f'"{hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]}"'}
+
+
+def get_bundle_cache():
+    return caches[getattr(settings, 'SCENARIO_BUNDLE_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+
+def new_generation():
+    # Starts past any generation used before the counter was lost (eviction, cache restart)
+    return time.time_ns() // 1000
+
+
+def get_scenario_bundle():
+    """
+    Returns {'scenarios': [...], 'etag': ...}, built on a miss. Entries are keyed by a generation
+    number that invalidation bumps, so a bundle built from data read before a change is stored
+    under the old generation and never served afterwards.
+    """
+    cache = get_bundle_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, new_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    key = f'{KEY_PREFIX}:{generation}'
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_scenario_bundle()
+        cache.set(key, bundle, timeout=getattr(settings, 'SCENARIO_BUNDLE_CACHE_TTL', DEFAULT_TTL_SECONDS))
+    return bundle
+
+
+def invalidate_scenario_bundle():
+    """Drops the cached bundle once the current transaction commits (right away outside one)."""
+    def bump():
+        cache = get_bundle_cache()
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            if not cache.add(GENERATION_KEY, new_generation(), timeout=None):
+                cache.incr(GENERATION_KEY)
+
+    transaction.on_commit(bump)
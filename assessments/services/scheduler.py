@@ -0,0 +1,224 @@
+# assessments/services/scheduler.py
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_PRIORITY = 100
+DEFAULT_LEVEL_OFFSETS = {'Easy': 0, 'Medium': 10, 'Hard': 20}
+DEFAULT_AGING_SECONDS = 30.0  # Waiting this long promotes a job by one priority step
+DEFAULT_MAX_WAIT_SECONDS = 600.0  # Jobs older than this run next regardless of priority
+DEFAULT_MODEL_CONCURRENCY = {'default': 2}
+WAIT_SAMPLES_KEPT = 1000
+
+
+def scenario_priority(scenario):
+    """
+    Lower runs first. AssessmentScenario.priority is offset by its level, so quick Easy
+    scenarios are not stuck behind long Hard ones with a similar priority.
+    """
+    try:
+        priority = int(scenario.priority)
+    except (TypeError, ValueError):
+        priority = DEFAULT_PRIORITY
+    offsets = getattr(settings, 'SCHEDULER_LEVEL_OFFSETS', DEFAULT_LEVEL_OFFSETS)
+    return priority + offsets.get(scenario.level, max(offsets.values(), default=0))
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, args=(), model_name='default', patient_id=None, priority=DEFAULT_PRIORITY, key=None):
+        self.id = next(self._ids)
+        self.fn = fn
+        self.args = args
+        self.model_name = model_name
+        self.patient_id = patient_id
+        self.priority = priority
+        self.key = key  # Optional caller identifier, e.g. an assessment id
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.model_name} p{self.priority} patient={self.patient_id}>'
+
+
+class JobScheduler:
+    """
+    Thread-pool job runner with:
+    - priority buckets (lower first) with aging, so waiting jobs slowly move up,
+    - round-robin across patients inside a bucket, so one patient's backlog cannot hog it,
+    - per-model concurrency limits,
+    - a hard starvation bound: anything waiting longer than max_wait_seconds goes next.
+    """
+
+    def __init__(self, workers=4, model_concurrency=None, aging_seconds=None, max_wait_seconds=None):
+        self.workers = workers
+        self.model_concurrency = model_concurrency or getattr(settings, 'SCHEDULER_MODEL_CONCURRENCY', DEFAULT_MODEL_CONCURRENCY)
+        self.aging_seconds = aging_seconds or getattr(settings, 'SCHEDULER_AGING_SECONDS', DEFAULT_AGING_SECONDS)
+        self.max_wait_seconds = max_wait_seconds or getattr(settings, 'SCHEDULER_MAX_WAIT_SECONDS', DEFAULT_MAX_WAIT_SECONDS)
+
+        self._buckets = {}  # priority -> OrderedDict(patient_id -> deque of jobs)
+        self._running = defaultdict(int)  # model_name -> running jobs
+        self._running_by_patient = defaultdict(int)
+        self._depth = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+        self.completed = 0
+        self.failed = 0
+        self.starvation_promotions = 0
+        self._waits = defaultdict(lambda: deque(maxlen=WAIT_SAMPLES_KEPT))  # model_name -> recent wait times
+
+    # --- queueing ---
+
+    def submit(self, job):
+        with self._condition:
+            bucket = self._buckets.setdefault(job.priority, OrderedDict())
+            bucket.setdefault(job.patient_id, deque()).append(job)
+            self._depth += 1
+            self._condition.notify()
+        return job
+
+    def model_limit(self, model_name):
+        return self.model_concurrency.get(model_name, self.model_concurrency.get('default', 1))
+
+    def _has_capacity(self, model_name):
+        return self._running[model_name] < self.model_limit(model_name)
+
+    def _take(self, priority, patient_id):
+        bucket = self._buckets[priority]
+        job = bucket[patient_id].popleft()
+        if bucket[patient_id]:
+            bucket.move_to_end(patient_id)  # Next turn goes to the other patients in this bucket
+        else:
+            del bucket[patient_id]
+        if not bucket:
+            del self._buckets[priority]
+        self._depth -= 1
+        return job
+
+    def _next_job(self, now):
+        """Picks the next runnable job, or None if everything queued is blocked by model limits."""
+        heads = [
+            (jobs[0], priority, patient_id)
+            for priority, bucket in self._buckets.items()
+            for patient_id, jobs in bucket.items()
+        ]
+        if not heads:
+            return None
+
+        # Starvation guard: the longest-waiting runnable head past the bound wins outright
+        starved = [h for h in heads if now - h[0].enqueued_at >= self.max_wait_seconds and self._has_capacity(h[0].model_name)]
+        if starved:
+            _, priority, patient_id = min(starved, key=lambda h: h[0].enqueued_at)
+            self.starvation_promotions += 1
+            return self._take(priority, patient_id)
+
+        def sort_key(head):
+            job, priority, patient_id = head
+            # Whole aging steps only, so equal-priority heads tie and fall back to fairness:
+            # patients with fewer jobs running first, then round-robin order within the bucket
+            aged = priority - int((now - job.enqueued_at) // self.aging_seconds)
+            return (aged, self._running_by_patient[patient_id])
+
+        for job, priority, patient_id in sorted(heads, key=sort_key):
+            if self._has_capacity(job.model_name):
+                return self._take(priority, patient_id)
+        return None
+
+    # --- workers ---
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-scheduler-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = None
+                while not self._stopping:
+                    job = self._next_job(time.monotonic())
+                    if job is not None:
+                        break
+                    # Woken on submit or when a running job frees a model slot
+                    self._condition.wait(timeout=1.0)
+                if job is None:
+                    return
+                job.started_at = time.monotonic()
+                self._running[job.model_name] += 1
+                self._running_by_patient[job.patient_id] += 1
+                self._waits[job.model_name].append(job.started_at - job.enqueued_at)
+
+            try:
+                job.fn(*job.args)
+                succeeded = True
+            except Exception as e:
+                print(f"JobScheduler: {job} failed: {e}")
+                succeeded = False
+
+            with self._condition:
+                self._running[job.model_name] -= 1
+                self._running_by_patient[job.patient_id] -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._condition.notify_all()
+
+    def wait_idle(self, poll_interval=0.2):
+        """Blocks until nothing is queued or running."""
+        while True:
+            with self._condition:
+                if not self._depth and not any(self._running.values()):
+                    return
+            time.sleep(poll_interval)
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    # --- metrics ---
+
+    def stats(self):
+        """Queue depth per priority and model, running jobs, and wait-time percentiles per model (seconds)."""
+        with self._condition:
+            now = time.monotonic()
+            depth_by_priority = {}
+            depth_by_model = defaultdict(int)
+            oldest_wait = 0.0
+            for priority, bucket in sorted(self._buckets.items()):
+                depth_by_priority[priority] = sum(len(jobs) for jobs in bucket.values())
+                for jobs in bucket.values():
+                    oldest_wait = max(oldest_wait, now - jobs[0].enqueued_at)
+                    for job in jobs:
+                        depth_by_model[job.model_name] += 1
+            waits = {}
+            for model_name, samples in self._waits.items():
+                values = np.array(samples)
+                waits[model_name] = {
+                    'p50': float(np.percentile(values, 50)),
+                    'p95': float(np.percentile(values, 95)),
+                    'max': float(values.max()),
+                }
+            return {
+                'queue_depth': self._depth,
+                'depth_by_priority': depth_by_priority,
+                'depth_by_model': dict(depth_by_model),
+                'running_by_model': {name: count for name, count in self._running.items() if count},
+                'oldest_wait_seconds': oldest_wait,
+                'wait_seconds_by_model': waits,
+                'completed': self.completed,
+                'failed': self.failed,
+                'starvation_promotions': self.starvation_promotions,
+            }
@@ -0,0 +1,9 @@
+# assessments/services/stub_summary.py
+#
+# Canned summary returned by the in-process FakeBackend and the local LLM stub server.
+# Kept on its own so the stub server stays standard library only.
+
+STUB_SUMMARY = (
+    "Stub summary. This tool is for informational purposes only and is not a substitute "
+    "for professional medical advice."
+)
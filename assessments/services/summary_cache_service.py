@@ -0,0 +1,113 @@
+# assessments/services/summary_cache_service.py
+
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_CACHE_ALIAS = 'llm_summaries'
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+KEY_PREFIX = 'llm-summary'
+STATS_KEYS = ('hits', 'misses', 'bypassed', 'stores')
+
+_local_stats = {name: 0 for name in STATS_KEYS}
+_stats_lock = threading.Lock()
+
+
+def normalize_text(value):
+    """Case and whitespace differences in an answer don't change the prompt's meaning."""
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_answers(user_answers):
+    return {normalize_text(question): normalize_text(answer) for question, answer in user_answers.items()}
+
+
+def summary_cache_key(user_answers, prompt_version, model_name):
+    """SHA-256 over the canonical JSON of the normalized answers plus prompt version and model."""
+    canonical = json.dumps(
+        {'answers': normalize_answers(user_answers), 'prompt_version': prompt_version, 'model': model_name},
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+    )
+    return f"{KEY_PREFIX}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def get_summary_cache():
+    return caches[getattr(settings, 'LLM_SUMMARY_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+
+def summary_cache_enabled():
+    return getattr(settings, 'LLM_SUMMARY_CACHE_ENABLED', True)
+
+
+def _count(name):
+    with _stats_lock:
+        _local_stats[name] += 1
+    # Shared counters when the backend is shared (Redis, Memcached); per process with LocMemCache
+    cache = get_summary_cache()
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cached_summary(user_answers, generate, prompt_version, model_name, bypass=False):
+    """
+    Returns (summary, cache_hit). generate(user_answers) only runs on a miss, or always when
+    bypass is set (its result still refreshes the entry). Exceptions from generate are not cached.
+    """
+    if bypass or not summary_cache_enabled():
+        _count('bypassed')
+        summary = generate(user_answers)
+        if summary_cache_enabled():
+            store_summary(user_answers, summary, prompt_version, model_name)
+        return summary, False
+
+    summary = lookup_summary(user_answers, prompt_version, model_name)
+    if summary is not None:
+        return summary, True
+
+    summary = generate(user_answers)
+    store_summary(user_answers, summary, prompt_version, model_name)
+    return summary, False
+
+
+def lookup_summary(user_answers, prompt_version, model_name):
+    """The cached summary, or None on a miss (counted either way)."""
+    summary = get_summary_cache().get(summary_cache_key(user_answers, prompt_version, model_name))
+    _count('hits' if summary is not None else 'misses')
+    return summary
+
+
+def count_bypass():
+    _count('bypassed')
+
+
+def store_summary(user_answers, summary, prompt_version, model_name, key=None):
+    key = key or summary_cache_key(user_answers, prompt_version, model_name)
+    get_summary_cache().set(key, summary, timeout=getattr(settings, 'LLM_SUMMARY_CACHE_TTL', DEFAULT_TTL_SECONDS))
+    _count('stores')
+
+
+def summary_cache_stats():
+    cache = get_summary_cache()
+    shared = cache.get_many([f'{KEY_PREFIX}:stats:{name}' for name in STATS_KEYS])
+    totals = {name: shared.get(f'{KEY_PREFIX}:stats:{name}', 0) for name in STATS_KEYS}
+    lookups = totals['hits'] + totals['misses']
+    with _stats_lock:
+        process = dict(_local_stats)
+    return {
+        **totals,
+        'hit_rate': totals['hits'] / lookups if lookups else 0.0,
+        'this_process': process,
+    }
+
+
+def clear_summary_cache():
+    get_summary_cache().clear()
@@ -0,0 +1,379 @@
+# assessments/services/upload_service.py
+
+import datetime
+import os
+import re
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+
+from assessments.models import PatientFile, UploadSession
+from .blob_service import BlobMissing, acquire_blob, find_blob, get_media_storage, release_blob, store_blob
+from .media_service import initial_media_status
+
+PATIENT_MEDIA_DIR = 'patient_media'
+DEFAULT_MAX_UPLOAD_SIZE = 1024 * 1024 * 1024  # 1 GB
+DEFAULT_MAX_BATCH_UPLOAD_SIZE = 4 * 1024 * 1024 * 1024  # 4 GB per multi-file request
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Suggested chunk size handed to clients
+DEFAULT_UPLOAD_SESSION_TTL_SECONDS = 24 * 3600  # Active sessions with no chunk written for this long are expired
+UPLOAD_COMPLETE_ERROR = "Upload session is already complete."
+UPLOAD_EXPIRED_ERROR = "Upload session has expired."
+STREAM_READ_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadTooLarge(Exception):
+    """Raised while parsing the request body once an upload exceeds the size limit."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        super().__init__(f"Upload exceeds the maximum allowed size of {max_size} bytes.")
+
+
+def get_max_upload_size():
+    return getattr(settings, 'PATIENT_FILE_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+
+
+def get_max_batch_upload_size():
+    return getattr(settings, 'PATIENT_FILE_MAX_BATCH_UPLOAD_SIZE', DEFAULT_MAX_BATCH_UPLOAD_SIZE)
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Guards the upload handler chain against oversized recordings.
+    - Rejects the request up front when Content-Length is already too large
+      (max_request_size, which defaults to max_size; batch uploads carry several files).
+    - Otherwise counts each file's bytes as they stream past and aborts as soon as the limit is crossed.
+    Chunks are passed through untouched so the next handler (memory or temp file) stores them.
+    """
+
+    def __init__(self, request=None, max_size=None, max_request_size=None):
+        super().__init__(request)
+        self.max_size = max_size if max_size is not None else get_max_upload_size()
+        self.max_request_size = max_request_size if max_request_size is not None else self.max_size
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_request_size:
+            raise UploadTooLarge(self.max_request_size)
+        return None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def install_upload_guard(request, max_size=None, max_request_size=None):
+    """Puts the size guard at the front of the handler chain. Must run before request.data is read."""
+    request.upload_handlers.insert(0, MaxSizeUploadHandler(request, max_size=max_size, max_request_size=max_request_size))
+
+
+def save_patient_media(uploaded_file, storage=None):
+    """
+    Stores an uploaded file under patient_media/ without reading it into memory.
+    Storage backends consume the file through chunks(); temp-file uploads are moved into place.
+    Returns (stored_path, blob): the reference to the blob is taken here, and belongs to the
+    PatientFile created for it, or has to be given back with discard_patient_media.
+    """
+    storage = storage or get_media_storage()
+    file_name = storage.get_available_name(os.path.join(PATIENT_MEDIA_DIR, uploaded_file.name))
+    return store_blob(file_name, uploaded_file, storage=storage)
+
+
+def discard_patient_media(blobs):
+    """Gives back the references of stored files that did not end up in a PatientFile."""
+    for blob in blobs:
+        if blob is not None:
+            release_blob(blob.pk)
+
+
+def create_patient_file(assessment, step, stored_path, content_type, blob=None):
+    """
+    Creates the PatientFile row for a file that is already in storage; blob is the reference
+    save_patient_media took for it.
+    Videos are left pending; the media worker fills in duration and metadata later,
+    unless the same content has already been probed for another file.
+    """
+    patient_file = PatientFile(
+        assessment_id=assessment,
+        step_id=step,
+        file_path=stored_path,
+        blob_id=blob,
+        file_type=content_type,
+        media_status=initial_media_status(content_type),
+    )
+    if blob is not None:
+        probed = PatientFile.objects.filter(blob_id=blob, media_status='ready').exclude(media_metadata=None).first()
+        if probed is not None:
+            patient_file.duration = probed.duration
+            patient_file.media_metadata = probed.media_metadata
+            patient_file.media_status = 'ready'
+    patient_file.save()
+    return patient_file
+
+
+def create_patient_files(assessment, items):
+    """
+    Batch version of create_patient_file for a whole recording session.
+    items is a list of (step, stored_path, content_type, blob) with the blob references taken by
+    save_patient_media. Probed metadata is looked up with one query and all rows go in with one
+    bulk insert. Returns the PatientFiles in the order given.
+    """
+    paths = [stored_path for _, stored_path, _, _ in items]
+    with transaction.atomic():
+        blob_ids = {blob.pk for _, _, _, blob in items if blob is not None}
+        probed = {}
+        for ready in PatientFile.objects.filter(blob_id__in=blob_ids, media_status='ready').exclude(media_metadata=None):
+            probed.setdefault(ready.blob_id_id, ready)
+
+        patient_files = []
+        for step, stored_path, content_type, blob in items:
+            patient_file = PatientFile(
+                assessment_id=assessment,
+                step_id=step,
+                file_path=stored_path,
+                blob_id=blob,
+                file_type=content_type,
+                media_status=initial_media_status(content_type),
+            )
+            sibling = probed.get(blob.pk) if blob is not None else None
+            if sibling is not None:
+                patient_file.duration = sibling.duration
+                patient_file.media_metadata = sibling.media_metadata
+                patient_file.media_status = 'ready'
+            patient_files.append(patient_file)
+        PatientFile.objects.bulk_create(patient_files)
+
+        if patient_files and patient_files[0].pk is None:
+            # Backends without RETURNING (MySQL) don't set primary keys on bulk_create; read them back
+            ids = {}
+            rows = PatientFile.objects.filter(
+                assessment_id=assessment,
+                file_path__in=set(paths),
+                created_at__gte=min(f.created_at for f in patient_files),
+            ).order_by('id').values_list('id', 'step_id', 'file_path')
+            for pk, step_id, file_path in rows:
+                ids.setdefault((step_id, file_path), []).append(pk)
+            for patient_file in reversed(patient_files):
+                patient_file.pk = ids[(patient_file.step_id_id, patient_file.file_path)].pop()
+    return patient_files
+
+
+# --- Resumable uploads ---
+
+class PartFile(File):
+    """
+    A fully assembled upload part on local disk.
+    Exposing temporary_file_path() lets FileSystemStorage move it into place instead of copying.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_upload_tmp_dir():
+    default_dir = os.path.join(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), 'patient_uploads')
+    return getattr(settings, 'PATIENT_FILE_UPLOAD_TMP_DIR', default_dir)
+
+
+def get_part_path(session):
+    return os.path.join(get_upload_tmp_dir(), f'{session.id}.part')
+
+
+def get_upload_session_ttl():
+    return getattr(settings, 'PATIENT_FILE_UPLOAD_SESSION_TTL_SECONDS', DEFAULT_UPLOAD_SESSION_TTL_SECONDS)
+
+
+def remove_part_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def merge_ranges(ranges, start, end):
+    """Adds [start, end) to a sorted list of disjoint ranges, coalescing overlapping or touching ones."""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def upload_session_payload(session):
+    return {
+        'upload_id': str(session.id),
+        'upload_status': session.status,
+        'total_size': session.total_size,
+        'committed_offset': session.committed_offset,
+        'received_ranges': session.received_ranges,
+    }
+
+
+def create_upload_session(assessment, step, file_name, content_type, total_size, sha256=None):
+    """
+    Registers a resumable upload and preallocates its part file. Returns (session, error).
+    When the client supplies the SHA-256 of content we already hold, the session completes
+    immediately against the existing blob and no bytes need to be sent.
+    """
+    if total_size <= 0:
+        return None, "total_size must be a positive number of bytes."
+    if total_size > get_max_upload_size():
+        return None, f"Upload exceeds the maximum allowed size of {get_max_upload_size()} bytes."
+
+    session = UploadSession(
+        assessment_id=assessment,
+        step_id=step,
+        file_name=os.path.basename(file_name),
+        content_type=content_type,
+        total_size=total_size,
+    )
+    blob = find_blob(sha256) if sha256 else None
+    if blob is not None and blob.size == total_size:
+        try:
+            session.patient_file = create_patient_file(assessment, step, blob.file_path, content_type, blob=acquire_blob(blob.file_path))
+        except BlobMissing:
+            pass  # Released in the meantime; the bytes have to be sent after all
+    if session.patient_file is not None:
+        session.status = 'complete'
+        session.received_ranges = [[0, total_size]]
+        session.committed_offset = total_size
+        session.save()
+        return session, None
+
+    session.save()
+    os.makedirs(get_upload_tmp_dir(), exist_ok=True)
+    # A sparse file of the final size, so chunks can be written at their offsets in any order
+    with open(get_part_path(session), 'wb') as part:
+        part.truncate(total_size)
+    return session, None
+
+
+def closed_session_error(session):
+    return UPLOAD_EXPIRED_ERROR if session is None else UPLOAD_COMPLETE_ERROR
+
+
+def write_upload_chunk(session, start, end, stream):
+    """
+    Writes bytes [start, end] (inclusive, as in Content-Range) from stream into the part file.
+    Chunks for different ranges may arrive concurrently; only the range bookkeeping is serialized,
+    and re-checks under the row lock that the session was not finalized or expired meanwhile.
+    Returns (session, error).
+    """
+    if session.status != 'active':
+        return None, UPLOAD_COMPLETE_ERROR
+    if start < 0 or end < start or end >= session.total_size:
+        return None, "Chunk range is outside the declared file size."
+
+    try:
+        fd = os.open(get_part_path(session), os.O_WRONLY)
+    except FileNotFoundError:
+        # Finalized or expired since the session was read
+        return None, closed_session_error(UploadSession.objects.filter(pk=session.pk).first())
+    try:
+        offset = start
+        remaining = end - start + 1
+        while remaining > 0:
+            data = stream.read(min(STREAM_READ_SIZE, remaining))
+            if not data:
+                break
+            os.pwrite(fd, data, offset)
+            offset += len(data)
+            remaining -= len(data)
+    finally:
+        os.close(fd)
+
+    # Only the bytes that actually arrived count as received
+    if offset == start:
+        return None, "Chunk body is empty."
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+        if session is None or session.status != 'active':
+            return None, closed_session_error(session)
+        session.received_ranges = merge_ranges(session.received_ranges, start, offset)
+        first = session.received_ranges[0]
+        session.committed_offset = first[1] if first[0] == 0 else 0
+        session.save(update_fields=['received_ranges', 'committed_offset', 'updated_at'])
+
+    if remaining > 0:
+        return session, "Chunk body was shorter than its Content-Range."
+    return session, None
+
+
+def finalize_upload_session(session):
+    """Moves a fully received part file into patient media storage and creates its PatientFile. Returns (patient_file, error)."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'complete':
+            return session.patient_file, None
+        if session.committed_offset < session.total_size:
+            return None, f"Upload is incomplete: {session.committed_offset} of {session.total_size} bytes received."
+
+        part_path = get_part_path(session)
+        with open(part_path, 'rb') as part:
+            part_file = PartFile(part, name=session.file_name)
+            stored_path, blob = save_patient_media(part_file)
+        # Non-filesystem backends copy from the part file instead of moving it
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+        patient_file = create_patient_file(session.assessment_id, session.step_id, stored_path, session.content_type, blob=blob)
+        session.status = 'complete'
+        session.patient_file = patient_file
+        session.save(update_fields=['status', 'patient_file', 'updated_at'])
+    return patient_file, None
+
+
+def expire_upload_sessions(ttl_seconds=None):
+    """
+    Deletes active upload sessions that have had no chunk written for ttl_seconds (defaults to
+    PATIENT_FILE_UPLOAD_SESSION_TTL_SECONDS) together with their part files, and part files that
+    are as old and no longer belong to an active session. Returns (sessions, part files) deleted.
+    """
+    ttl_seconds = ttl_seconds if ttl_seconds is not None else get_upload_session_ttl()
+    cutoff = timezone.now() - datetime.timedelta(seconds=ttl_seconds)
+
+    expired_sessions = expired_parts = 0
+    stale = UploadSession.objects.filter(status='active', updated_at__lt=cutoff)
+    for session_id in list(stale.values_list('id', flat=True)):
+        with transaction.atomic():
+            # Re-checked under the lock: the session may have been written to or finalized since
+            session = stale.select_for_update().filter(pk=session_id).first()
+            if session is None:
+                continue
+            session.delete()
+        expired_sessions += 1
+        expired_parts += remove_part_file(os.path.join(get_upload_tmp_dir(), f'{session_id}.part'))
+
+    # Part files of sessions deleted by other means (assessment deleted, crashed finalize)
+    try:
+        names = os.listdir(get_upload_tmp_dir())
+    except FileNotFoundError:
+        names = []
+    orphans = {}
+    for name in names:
+        path = os.path.join(get_upload_tmp_dir(), name)
+        stem, extension = os.path.splitext(name)
+        try:
+            session_id = uuid.UUID(stem)
+        except ValueError:
+            continue
+        if extension == '.part' and os.path.getmtime(path) < cutoff.timestamp():
+            orphans[session_id] = path
+    active = set(UploadSession.objects.filter(pk__in=orphans, status='active').values_list('id', flat=True))
+    for session_id, path in orphans.items():
+        if session_id not in active:
+            expired_parts += remove_part_file(path)
+    return expired_sessions, expired_parts
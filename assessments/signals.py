@@ -0,0 +1,21 @@
+# assessments/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AssessmentScenario, PatientFile, Question, RecordingStep
+from .services.blob_service import release_blob
+from .services.scenario_bundle_service import invalidate_scenario_bundle
+
+
+@receiver(post_delete, sender=PatientFile)
+def release_patient_file_blob(sender, instance, **kwargs):
+    if instance.blob_id_id:
+        release_blob(instance.blob_id_id)
+
+
+@receiver([post_save, post_delete], sender=AssessmentScenario)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=RecordingStep)
+def invalidate_bundle_on_scenario_change(sender, **kwargs):
+    invalidate_scenario_bundle()
@@ -0,0 +1,111 @@
+# assessments/storage.py
+
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = 'patient_media'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once, named after the SHA-256 of its content.
+
+    Blobs live under patient_media/<2 hex>/<2 hex>/<sha256><ext>, so no directory grows
+    past a few hundred entries. The hash is computed while the upload streams in; when the
+    blob already exists the new copy is dropped, so a retried upload costs one hash pass
+    instead of another write. The name passed to save() only contributes its extension.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content in _save(), so there is nothing to deduplicate here
+        return name
+
+    @staticmethod
+    def blob_name(digest, extension=''):
+        return os.path.join(BLOB_DIR, digest[:2], digest[2:4], f'{digest}{extension.lower()}')
+
+    @staticmethod
+    def digest_from_name(name):
+        """Returns the SHA-256 a blob name was derived from, or None for files stored outside the blob layout."""
+        parts = os.path.normpath(name).split(os.sep)
+        if len(parts) != 4 or parts[0] != BLOB_DIR:
+            return None
+        digest = parts[3].split('.', 1)[0]
+        if len(digest) != 64 or not digest.startswith(parts[1] + parts[2]):
+            return None
+        return digest
+
+    @contextmanager
+    def stage(self, name, content):
+        """
+        Hashes content and yields (blob name, local path holding the content) without touching
+        the blob itself; place() puts it there. Temp-file uploads are hashed in place, anything
+        else is spooled to .incoming/ while hashing. Spooled copies are removed on exit.
+        """
+        extension = os.path.splitext(name)[1]
+        if hasattr(content, 'temporary_file_path'):
+            # Already on local disk: hash it in place, so nothing is rewritten
+            source_path = content.temporary_file_path()
+            with open(source_path, 'rb') as source:
+                digest = hashlib.file_digest(source, 'sha256').hexdigest()
+            yield self.blob_name(digest, extension), source_path
+            return
+
+        incoming_dir = self.path('.incoming')
+        os.makedirs(incoming_dir, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, incoming_path = tempfile.mkstemp(dir=incoming_dir)
+        try:
+            with os.fdopen(fd, 'wb') as incoming:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    incoming.write(chunk)
+            yield self.blob_name(hasher.hexdigest(), extension), incoming_path
+        finally:
+            if os.path.exists(incoming_path):
+                os.remove(incoming_path)
+
+    def place(self, staged_path, blob_name):
+        """
+        Moves staged content into its blob path. os.replace is atomic, so a concurrent upload of
+        the same content that gets there first is simply overwritten with identical bytes. Staged
+        files on another filesystem (upload temp dirs on tmpfs) are copied next to the blob first,
+        so readers still never see a partly written blob.
+        """
+        full_path = self.path(blob_name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            os.replace(staged_path, full_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            fd, copy_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix='.incoming-')
+            try:
+                with os.fdopen(fd, 'wb') as copy, open(staged_path, 'rb') as staged:
+                    shutil.copyfileobj(staged, copy)
+                os.replace(copy_path, full_path)
+            finally:
+                if os.path.exists(copy_path):
+                    os.remove(copy_path)
+            os.remove(staged_path)
+        self._apply_permissions(full_path)
+
+    def _save(self, name, content):
+        # Plain save() without reference counting; patient uploads go through blob_service.store_blob,
+        # which decides whether to place the content while holding the blob row lock
+        with self.stage(name, content) as (blob_name, staged_path):
+            if not self.exists(blob_name):
+                self.place(staged_path, blob_name)
+        return blob_name
+
+    def _apply_permissions(self, full_path):
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
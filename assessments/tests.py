@@ -1,3 +1,1663 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import errno
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import signing
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from assessments.management.commands.explain_hot_queries import explain
+from assessments.models import (
+    AnalysisJob,
+    Assessment,
+    AssessmentScenario,
+    FrameStore,
+    InferenceResult,
+    MediaBlob,
+    PatientFile,
+    Question,
+    RecordingStep,
+    ResponseData,
+    UploadSession,
+)
+from assessments.services import analysis_job_service, analysis_stream_service, assessment_pipeline, media_probe, report_batch_service
+from assessments.services.analysis_backends import AnalysisBackendError, FakeBackend, HTTPBackend, build_analysis_backend
+from assessments.services.analysis_job_service import AnalysisQueueFull, claim_analysis_job, enqueue_analysis, requeue_stale_jobs, run_analysis_job
+from assessments.services.assessment_pipeline import assessments_with_pending_work, build_assessment_job, process_assessment
+from assessments.services.blob_service import BlobMissing, acquire_blob, release_blob, store_blob
+from assessments.services.circuit_breaker import CircuitBreaker, CircuitOpenError, ProviderGuard, ProviderUnavailable
+from assessments.services.frame_extractor import extract_frames, progress_path
+from assessments.services.frame_store_service import frames_for_patient_file, queue_frame_stores, run_frame_extraction
+from assessments.services.gemini_service import AnalysisResult, AnalysisStream
+from assessments.services.inference_cache import InferenceCache
+from assessments.services.inference_models import dummy_cpu_model
+from assessments.services.inference_service import ModelRegistry
+from assessments.services.llm_client import GeminiClientManager
+from assessments.services.llm_stub_server import start_stub_server
+from assessments.services.media_probe import ContainerParseError, parse_matroska, parse_mp4, probe_container, read_vint
+from assessments.services.media_service import claim_pending_files, initial_media_status, process_pending_media, requeue_stale_files
+from assessments.services.media_stream_service import STREAM_TOKEN_SALT, RangeNotSatisfiable, parse_range
+from assessments.services.prescoring_service import PreScorer, normalize_answer
+from assessments.services.prompt_builder import OTHER_DOMAIN, build_prompt, estimate_tokens
+from assessments.services.question_bank import SAMPLE_USER_ANSWERS
+from assessments.services.rate_limit import RateLimitTimeout, TokenBucket
+from assessments.services.report_batch_service import ReportBatch, enqueue_report_batch, load_user_answers
+from assessments.services import response_service
+from assessments.services.response_service import import_ndjson_answers, ingest_answers
+from assessments.services.scenario_bundle_service import get_bundle_cache, get_scenario_bundle
+from assessments.services.scheduler import Job, JobScheduler, scenario_priority
+from assessments.services.stub_summary import STUB_SUMMARY
+from assessments.services.summary_cache_service import (
+    cached_summary,
+    clear_summary_cache,
+    get_summary_cache,
+    summary_cache_key,
+    summary_cache_stats,
+)
+from assessments.services.upload_service import (
+    UPLOAD_COMPLETE_ERROR,
+    UPLOAD_EXPIRED_ERROR,
+    MaxSizeUploadHandler,
+    UploadTooLarge,
+    create_upload_session,
+    expire_upload_sessions,
+    get_part_path,
+    merge_ranges,
+    write_upload_chunk,
+)
+from assessments.storage import ContentAddressedStorage
+
+
+def create_scenario(**fields):
+    return AssessmentScenario.objects.create(**{'name': 'Scenario', 'description': '', 'img_path': '', 'level': 'Easy', 'model_name': '', **fields})
+
+
+def create_assessment(scenario=None):
+    user = User.objects.create_user(email=f'patient-{User.objects.count()}@example.com', username='patient')
+    return Assessment.objects.create(
+        as_id=scenario or create_scenario(), patient_id=user, assessment_date=datetime.date.today(), result_summary=''
+    )
+
+
+def create_step(scenario, number=1):
+    return RecordingStep.objects.create(
+        as_id=scenario, number=number, name=f'Step {number}', description='', img_path='', expected_duration=datetime.timedelta(seconds=30)
+    )
+
+
+class UploadGuardTests(TestCase):
+    url = '/assessment/patient-file/upload/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = directory.name
+        override = self.settings(STORAGES={**settings.STORAGES, 'patient_media': {
+            'BACKEND': 'assessments.storage.ContentAddressedStorage', 'OPTIONS': {'location': self.media_root},
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.assessment = create_assessment()
+        self.step = create_step(self.assessment.as_id)
+
+    def upload(self, data):
+        return self.client.post(self.url, {
+            'assessment_id': self.assessment.pk,
+            'step_id': self.step.pk,
+            'file': SimpleUploadedFile('step.webm', data, content_type='video/webm'),
+        })
+
+    def test_content_length_over_the_request_limit_is_refused_up_front(self):
+        handler = MaxSizeUploadHandler(max_size=10, max_request_size=100)
+        self.assertIsNone(handler.handle_raw_input(None, {}, 100, b'boundary'))
+        with self.assertRaises(UploadTooLarge):
+            handler.handle_raw_input(None, {}, 101, b'boundary')
+
+    def test_streamed_bytes_over_the_file_limit_abort_the_upload(self):
+        handler = MaxSizeUploadHandler(max_size=10)
+        self.assertEqual(handler.receive_data_chunk(b'01234', 0), b'01234')
+        self.assertEqual(handler.receive_data_chunk(b'56789', 5), b'56789')
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'a', 10)
+
+    def test_upload_is_stored_and_recorded(self):
+        response = self.upload(b'recording')
+        self.assertEqual(response.status_code, 201)
+        patient_file = PatientFile.objects.get(pk=response.json()['id'])
+        self.assertEqual(patient_file.media_status, 'pending')
+        with open(os.path.join(self.media_root, patient_file.file_path), 'rb') as stored:
+            self.assertEqual(stored.read(), b'recording')
+
+    def test_oversized_upload_gets_413_and_stores_nothing(self):
+        with self.settings(PATIENT_FILE_MAX_UPLOAD_SIZE=4):
+            response = self.upload(b'recording')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['message'], 'Upload exceeds the maximum allowed size of 4 bytes.')
+        self.assertFalse(PatientFile.objects.exists())
+        self.assertFalse(MediaBlob.objects.exists())
+
+
+class BatchUploadTests(TestCase):
+    url = '/assessment/patient-file/upload/batch/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = self.settings(STORAGES={**settings.STORAGES, 'patient_media': {
+            'BACKEND': 'assessments.storage.ContentAddressedStorage', 'OPTIONS': {'location': directory.name},
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.assessment = create_assessment()
+        self.steps = [create_step(self.assessment.as_id, number) for number in (1, 2)]
+
+    def part(self, data=b'recording', content_type='video/webm'):
+        return SimpleUploadedFile('step.webm', data, content_type=content_type)
+
+    def test_every_step_is_recorded_in_one_request(self):
+        response = self.client.post(self.url, {
+            'assessment_id': self.assessment.pk,
+            f'step_{self.steps[0].pk}': self.part(b'first'),
+            f'step_{self.steps[1].pk}': self.part(b'second', 'audio/webm'),
+        })
+        self.assertEqual(response.status_code, 201)
+        files = response.json()['files']
+        self.assertEqual([(f['step_id'], f['media_status']) for f in files], [(self.steps[0].pk, 'pending'), (self.steps[1].pk, 'ready')])
+        self.assertEqual(sorted(PatientFile.objects.values_list('id', flat=True)), sorted(f['id'] for f in files))
+
+    def test_bad_parts_are_refused_before_anything_is_stored(self):
+        other_step = create_step(create_scenario())
+        cases = {
+            'field name': ({'video': self.part()}, 'Unexpected file field "video", expected step_<step_id>.'),
+            'repeated step': ({f'step_{self.steps[0].pk}': [self.part(), self.part()]}, f'More than one file for recording step {self.steps[0].pk}.'),
+            'foreign step': ({f'step_{other_step.pk}': self.part()}, f'Unknown recording steps for this assessment: [{other_step.pk}].'),
+        }
+        for name, (parts, message) in cases.items():
+            with self.subTest(name):
+                response = self.client.post(self.url, {'assessment_id': self.assessment.pk, **parts})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['message'], message)
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_failed_insert_gives_back_the_stored_blobs(self):
+        parts = {f'step_{step.pk}': self.part(str(step.pk).encode()) for step in self.steps}
+        with mock.patch('assessments.views.create_patient_files', side_effect=DatabaseError('deadlock')):
+            with self.assertRaises(DatabaseError), self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {'assessment_id': self.assessment.pk, **parts})
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_request_limit_covers_the_whole_batch(self):
+        parts = {f'step_{step.pk}': self.part() for step in self.steps}
+        with self.settings(PATIENT_FILE_MAX_BATCH_UPLOAD_SIZE=64):
+            response = self.client.post(self.url, {'assessment_id': self.assessment.pk, **parts})
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(PatientFile.objects.exists())
+
+
+class MergeRangesTests(SimpleTestCase):
+    def test_first_range(self):
+        self.assertEqual(merge_ranges([], 0, 10), [[0, 10]])
+
+    def test_disjoint_ranges_stay_apart_and_sorted(self):
+        self.assertEqual(merge_ranges([[20, 30]], 0, 10), [[0, 10], [20, 30]])
+
+    def test_touching_ranges_coalesce(self):
+        self.assertEqual(merge_ranges([[0, 10]], 10, 20), [[0, 20]])
+
+    def test_overlapping_ranges_coalesce(self):
+        self.assertEqual(merge_ranges([[0, 10], [20, 30]], 5, 25), [[0, 30]])
+
+    def test_contained_range_changes_nothing(self):
+        self.assertEqual(merge_ranges([[0, 30]], 5, 10), [[0, 30]])
+
+    def test_gap_filled_out_of_order(self):
+        ranges = []
+        for start, end in [(40, 50), (0, 10), (20, 30), (10, 20), (30, 40)]:
+            ranges = merge_ranges(ranges, start, end)
+        self.assertEqual(ranges, [[0, 50]])
+
+    def test_input_is_not_modified(self):
+        ranges = [[0, 10]]
+        merge_ranges(ranges, 10, 20)
+        self.assertEqual(ranges, [[0, 10]])
+
+
+def mp4_box(box_type, *children):
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def mp4_time_header(timescale, duration):
+    # Version 0 mvhd/mdhd: version+flags, creation and modification times, then timescale and duration
+    return bytes(12) + struct.pack('>II', timescale, duration)
+
+
+def sample_mp4(movie_duration=3000, width=64, height=48):
+    """3 s, 30 frames at 10 fps in a 1000 Hz movie timescale and a 10 Hz track timescale."""
+    stsd = bytes(4) + struct.pack('>II', 1, 0) + b'mp4v'
+    stts = bytes(4) + struct.pack('>III', 1, 30, 1)
+    trak = mp4_box(
+        b'trak',
+        mp4_box(b'tkhd', bytes(76) + struct.pack('>II', width << 16, height << 16)),
+        mp4_box(
+            b'mdia',
+            mp4_box(b'mdhd', mp4_time_header(10, 30)),
+            mp4_box(b'hdlr', bytes(8) + b'vide' + bytes(12)),
+            mp4_box(b'minf', mp4_box(b'stbl', mp4_box(b'stsd', stsd), mp4_box(b'stts', stts))),
+        ),
+    )
+    return mp4_box(b'ftyp', b'isom') + mp4_box(b'moov', mp4_box(b'mvhd', mp4_time_header(1000, movie_duration)), trak)
+
+
+def ebml_element(element_id, payload):
+    size = len(payload)
+    encoded_size = bytes([0x80 | size]) if size < 0x7F else struct.pack('>H', 0x4000 | size)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + encoded_size + payload
+
+
+def ebml_uint(element_id, value):
+    return ebml_element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+
+def sample_webm(duration_ms=3000.0, unknown_segment_size=False):
+    """3 s at 10 fps (100 ms DefaultDuration), 64x48 VP8."""
+    header = ebml_element(media_probe.EBML_HEADER, ebml_element(media_probe.EBML_DOCTYPE, b'webm'))
+    info_children = [ebml_uint(media_probe.MKV_TIMESTAMP_SCALE, 1000000)]
+    if duration_ms is not None:
+        info_children.append(ebml_element(media_probe.MKV_DURATION, struct.pack('>d', duration_ms)))
+    track = ebml_element(media_probe.MKV_TRACK_ENTRY, b''.join([
+        ebml_uint(media_probe.MKV_TRACK_TYPE, 1),
+        ebml_element(media_probe.MKV_CODEC_ID, b'V_VP8'),
+        ebml_uint(media_probe.MKV_DEFAULT_DURATION, 100000000),
+        ebml_element(media_probe.MKV_VIDEO, ebml_uint(media_probe.MKV_PIXEL_WIDTH, 64) + ebml_uint(media_probe.MKV_PIXEL_HEIGHT, 48)),
+    ]))
+    body = ebml_element(media_probe.MKV_INFO, b''.join(info_children)) + ebml_element(media_probe.MKV_TRACKS, track)
+    body += ebml_element(media_probe.MKV_CLUSTER, bytes(16))
+    if unknown_segment_size:
+        # Live recorders write the Segment before they know its size
+        segment = media_probe.MKV_SEGMENT.to_bytes(4, 'big') + b'\x01' + b'\xff' * 7 + body
+    else:
+        segment = ebml_element(media_probe.MKV_SEGMENT, body)
+    return header + segment
+
+
+
+class UploadSessionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tmp_dir = directory.name
+        override = self.settings(PATIENT_FILE_UPLOAD_TMP_DIR=self.tmp_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.assessment = create_assessment()
+        self.step = create_step(self.assessment.as_id)
+
+    def session(self, idle_seconds=0, status='active'):
+        session, _ = create_upload_session(self.assessment, self.step, 'step.mp4', 'video', 1024)
+        UploadSession.objects.filter(pk=session.pk).update(status=status, updated_at=timezone.now() - datetime.timedelta(seconds=idle_seconds))
+        return session
+
+    def test_idle_sessions_and_their_part_files_are_deleted(self):
+        idle = self.session(idle_seconds=7200)
+        recent = self.session(idle_seconds=60)
+        self.assertEqual(expire_upload_sessions(ttl_seconds=3600), (1, 1))
+        self.assertFalse(UploadSession.objects.filter(pk=idle.pk).exists())
+        self.assertFalse(os.path.exists(get_part_path(idle)))
+        self.assertTrue(os.path.exists(get_part_path(recent)))
+
+    def test_complete_sessions_are_kept(self):
+        complete = self.session(idle_seconds=7200, status='complete')
+        self.assertEqual(expire_upload_sessions(ttl_seconds=3600), (0, 0))
+        self.assertTrue(UploadSession.objects.filter(pk=complete.pk).exists())
+
+    def test_old_part_files_without_a_session_are_deleted(self):
+        orphan = self.session()
+        recent_orphan = self.session()
+        UploadSession.objects.filter(pk__in=[orphan.pk, recent_orphan.pk]).delete()
+        old = (timezone.now() - datetime.timedelta(hours=2)).timestamp()
+        os.utime(get_part_path(orphan), (old, old))
+        open(os.path.join(self.tmp_dir, 'notes.txt'), 'w').close()
+        self.assertEqual(expire_upload_sessions(ttl_seconds=3600), (0, 1))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), sorted(['notes.txt', os.path.basename(get_part_path(recent_orphan))]))
+
+    def test_chunk_for_a_session_finalized_meanwhile(self):
+        session = self.session()
+        UploadSession.objects.filter(pk=session.pk).update(status='complete')
+        self.assertEqual(write_upload_chunk(session, 0, 3, io.BytesIO(b'data')), (None, UPLOAD_COMPLETE_ERROR))
+        os.remove(get_part_path(session))
+        self.assertEqual(write_upload_chunk(session, 0, 3, io.BytesIO(b'data')), (None, UPLOAD_COMPLETE_ERROR))
+
+    def test_chunk_for_a_session_expired_meanwhile(self):
+        session = self.session(idle_seconds=7200)
+        expire_upload_sessions(ttl_seconds=3600)
+        self.assertEqual(write_upload_chunk(session, 0, 3, io.BytesIO(b'data')), (None, UPLOAD_EXPIRED_ERROR))
+
+
+class ProbeResultExecutor:
+    """Stands in for the probe process pool: returns the canned result (or raises the error) per path."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def submit(self, fn, path):
+        future = Future()
+        result = self.results[os.path.basename(path)]
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+        return future
+
+
+class MediaWorkerTests(TestCase):
+    def setUp(self):
+        self.assessment = create_assessment()
+        self.step = create_step(self.assessment.as_id)
+
+    def patient_file(self, name='step.mp4', media_status='pending', assessment=None):
+        return PatientFile.objects.create(
+            assessment_id=assessment or self.assessment, step_id=self.step, file_path=f'patient_media/{name}', file_type='video/mp4',
+            media_status=media_status,
+        )
+
+    def test_only_videos_wait_for_the_worker(self):
+        self.assertEqual(initial_media_status('video/webm'), 'pending')
+        self.assertEqual(initial_media_status('image/png'), 'ready')
+
+    def test_claims_pending_files_in_order(self):
+        files = [self.patient_file(f'{i}.mp4') for i in range(3)]
+        self.patient_file('ready.mp4', media_status='ready')
+        self.assertEqual([f.pk for f in claim_pending_files(2)], [files[0].pk, files[1].pk])
+        self.assertEqual([f.pk for f in claim_pending_files(2)], [files[2].pk])
+        self.assertEqual(claim_pending_files(2), [])
+        self.assertEqual(PatientFile.objects.filter(media_status='processing').count(), 3)
+
+    def test_claims_can_be_limited_to_one_assessment(self):
+        self.patient_file('other.mp4', assessment=create_assessment(self.assessment.as_id))
+        mine = self.patient_file()
+        self.assertEqual([f.pk for f in claim_pending_files(10, assessment_id=self.assessment.pk)], [mine.pk])
+
+    def test_stale_processing_files_are_requeued(self):
+        stale = self.patient_file('stale.mp4', media_status='processing')
+        recent = self.patient_file('recent.mp4', media_status='processing')
+        PatientFile.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(requeue_stale_files(), 1)
+        self.assertEqual(PatientFile.objects.get(pk=stale.pk).media_status, 'pending')
+        self.assertEqual(PatientFile.objects.get(pk=recent.pk).media_status, 'processing')
+
+    def test_probe_results_and_failures_are_stored(self):
+        probed = self.patient_file('probed.mp4')
+        broken = self.patient_file('broken.mp4')
+        executor = ProbeResultExecutor({'probed.mp4': {'duration_seconds': 12.7, 'fps': 30}, 'broken.mp4': ValueError('no moov box')})
+        self.assertEqual(process_pending_media(executor), 2)
+
+        probed.refresh_from_db()
+        self.assertEqual(probed.media_status, 'ready')
+        self.assertEqual(probed.duration, datetime.timedelta(seconds=12))
+        self.assertEqual(probed.media_metadata['fps'], 30)
+        broken.refresh_from_db()
+        self.assertEqual(broken.media_status, 'failed')
+        self.assertEqual(broken.media_metadata, {'error': 'no moov box'})
+
+
+def sample_avi(path, frame_count=20, fps=10, size=(64, 48)):
+    """MJPG clip whose frame i is flat grey at level 10 * i."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frame_count):
+        writer.write(np.full((size[1], size[0], 3), 10 * i, np.uint8))
+    writer.release()
+    return path
+
+
+class FrameStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.video = sample_avi(os.path.join(self.root, 'step.avi'))
+
+    def extract(self, store_path):
+        return extract_frames(self.video, store_path, 2, 16, 12, duration_seconds=2.0)
+
+    def test_frames_are_sampled_resized_and_checkpointed(self):
+        store_path = os.path.join(self.root, 'frames', 'step.npy')
+        self.assertEqual(self.extract(store_path), (4, 4))
+        frames = np.load(store_path)
+        self.assertEqual(frames.shape, (4, 12, 16, 3))
+        np.testing.assert_allclose(frames.mean(axis=(1, 2, 3)), [0, 50, 100, 150], atol=3)
+        with open(progress_path(store_path)) as progress:
+            self.assertEqual(progress.read(), '4')
+
+    def test_interrupted_extraction_resumes_from_the_checkpoint(self):
+        store_path = os.path.join(self.root, 'step.npy')
+        self.extract(store_path)
+        expected = np.load(store_path)
+        frames = np.load(store_path, mmap_mode='r+')
+        frames[2:] = 0
+        frames.flush()
+        del frames
+        with open(progress_path(store_path), 'w') as progress:
+            progress.write('2')
+        self.assertEqual(self.extract(store_path), (4, 4))
+        np.testing.assert_array_equal(np.load(store_path), expected)
+
+    def test_ready_videos_are_queued_once_and_extracted(self):
+        assessment = create_assessment()
+        step = create_step(assessment.as_id)
+        video = PatientFile.objects.create(
+            assessment_id=assessment, step_id=step, file_path='step.avi', file_type='video/x-msvideo',
+            media_status='ready', media_metadata={'duration_seconds': 2.0},
+        )
+        PatientFile.objects.create(assessment_id=assessment, step_id=step, file_path='step.wav', file_type='audio/wav', media_status='ready')
+        with self.settings(FRAME_STORE_ROOT=os.path.join(self.root, 'frames'), STORAGES={**settings.STORAGES, 'patient_media': {
+            'BACKEND': 'assessments.storage.ContentAddressedStorage', 'OPTIONS': {'location': self.root},
+        }}):
+            self.assertEqual(queue_frame_stores(2, 16, 12), 1)
+            self.assertEqual(queue_frame_stores(2, 16, 12), 0)
+            self.assertEqual(run_frame_extraction(InlineExecutor()), 1)
+            frames = frames_for_patient_file(video.pk)
+        self.assertEqual(FrameStore.objects.get().status, 'ready')
+        self.assertIsInstance(frames, np.memmap)
+        self.assertEqual(frames.shape, (4, 12, 16, 3))
+
+
+class InferenceCacheTests(TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        self.model = self.registry.register('gaze_model', dummy_cpu_model, version='2')
+        self.cache = InferenceCache(max_entries=3)
+
+    def test_results_are_keyed_on_content_model_and_version(self):
+        self.cache.set_many(self.model, {'aaa': 'looked', 'bbb': 'away'})
+        self.cache.set_many(self.model, {'aaa': 'ignored'})
+        self.assertEqual(self.cache.get_many(self.model, ['aaa', 'ccc']), {'aaa': 'looked'})
+        newer = ModelRegistry().register('gaze_model', dummy_cpu_model, version='3')
+        self.assertEqual(self.cache.get_many(newer, ['aaa']), {})
+        self.assertEqual({key: self.cache.stats()[key] for key in ('hits', 'misses', 'entries')}, {'hits': 1, 'misses': 2, 'entries': 2})
+
+    def test_stale_versions_are_invalidated(self):
+        older = ModelRegistry().register('gaze_model', dummy_cpu_model, version='1')
+        self.cache.set_many(older, {'aaa': 'old'})
+        self.cache.set_many(self.model, {'aaa': 'new'})
+        self.assertEqual(self.cache.invalidate_stale_versions(self.registry), 1)
+        self.assertEqual(list(InferenceResult.objects.values_list('model_version', flat=True)), ['2'])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.set_many(self.model, {key: key for key in 'abcde'})
+        hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        for minutes, key in enumerate('abcde'):
+            InferenceResult.objects.filter(content_hash=key).update(last_used_at=hour_ago + datetime.timedelta(minutes=minutes))
+        self.cache.get_many(self.model, ['a'])
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(set(InferenceResult.objects.values_list('content_hash', flat=True)), {'a', 'd', 'e'})
+        self.assertEqual(self.cache.evict(), 0)
+
+
+class JobSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = JobScheduler(model_concurrency={'default': 1}, aging_seconds=30, max_wait_seconds=600)
+        self.now = time.monotonic()
+
+    def submit(self, priority=100, patient_id=1, model_name='default', waited=0):
+        job = self.scheduler.submit(Job(lambda: None, model_name=model_name, patient_id=patient_id, priority=priority))
+        job.enqueued_at = self.now - waited
+        return job
+
+    def order(self):
+        jobs = []
+        while True:
+            job = self.scheduler._next_job(self.now)
+            if job is None:
+                return jobs
+            jobs.append(job)
+
+    def test_scenario_priority_is_offset_by_level(self):
+        self.assertEqual(scenario_priority(AssessmentScenario(priority='5', level='Hard')), 25)
+        self.assertEqual(scenario_priority(AssessmentScenario(priority='5', level='Easy')), 5)
+        self.assertEqual(scenario_priority(AssessmentScenario(priority='soon', level='Unknown')), 120)
+
+    def test_lower_priority_runs_first(self):
+        late = self.submit(priority=20)
+        early = self.submit(priority=10)
+        self.assertEqual(self.order(), [early, late])
+
+    def test_patients_take_turns_within_a_priority(self):
+        first = [self.submit(patient_id=1) for _ in range(2)]
+        second = self.submit(patient_id=2)
+        self.assertEqual(self.order(), [first[0], second, first[1]])
+
+    def test_jobs_of_a_busy_model_wait_for_a_slot(self):
+        self.scheduler._running['vision'] = 1
+        blocked = self.submit(priority=10, model_name='vision')
+        other = self.submit(priority=50)
+        self.assertEqual(self.order(), [other])
+        self.scheduler._running['vision'] = 0
+        self.assertEqual(self.order(), [blocked])
+
+    def test_waiting_jobs_age_past_newer_ones(self):
+        fresh = self.submit(priority=10)
+        waiting = self.submit(priority=12, waited=90)
+        self.assertEqual(self.order(), [waiting, fresh])
+
+    def test_starved_jobs_run_next(self):
+        urgent = self.submit(priority=0)
+        starved = self.submit(priority=1000, waited=601)
+        self.assertEqual(self.order(), [starved, urgent])
+        self.assertEqual(self.scheduler.starvation_promotions, 1)
+
+    def test_workers_run_jobs_and_count_failures(self):
+        ran = []
+
+        def fail():
+            raise RuntimeError('boom')
+
+        self.scheduler.workers = 2
+        self.scheduler.start()
+        try:
+            self.scheduler.submit(Job(ran.append, args=('ok',)))
+            self.scheduler.submit(Job(fail))
+            self.scheduler.wait_idle(poll_interval=0.01)
+        finally:
+            self.scheduler.shutdown()
+        self.assertEqual(ran, ['ok'])
+        stats = self.scheduler.stats()
+        self.assertEqual((stats['completed'], stats['failed'], stats['queue_depth']), (1, 1, 0))
+
+
+class AssessmentPipelineTests(TestCase):
+    def setUp(self):
+        self.scenario = create_scenario(model_name='dummy_cpu_model', priority='5', level='Medium')
+        self.step = create_step(self.scenario)
+
+    def assessment_with_file(self, file_type='video/mp4', media_status='ready', frames=None, model_response=''):
+        assessment = create_assessment(self.scenario)
+        patient_file = PatientFile.objects.create(
+            assessment_id=assessment, step_id=self.step, file_path='patient_media/step.mp4', file_type=file_type,
+            media_status=media_status, model_response=model_response,
+        )
+        if frames:
+            FrameStore.objects.create(patient_file_id=patient_file, step_id=self.step, file_path='frames', sample_fps=2, width=224, height=224, status=frames)
+        return assessment
+
+    def test_assessments_with_pending_work(self):
+        waiting = [
+            self.assessment_with_file(media_status='pending'),
+            self.assessment_with_file(),
+            self.assessment_with_file(frames='pending'),
+        ]
+        unscored = self.assessment_with_file(frames='ready')
+        self.assessment_with_file(file_type='image/png')
+        self.assessment_with_file(frames='ready', model_response='scored')
+        self.assertEqual(set(assessments_with_pending_work(['dummy_cpu_model'])), set(waiting + [unscored]))
+        self.assertEqual(set(assessments_with_pending_work([])), set(waiting))
+
+    def test_job_carries_the_scenario_priority_and_model(self):
+        assessment = create_assessment(self.scenario)
+        job = build_assessment_job(assessment, executor=None)
+        self.assertEqual(
+            (job.model_name, job.patient_id, job.priority, job.key),
+            ('dummy_cpu_model', assessment.patient_id_id, 15, assessment.id),
+        )
+
+    def test_done_callback_runs_when_processing_fails(self):
+        done = []
+        job = build_assessment_job(create_assessment(self.scenario), executor=None, on_done=done.append)
+        with mock.patch.object(assessment_pipeline, 'process_assessment', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                job.fn(*job.args)
+        self.assertEqual(done, list(job.args))
+
+    def test_stages_run_in_dependency_order(self):
+        calls = mock.Mock()
+        calls.probe.side_effect = [2, 0]
+        calls.extract.side_effect = [1, 0]
+        calls.sampling.return_value = (2, (224, 224))
+        with mock.patch.multiple(
+            assessment_pipeline,
+            process_pending_media=calls.probe,
+            get_sampling_config=calls.sampling,
+            queue_frame_stores=calls.queue,
+            run_frame_extraction=calls.extract,
+            InferenceEngine=calls.engine,
+            close_old_connections=mock.DEFAULT,
+        ):
+            process_assessment(7, executor='pool')
+        self.assertEqual([name for name, _, _ in calls.mock_calls], [
+            'probe', 'probe', 'sampling', 'queue', 'extract', 'extract', 'engine', 'engine().run',
+        ])
+        calls.engine.return_value.run.assert_called_once_with(assessment_ids=[7])
+
+    def test_run_assessment_jobs_queues_each_assessment_once(self):
+        pending = [self.assessment_with_file(media_status='pending') for _ in range(2)]
+        processed = []
+        lock = threading.Lock()
+
+        def process(assessment_id, executor):
+            with lock:
+                processed.append(assessment_id)
+
+        with mock.patch.object(assessment_pipeline, 'process_assessment', side_effect=process), \
+                mock.patch('assessments.management.commands.run_assessment_jobs.create_media_executor', return_value=nullcontext()):
+            out = io.StringIO()
+            call_command('run_assessment_jobs', '--once', '--workers', '2', stdout=out)
+        self.assertEqual(sorted(processed), sorted(a.id for a in pending))
+        self.assertIn('Queued 2 assessment job(s).', out.getvalue())
+
+
+class AnalysisJobTests(TestCase):
+    def setUp(self):
+        self.assessment = create_assessment()
+        patcher = mock.patch.object(analysis_job_service, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def job(self, **fields):
+        return AnalysisJob.objects.create(assessment_id=self.assessment, user_answers={'Question?': 'Answer'}, **fields)
+
+    def test_a_job_is_claimed_once(self):
+        job = self.job()
+        self.assertTrue(claim_analysis_job(job.id))
+        self.assertFalse(claim_analysis_job(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        self.assertIsNotNone(job.started_at)
+
+    def test_run_stores_the_summary(self):
+        job = self.job(bypass_cache=True)
+        result = AnalysisResult('Summary', cache_hit=False, fallback=True, prompt_tokens=512)
+        with mock.patch.object(analysis_job_service, 'analyze_with_cache', return_value=result) as analyze:
+            run_analysis_job(job.id)
+        analyze.assert_called_once_with({'Question?': 'Answer'}, bypass_cache=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.used_fallback, job.prompt_tokens), ('succeeded', 'Summary', True, 512))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Assessment.objects.get(pk=self.assessment.pk).result_summary, 'Summary')
+
+    def test_run_records_failures(self):
+        job = self.job()
+        with mock.patch.object(analysis_job_service, 'analyze_with_cache', side_effect=RuntimeError('provider down')):
+            run_analysis_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'provider down'))
+
+    def test_claimed_jobs_are_not_run_again(self):
+        job = self.job(status='running', started_at=timezone.now())
+        with mock.patch.object(analysis_job_service, 'analyze_with_cache') as analyze:
+            run_analysis_job(job.id)
+        analyze.assert_not_called()
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = self.job(status='running', started_at=timezone.now() - datetime.timedelta(hours=1))
+        recent = self.job(status='running', started_at=timezone.now())
+        self.assertEqual(requeue_stale_jobs(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), ('queued', None))
+        self.assertEqual(AnalysisJob.objects.get(pk=recent.pk).status, 'running')
+
+    def test_enqueue_submits_on_commit_and_respects_the_cap(self):
+        with mock.patch.object(analysis_job_service, 'submit_analysis_job') as submit, self.settings(ANALYSIS_MAX_PENDING_JOBS=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                job, error = enqueue_analysis(self.assessment, {'Question?': 'Answer'})
+            self.assertIsNone(error)
+            submit.assert_called_once_with(job.id)
+            self.assertEqual(enqueue_analysis(self.assessment, {})[0], None)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+
+class SummaryCacheTests(SimpleTestCase):
+    answers = {'Do you like trains?': 'Yes, a lot'}
+
+    def setUp(self):
+        clear_summary_cache()
+        self.generate = mock.Mock(return_value='Summary')
+
+    def summarize(self, answers=None, **kwargs):
+        return cached_summary(answers or self.answers, self.generate, 'v1', 'gemini', **kwargs)
+
+    def test_key_ignores_case_whitespace_and_order(self):
+        key = summary_cache_key({'Do you like trains?': 'Yes, a lot', 'Age?': '7'}, 'v1', 'gemini')
+        self.assertEqual(summary_cache_key({'age?': ' 7', '  do you LIKE trains? ': 'yes,\na  lot'}, 'v1', 'gemini'), key)
+        self.assertNotEqual(summary_cache_key({'Do you like trains?': 'No', 'Age?': '7'}, 'v1', 'gemini'), key)
+
+    def test_key_includes_prompt_version_and_model(self):
+        key = summary_cache_key(self.answers, 'v1', 'gemini')
+        self.assertNotEqual(summary_cache_key(self.answers, 'v2', 'gemini'), key)
+        self.assertNotEqual(summary_cache_key(self.answers, 'v1', 'stub'), key)
+
+    def test_second_lookup_is_a_hit(self):
+        self.assertEqual(self.summarize(), ('Summary', False))
+        self.assertEqual(self.summarize({'do you like trains?': 'yes, a lot'}), ('Summary', True))
+        self.generate.assert_called_once()
+        stats = summary_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (1, 1, 1))
+
+    def test_bypass_calls_the_model_and_refreshes_the_entry(self):
+        self.summarize()
+        self.generate.return_value = 'Fresh summary'
+        self.assertEqual(self.summarize(bypass=True), ('Fresh summary', False))
+        self.assertEqual(self.summarize(), ('Fresh summary', True))
+        self.assertEqual(self.generate.call_count, 2)
+
+    def test_disabled_cache_neither_reads_nor_stores(self):
+        with self.settings(LLM_SUMMARY_CACHE_ENABLED=False):
+            self.summarize()
+            self.summarize()
+        self.assertEqual(self.generate.call_count, 2)
+        self.assertIsNone(get_summary_cache().get(summary_cache_key(self.answers, 'v1', 'gemini')))
+
+    def test_failures_are_not_cached(self):
+        self.generate.side_effect = RuntimeError('provider down')
+        with self.assertRaises(RuntimeError):
+            self.summarize()
+        self.generate.side_effect = None
+        self.assertEqual(self.summarize(), ('Summary', False))
+
+    def test_entries_expire_after_the_ttl(self):
+        with self.settings(LLM_SUMMARY_CACHE_TTL=60), mock.patch.object(get_summary_cache(), 'set') as cache_set:
+            self.summarize()
+        cache_set.assert_called_once_with(summary_cache_key(self.answers, 'v1', 'gemini'), 'Summary', timeout=60)
+
+
+class InlineExecutor:
+    """Runs submitted calls right away on the calling thread, for pool-driven code under TestCase."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ReportBatchTests(TestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch.object(report_batch_service, 'ThreadPoolExecutor', InlineExecutor),
+            mock.patch.object(report_batch_service, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.scenario = create_scenario()
+        self.questions = [
+            Question.objects.create(as_id=self.scenario, question_text=f'Question {order}?', question_order=str(order)) for order in (2, 10, 1)
+        ]
+
+    def answered_assessment(self, *answers):
+        assessment = create_assessment(self.scenario)
+        for question, answer in zip(self.questions, answers):
+            ResponseData.objects.create(assessment_id=assessment, question_id=question, response_text=answer)
+        return assessment
+
+    def analyze(self, user_answers, bypass_cache=False):
+        if 'fail' in user_answers.values():
+            raise RuntimeError('provider down')
+        return AnalysisResult(f'Summary of {len(user_answers)}', cache_hit=False, fallback=False, prompt_tokens=100)
+
+    def test_answers_are_loaded_in_question_order(self):
+        assessment = self.answered_assessment('b', 'c', 'a')
+        self.assertEqual(list(load_user_answers([assessment.id, 999999]).items()), [
+            (assessment.id, {'Question 1?': 'a', 'Question 2?': 'b', 'Question 10?': 'c'}),
+        ])
+
+    def test_batch_writes_summaries_and_job_outcomes(self):
+        done = self.answered_assessment('a', 'b')
+        failing = self.answered_assessment('fail')
+        unanswered = create_assessment(self.scenario)
+        jobs = {a.id: AnalysisJob.objects.create(assessment_id=a, user_answers={}) for a in (done, failing, unanswered)}
+        batch = ReportBatch([done.id, failing.id, unanswered.id, 999999], jobs=jobs)
+        with mock.patch.object(report_batch_service, 'analyze_with_cache', side_effect=self.analyze):
+            stats = batch.run()
+
+        self.assertEqual((stats['requested'], stats['succeeded'], stats['failed'], stats['estimated_prompt_tokens']), (4, 1, 3, 100))
+        self.assertEqual(stats['failures'], {
+            failing.id: 'provider down', unanswered.id: 'No answers recorded for this assessment.', 999999: 'Assessment not found.',
+        })
+        self.assertEqual(Assessment.objects.get(pk=done.pk).result_summary, 'Summary of 2')
+        self.assertEqual(
+            {job.assessment_id_id: (job.status, job.result) for job in AnalysisJob.objects.all()},
+            {done.id: ('succeeded', 'Summary of 2'), failing.id: ('failed', None), unanswered.id: ('failed', None)},
+        )
+
+    def test_jobs_claimed_elsewhere_are_left_alone(self):
+        assessment = self.answered_assessment('a')
+        job = AnalysisJob.objects.create(assessment_id=assessment, user_answers={})
+        claim_analysis_job(job.id)
+        batch = ReportBatch([assessment.id], jobs={assessment.id: job})
+        with mock.patch.object(report_batch_service, 'analyze_with_cache', side_effect=self.analyze) as analyze:
+            stats = batch.run()
+        analyze.assert_not_called()
+        self.assertEqual(stats['succeeded'], 0)
+        self.assertEqual(AnalysisJob.objects.get(pk=job.pk).status, 'running')
+
+    def test_results_are_flushed_in_chunks(self):
+        assessments = [self.answered_assessment('a') for _ in range(3)]
+        batch = ReportBatch([a.id for a in assessments])
+        with mock.patch.object(report_batch_service, 'WRITE_BACK_EVERY', 2):
+            batch.record(assessments[0].id, self.analyze({}), None)
+            self.assertEqual(Assessment.objects.filter(result_summary='Summary of 0').count(), 0)
+            batch.record(assessments[1].id, self.analyze({}), None)
+            self.assertEqual(Assessment.objects.filter(result_summary='Summary of 0').count(), 2)
+        with mock.patch.object(report_batch_service, 'WRITE_BACK_MAX_SECONDS', 0):
+            batch.record(assessments[2].id, self.analyze({}), None)
+        self.assertEqual(Assessment.objects.filter(result_summary='Summary of 0').count(), 3)
+
+    def test_enqueue_creates_queued_jobs_and_starts_after_commit(self):
+        known = self.answered_assessment('a')
+        with mock.patch.object(report_batch_service.threading, 'Thread') as thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs, error = enqueue_report_batch([known.id, known.id, 999999])
+            thread.return_value.start.assert_called_once_with()
+        self.assertIsNone(error)
+        job = AnalysisJob.objects.get()
+        self.assertEqual((len(jobs), job.assessment_id_id, job.status, job.started_at), (1, known.id, 'queued', None))
+        self.assertEqual(job.user_answers, {'Question 2?': 'a'})
+
+    def test_enqueue_counts_against_the_pending_cap(self):
+        assessments = [self.answered_assessment('a') for _ in range(2)]
+        AnalysisJob.objects.create(assessment_id=assessments[0], user_answers={})
+        with self.settings(ANALYSIS_MAX_PENDING_JOBS=2), self.assertRaises(AnalysisQueueFull):
+            enqueue_report_batch([a.id for a in assessments])
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+        self.assertEqual(enqueue_report_batch([]), (None, 'No assessment ids provided.'))
+
+
+class DummyModelTests(SimpleTestCase):
+    def expected(self, frames):
+        diffs = np.abs(np.diff(np.asarray(frames, dtype=np.int16), axis=0))
+        return f'motion_energy={diffs.mean() / 255.0:.4f}'
+
+    def test_motion_energy_across_chunk_boundaries(self):
+        rng = np.random.default_rng(0)
+        batch = [rng.integers(0, 256, size=(count, 8, 8, 3), dtype=np.uint8) for count in (2, 32, 33, 70)]
+        self.assertEqual(dummy_cpu_model(batch), [self.expected(frames) for frames in batch])
+
+    def test_reads_memmapped_frames(self):
+        with tempfile.TemporaryDirectory() as directory:
+            frames = np.lib.format.open_memmap(os.path.join(directory, 'frames.npy'), mode='w+', dtype=np.uint8, shape=(40, 4, 4, 3))
+            frames[::2] = 255
+            frames.flush()
+            memmap = np.load(os.path.join(directory, 'frames.npy'), mmap_mode='r')
+            self.assertEqual(dummy_cpu_model([memmap]), ['motion_energy=1.0000'])
+            del frames, memmap
+
+    def test_fewer_than_two_frames(self):
+        self.assertEqual(dummy_cpu_model([np.zeros((1, 4, 4, 3), dtype=np.uint8)]), ['motion_energy=0.0000'])
+
+
+class MP4ProbeTests(SimpleTestCase):
+    def test_reads_video_track(self):
+        self.assertEqual(parse_mp4(sample_mp4()), {
+            'duration_seconds': 3.0, 'fps': 10.0, 'frame_count': 30, 'width': 64, 'height': 48, 'codec': 'mp4v', 'source': 'mp4',
+        })
+
+    def test_falls_back_to_track_duration(self):
+        self.assertEqual(parse_mp4(sample_mp4(movie_duration=0))['duration_seconds'], 3.0)
+
+    def test_missing_moov(self):
+        with self.assertRaises(ContainerParseError):
+            parse_mp4(mp4_box(b'ftyp', b'isom') + mp4_box(b'mdat', bytes(32)))
+
+    def test_box_overrunning_file(self):
+        with self.assertRaises(ContainerParseError):
+            parse_mp4(struct.pack('>I4s', 4096, b'moov') + bytes(16))
+
+    def test_probe_container_reads_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+            f.write(sample_mp4())
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(probe_container(f.name)['frame_count'], 30)
+
+
+class MatroskaProbeTests(SimpleTestCase):
+    def test_read_vint(self):
+        self.assertEqual(read_vint(b'\x81', 0), (1, 1))
+        self.assertEqual(read_vint(b'\x40\x02', 0), (2, 2))
+        self.assertEqual(read_vint(b'\x1a\x45\xdf\xa3', 0, keep_marker=True), (media_probe.EBML_HEADER, 4))
+        self.assertEqual(read_vint(b'\xff', 0), (None, 1))
+
+    def test_reads_video_track(self):
+        self.assertEqual(parse_matroska(sample_webm()), {
+            'duration_seconds': 3.0, 'fps': 10.0, 'frame_count': 30, 'width': 64, 'height': 48, 'codec': 'V_VP8', 'source': 'webm',
+        })
+
+    def test_unknown_size_segment(self):
+        self.assertEqual(parse_matroska(sample_webm(unknown_segment_size=True))['duration_seconds'], 3.0)
+
+    def test_missing_duration(self):
+        with self.assertRaises(ContainerParseError):
+            parse_matroska(sample_webm(duration_ms=None))
+
+    def test_probe_container_rejects_unknown_format(self):
+        with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as f:
+            f.write(b'not a video at all')
+        self.addCleanup(os.remove, f.name)
+        with self.assertRaises(ContainerParseError):
+            probe_container(f.name)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_no_header(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('', 100))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+
+    def test_end_clamped_to_file(self):
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+
+    def test_open_ended(self):
+        self.assertEqual(parse_range('bytes=40-', 100), (40, 99))
+
+    def test_suffix(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+
+    def test_suffix_longer_than_file(self):
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_start_past_end(self):
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=100-', 100)
+
+    def test_zero_length_suffix(self):
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=-0', 100)
+
+    def test_empty_file(self):
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=0-', 0)
+
+    def test_multiple_ranges_serve_whole_file(self):
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+
+    def test_malformed_headers_are_ignored(self):
+        for header in ('bytes=-', 'items=0-9', 'bytes=a-b', 'bytes=9-0'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+
+class PatientFileStreamTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overridden = self.settings(STORAGES={**settings.STORAGES, 'patient_media': {
+            'BACKEND': 'assessments.storage.ContentAddressedStorage', 'OPTIONS': {'location': directory.name},
+        }})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.assessment = create_assessment()
+        step = create_step(self.assessment.as_id)
+        path, blob = store_blob('step.mp4', ContentFile(b'0123456789'))
+        self.patient_file = PatientFile.objects.create(assessment_id=self.assessment, step_id=step, file_path=path, blob_id=blob, file_type='video')
+        self.client = APIClient()
+
+    def stream_url(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/assessment/patient-file/{self.patient_file.pk}/stream-url/')
+        self.client.force_authenticate(None)
+        return response
+
+    def test_signed_url_streams_without_credentials(self):
+        response = self.stream_url(self.assessment.patient_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 15 * 60)
+        self.assertIn(f'/assessment/patient-file/{self.patient_file.pk}/stream/?token=', response.data['url'])
+        streamed = self.client.get(response.data['url'], HTTP_RANGE='bytes=2-5', HTTP_ACCEPT='video/*')
+        self.assertEqual(streamed.status_code, 206)
+        self.assertEqual(b''.join(streamed.streaming_content), b'2345')
+
+    def test_other_patients_cannot_get_a_link(self):
+        other = User.objects.create_user(email='other@example.com', username='other')
+        self.assertEqual(self.stream_url(other).status_code, 404)
+        staff = User.objects.create_user(email='staff@example.com', username='staff', is_staff=True)
+        self.assertEqual(self.stream_url(staff).status_code, 200)
+
+    def test_bad_expired_or_foreign_tokens_are_refused(self):
+        url = f'/assessment/patient-file/{self.patient_file.pk}/stream/'
+        tokens = {
+            'tampered': signing.dumps(self.patient_file.pk, salt=STREAM_TOKEN_SALT) + 'x',
+            'other file': signing.dumps(self.patient_file.pk + 1, salt=STREAM_TOKEN_SALT),
+            'other salt': signing.dumps(self.patient_file.pk),
+        }
+        for name, token in tokens.items():
+            with self.subTest(name):
+                self.assertEqual(self.client.get(url, {'token': token}).status_code, 403)
+        token = signing.dumps(self.patient_file.pk, salt=STREAM_TOKEN_SALT)
+        with self.settings(PATIENT_FILE_STREAM_URL_TTL_SECONDS=-1):
+            self.assertEqual(self.client.get(url, {'token': token}).status_code, 403)
+
+    def test_jwt_clients_can_still_stream_directly(self):
+        url = f'/assessment/patient-file/{self.patient_file.pk}/stream/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(self.assessment.patient_id)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class LLMClientTests(SimpleTestCase):
+    def setUp(self):
+        self.genai = mock.Mock()
+        self.configured = 0
+
+        def configure(manager):
+            self.configured += 1
+            manager._genai = self.genai
+
+        patcher = mock.patch.object(GeminiClientManager, '_configure', configure)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = GeminiClientManager()
+
+    def test_library_is_configured_once_and_model_handles_are_reused(self):
+        threads = [threading.Thread(target=self.client.get_model, kwargs={'system_instruction': 'Be brief.'}) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(self.client.get_model(system_instruction='Be brief.'), self.client.get_model(system_instruction='Be brief.'))
+        self.client.get_model(system_instruction='Be thorough.')
+        self.assertEqual(self.configured, 1)
+        self.assertEqual(self.genai.GenerativeModel.call_count, 2)
+        self.client.reset()
+        self.client.get_model()
+        self.assertEqual(self.configured, 2)
+
+    def test_requests_carry_the_configured_timeout(self):
+        model = self.genai.GenerativeModel.return_value
+        model.generate_content.return_value.text = 'Summary'
+        with self.settings(GEMINI_TIMEOUT_SECONDS=12):
+            self.assertEqual(self.client.generate_text('prompt'), 'Summary')
+        model.generate_content.assert_called_once_with('prompt', request_options={'timeout': 12})
+        self.client.generate_text('prompt', timeout=3)
+        self.assertEqual(model.generate_content.call_args.kwargs['request_options'], {'timeout': 3})
+
+    def test_streamed_chunks_without_parts_are_skipped(self):
+        chunks = [mock.Mock(parts=[1], text='Hel'), mock.Mock(parts=[], text=''), mock.Mock(parts=[1], text='lo')]
+        self.genai.GenerativeModel.return_value.generate_content.return_value = iter(chunks)
+        self.assertEqual(list(self.client.stream_text('prompt')), ['Hel', 'lo'])
+
+
+class AnalysisBackendTests(SimpleTestCase):
+    def stub_server(self, **options):
+        server = start_stub_server(**options)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_http_backend_reuses_its_connection(self):
+        server = self.stub_server()
+        backend = HTTPBackend(f'{server.endpoint}/v1/generate')
+        self.assertEqual([backend.generate('prompt', system_instruction='Be brief.') for _ in range(3)], [STUB_SUMMARY] * 3)
+        self.assertEqual(''.join(backend.stream('prompt')), STUB_SUMMARY)
+        self.assertEqual(server.stats.snapshot(), {'requests': 4, 'connections': 1})
+
+    def test_http_failures_become_backend_errors(self):
+        backend = HTTPBackend(f'{self.stub_server(error_rate=1.0).endpoint}/v1/generate')
+        with self.assertRaises(AnalysisBackendError):
+            backend.generate('prompt')
+        with self.assertRaises(AnalysisBackendError):
+            list(backend.stream('prompt'))
+
+    def test_fake_backend_streams_its_response_and_fails_on_demand(self):
+        backend = FakeBackend(response='three word summary')
+        self.assertEqual(list(backend.stream('prompt')), ['three ', 'word ', 'summary'])
+        with self.assertRaisesMessage(AnalysisBackendError, 'Fake backend error'):
+            FakeBackend(error_rate=1.0).generate('prompt')
+        with self.assertRaisesMessage(AnalysisBackendError, 'timed out after 0.01s'):
+            FakeBackend(latency_ms=50).generate('prompt', timeout=0.01)
+
+    def test_backend_is_built_from_settings(self):
+        backend = build_analysis_backend({'BACKEND': 'assessments.services.analysis_backends.FakeBackend', 'OPTIONS': {'model_name': 'load-test'}})
+        self.assertIsInstance(backend, FakeBackend)
+        self.assertEqual(backend.model_name, 'load-test')
+
+
+def collect_events(stream):
+    async def collect():
+        return [event async for event in stream]
+    return asyncio.run(collect())
+
+
+class AnalysisStreamTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(analysis_stream_service, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assessment = create_assessment()
+
+    def produce(self, stream):
+        events = []
+        with mock.patch.object(analysis_stream_service, 'stream_autism_analysis', return_value=stream):
+            analysis_stream_service.produce_analysis(self.assessment.pk, SAMPLE_USER_ANSWERS, False, lambda *event: events.append(event))
+        return events
+
+    def test_tokens_are_emitted_and_the_summary_saved(self):
+        events = self.produce(AnalysisStream(['Shows ', 'no ', 'traits.'], prompt_tokens=120))
+        self.assertEqual([event for event, _ in events], ['token', 'token', 'token', 'done'])
+        self.assertEqual(events[-1][1], {
+            'assessment_id': self.assessment.pk, 'cache_hit': False, 'fallback': False, 'prompt_tokens': 120, 'length': 16,
+        })
+        self.assertEqual(Assessment.objects.get(pk=self.assessment.pk).result_summary, 'Shows no traits.')
+
+    def test_backend_failure_ends_with_an_error_event(self):
+        def pieces():
+            yield 'Shows '
+            raise ConnectionError('reset')
+        events = self.produce(AnalysisStream(pieces()))
+        self.assertEqual(events[-1], ('error', {'message': 'reset'}))
+        self.assertEqual(Assessment.objects.get(pk=self.assessment.pk).result_summary, '')
+
+    def test_events_are_framed_as_sse_with_keep_alives(self):
+        def produce(assessment_id, user_answers, bypass_cache, emit):
+            time.sleep(0.05)
+            emit('token', {'text': 'Hi'})
+            emit('done', {'assessment_id': assessment_id})
+
+        with mock.patch.object(analysis_stream_service, 'produce_analysis', produce), \
+                mock.patch.object(analysis_stream_service, 'KEEPALIVE_SECONDS', 0.01):
+            events = collect_events(analysis_stream_service.analysis_event_stream(7, []))
+        self.assertEqual(events[0], ': analysis started\n\n')
+        self.assertIn(': keep-alive\n\n', events)
+        self.assertEqual(events[-2:], ['event: token\ndata: {"text": "Hi"}\n\n', 'event: done\ndata: {"assessment_id": 7}\n\n'])
+
+    def test_unknown_assessment_is_refused(self):
+        response = self.client.get('/assessment/analyze-autism/stream/', {'assessment_id': 999999})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.post('/assessment/analyze-autism/stream/', 'not json', content_type='application/json').status_code, 400)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('assessments.services.circuit_breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, recovery_seconds=30, half_open_calls=1)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+        self.fail(1)
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_after_recovery_lets_one_trial_through(self):
+        self.fail(3)
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_trial_success_closes(self):
+        self.fail(3)
+        self.now += 30
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.transition_counts, {'closed->open': 1, 'open->half_open': 1, 'half_open->closed': 1})
+
+    def test_trial_failure_reopens_for_another_recovery_period(self):
+        self.fail(3)
+        self.now += 30
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+
+
+class ProviderGuardTests(SimpleTestCase):
+    def guard(self, attempts=3):
+        guard = ProviderGuard('test')
+        guard.attempts = attempts
+        guard.breaker = CircuitBreaker('test', failure_threshold=2, recovery_seconds=30)
+        guard.backoff = lambda attempt: 0
+        return guard
+
+    def test_retries_until_success(self):
+        outcomes = iter([RuntimeError('boom'), 'summary'])
+
+        def call(timeout):
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        guard = self.guard()
+        self.assertEqual(guard.call(call), 'summary')
+        self.assertEqual(guard.retries, 1)
+
+    def test_open_circuit_fails_fast(self):
+        guard = self.guard(attempts=2)
+        with self.assertRaises(ProviderUnavailable):
+            guard.call(mock.Mock(side_effect=RuntimeError('down')))
+        call = mock.Mock()
+        with self.assertRaises(CircuitOpenError):
+            guard.call(call)
+        call.assert_not_called()
+
+    def test_rate_limit_wait_is_bounded_by_the_attempt_timeout(self):
+        bucket = TokenBucket(rate=0.01, burst=1)
+        self.assertTrue(bucket.acquire(timeout=0.1))
+        self.assertFalse(bucket.acquire(timeout=0.1))
+
+        from assessments.services.gemini_service import wait_for_provider
+        with mock.patch('assessments.services.gemini_service.get_provider_limiter', return_value=bucket):
+            with self.assertRaises(RateLimitTimeout):
+                wait_for_provider(mock.Mock(), timeout=0.1)
+
+
+def reference_dice(answer, accepted):
+    """Dice similarity over character trigrams of the space-padded texts, written out plainly."""
+    def trigrams(text):
+        padded = f' {text} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    if not answer:
+        return 0.0
+    a, b = trigrams(answer), trigrams(accepted)
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class PreScorerTests(SimpleTestCase):
+    bank = {
+        'colors': {'What color is a fire truck?': ('Red',), 'What color is the sky?': ('Blue', 'Light blue')},
+        'numbers': {'How many legs does a spider have?': ('Eight',)},
+    }
+
+    def setUp(self):
+        self.scorer = PreScorer(bank=self.bank, threshold=0.75)
+
+    def similarity(self, user_answers):
+        return self.scorer.score_many([user_answers])['similarity'][0].tolist()
+
+    def test_normalize_answer(self):
+        self.assertEqual(normalize_answer('The  Twenty-Four!'), '24')
+        self.assertEqual(normalize_answer('An EIGHT legged spider'), '8 legged spider')
+        self.assertEqual(normalize_answer('ｒｅｄ'), 'red')
+
+    def test_exact_and_normalized_answers_match(self):
+        self.assertEqual(self.similarity({
+            'What color is a fire truck?': 'red!', 'What color is the sky?': 'LIGHT blue', 'How many legs does a spider have?': '8',
+        }), [1.0, 1.0, 1.0])
+
+    def test_similarity_matches_a_plain_dice_computation(self):
+        answers = ['rde', 'bright red', 'blu', 'a light bluish grey sky on a summer day', 'eighty', 'sky blue', 'x']
+        for answer in answers:
+            for index, (question, accepted) in enumerate([
+                ('What color is a fire truck?', ['red']),
+                ('What color is the sky?', ['blue', 'light blue']),
+                ('How many legs does a spider have?', ['8']),
+            ]):
+                text = normalize_answer(answer)[:32]
+                expected = max(reference_dice(text, option) for option in accepted)
+                self.assertAlmostEqual(self.similarity({question: answer})[index], expected, places=5, msg=(question, answer))
+
+    def test_unknown_and_blank_answers_score_zero(self):
+        result = self.scorer.score_many([{'  what COLOR is a fire truck? ': '', 'Favourite food?': 'Pizza'}])
+        self.assertEqual(result['similarity'][0].tolist(), [0.0, 0.0, 0.0])
+        self.assertFalse(result['answered'].any())
+
+    def test_domain_report(self):
+        report = self.scorer.score({'What color is a fire truck?': 'Red', 'What color is the sky?': 'Green'})
+        self.assertEqual(report['domains']['colors'], {'score': 0.5, 'correct': 1, 'answered': 2, 'questions': 2})
+        self.assertEqual(report['domains']['numbers'], {'score': 0.0, 'correct': 0, 'answered': 0, 'questions': 1})
+
+    def test_many_sets_score_like_one_at_a_time(self):
+        sets = [{'What color is the sky?': answer} for answer in ('blue', 'bleu', 'navy', '')]
+        together = self.scorer.score_many(sets)['similarity']
+        for row, user_answers in zip(together.tolist(), sets):
+            self.assertEqual(row, self.similarity(user_answers))
+
+    def test_too_many_accepted_answers_are_rejected(self):
+        with self.assertRaises(ValueError):
+            PreScorer(bank={'domain': {'Question?': tuple(str(i) for i in range(9))}})
+
+
+class PromptBudgetTests(SimpleTestCase):
+    def test_untrimmed_prompt_lists_every_answer(self):
+        prompt = build_prompt(SAMPLE_USER_ANSWERS, budget=100000)
+        self.assertEqual(prompt.omitted_answers, 0)
+        self.assertEqual(prompt.tokens, prompt.system_tokens + estimate_tokens(prompt.text))
+        for question in SAMPLE_USER_ANSWERS:
+            self.assertIn(' '.join(question.split()), prompt.text)
+
+    def test_trimmed_prompt_fits_the_budget(self):
+        full = build_prompt(SAMPLE_USER_ANSWERS, budget=100000)
+        budget = full.system_tokens + (full.tokens - full.system_tokens) // 2
+        prompt = build_prompt(SAMPLE_USER_ANSWERS, budget=budget)
+        self.assertLessEqual(prompt.tokens, budget)
+        self.assertGreater(prompt.omitted_answers, 0)
+        self.assertLess(prompt.omitted_answers, len(SAMPLE_USER_ANSWERS))
+        notes = [line for line in prompt.text.splitlines() if line.startswith('(')]
+        self.assertEqual(sum(int(note.split()[0][1:]) for note in notes), prompt.omitted_answers)
+
+    def test_mismatched_answers_are_kept_longest(self):
+        answers = dict(SAMPLE_USER_ANSWERS)
+        wrong = list(answers)[:3]
+        for question in wrong:
+            answers[question] = 'purple elephants dancing'
+        full = build_prompt(answers, budget=100000)
+        prompt = build_prompt(answers, budget=full.system_tokens + (full.tokens - full.system_tokens) // 2)
+        self.assertGreater(prompt.omitted_answers, 0)
+        self.assertEqual(prompt.text.count('purple elephants dancing'), len(wrong))
+
+    def test_long_answers_are_cut(self):
+        question = next(iter(SAMPLE_USER_ANSWERS))
+        prompt = build_prompt({question: 'word ' * 500}, budget=100000, max_chars=40)
+        line = next(line for line in prompt.text.splitlines() if 'word' in line)
+        self.assertTrue(line.endswith('…'))
+        self.assertLess(len(line), 100)
+
+    def test_questions_outside_the_bank_go_under_other(self):
+        prompt = build_prompt({'What is your favourite colour?': 'Blue'}, budget=100000)
+        self.assertIn(f'## {OTHER_DOMAIN}\nWhat is your favourite colour? Blue', prompt.text)
+
+
+class IngestAnswersTests(TestCase):
+    def setUp(self):
+        self.assessment = create_assessment()
+        self.questions = Question.objects.bulk_create([
+            Question(as_id=self.assessment.as_id, question_text=f'Question {i}?', question_order=str(i)) for i in range(3)
+        ])
+
+    def answer(self, question, text):
+        return {'question_id': question.id, 'assessment_id': self.assessment.id, 'response_text': text}
+
+    def stored(self):
+        return dict(ResponseData.objects.filter(assessment_id=self.assessment).values_list('question_id', 'response_text'))
+
+    def test_inserts_answers(self):
+        responses, errors = ingest_answers([self.answer(question, f'Answer {i}') for i, question in enumerate(self.questions)])
+        self.assertEqual(errors, [])
+        self.assertTrue(all(response.pk for response in responses))
+        self.assertEqual(self.stored(), {question.id: f'Answer {i}' for i, question in enumerate(self.questions)})
+
+    def test_resubmission_updates_in_place(self):
+        first, _ = ingest_answers([self.answer(self.questions[0], 'Yes')])
+        second, _ = ingest_answers([self.answer(self.questions[0], 'No')])
+        self.assertEqual(first[0].pk, second[0].pk)
+        self.assertEqual(self.stored(), {self.questions[0].id: 'No'})
+
+    def test_last_duplicate_in_a_submission_wins(self):
+        responses, errors = ingest_answers([
+            self.answer(self.questions[0], 'First'),
+            self.answer(self.questions[1], 'Other'),
+            self.answer(self.questions[0], 'Last'),
+        ])
+        self.assertEqual(errors, [])
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(self.stored(), {self.questions[0].id: 'Last', self.questions[1].id: 'Other'})
+
+    def test_invalid_answers_are_reported_and_the_rest_saved(self):
+        responses, errors = ingest_answers([
+            'not an answer',
+            {'question_id': 'x', 'assessment_id': self.assessment.id},
+            {'question_id': 999999, 'assessment_id': self.assessment.id},
+            self.answer(self.questions[2], 'Kept'),
+        ])
+        self.assertEqual([error['index'] for error in errors], [0, 1, 2])
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(self.stored(), {self.questions[2].id: 'Kept'})
+
+    def test_questions_of_another_scenario_are_rejected(self):
+        other = Question.objects.create(as_id=create_scenario(), question_text='Elsewhere?', question_order='1')
+        responses, errors = ingest_answers([self.answer(other, 'No'), self.answer(self.questions[0], 'Yes')])
+        self.assertEqual(errors, [{'index': 0, 'message': f"Question {other.id} is not part of assessment {self.assessment.id}'s scenario."}])
+        self.assertEqual(self.stored(), {self.questions[0].id: 'Yes'})
+
+
+class NDJSONImportTests(TestCase):
+    def setUp(self):
+        self.assessment = create_assessment()
+        self.questions = Question.objects.bulk_create([
+            Question(as_id=self.assessment.as_id, question_text=f'Question {i}?', question_order=str(i)) for i in range(4)
+        ])
+
+    def line(self, question, text):
+        return json.dumps({'question_id': question.id, 'assessment_id': self.assessment.id, 'response_text': text}).encode() + b'\n'
+
+    def run_import(self, body, **kwargs):
+        return list(import_ndjson_answers(io.BytesIO(body), **kwargs))
+
+    def test_batches_report_errors_progress_and_totals(self):
+        body = b''.join([
+            self.line(self.questions[0], 'a'),
+            b'{not json\n',
+            b'\n',
+            self.line(self.questions[1], 'b'),
+            json.dumps({'question_id': 999999, 'assessment_id': self.assessment.id}).encode() + b'\n',
+            b'{"question_id": 1, "response_text": "' + b'x' * 200 + b'"}\n',
+            self.line(self.questions[2], 'c'),
+        ])
+        events = self.run_import(body, batch_size=2, max_line_bytes=100)
+        self.assertEqual([(e['event'], e.get('line')) for e in events], [
+            ('error', 2), ('progress', None), ('error', 6), ('error', 5), ('progress', None), ('done', None),
+        ])
+        self.assertEqual(events[3]['message'], 'Question 999999 not found.')
+        self.assertEqual({key: events[-1][key] for key in ('lines', 'saved', 'rejected', 'batches')}, {'lines': 7, 'saved': 3, 'rejected': 3, 'batches': 2})
+        self.assertEqual(ResponseData.objects.count(), 3)
+
+    def test_only_the_first_errors_are_reported(self):
+        events = self.run_import(b'x\n' * 5, max_errors=2)
+        self.assertEqual([e['line'] for e in events if e['event'] == 'error'], [1, 2])
+        self.assertEqual(events[-1]['rejected'], 5)
+
+    def test_failed_batches_reject_their_lines(self):
+        body = self.line(self.questions[0], 'a') + self.line(self.questions[1], 'b')
+        with mock.patch.object(response_service, 'ingest_answers', side_effect=DatabaseError('deadlock')):
+            events = self.run_import(body)
+        self.assertEqual([(e['line'], e['message']) for e in events if e['event'] == 'error'], [
+            (1, 'Could not be saved: deadlock'), (2, 'Could not be saved: deadlock'),
+        ])
+        self.assertEqual(events[-1]['saved'], 0)
+
+    def test_the_body_is_read_as_events_are_consumed(self):
+        stream = io.BytesIO(b''.join(self.line(question, 'a') for question in self.questions))
+        events = import_ndjson_answers(stream, batch_size=1)
+        self.assertEqual(next(events)['event'], 'progress')
+        self.assertEqual(ResponseData.objects.count(), 1)
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+        self.assertEqual(list(events)[-1]['saved'], 4)
+
+    def test_endpoint_streams_ndjson_events(self):
+        body = self.line(self.questions[0], 'a')
+        response = self.client.post('/assessment/answer/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([e['event'] for e in events], ['progress', 'done'])
+        self.assertEqual(self.client.post('/assessment/answer/import/', body, content_type='application/json').status_code, 415)
+
+
+class HotQueryPlanTests(TestCase):
+    def test_hot_lookups_are_served_by_their_indexes(self):
+        stdout = io.StringIO()
+        call_command('explain_hot_queries', rows=2000, stdout=stdout, stderr=io.StringIO())
+        report = json.loads(stdout.getvalue())
+        self.assertEqual({name: query['ok'] for name, query in report['queries'].items()}, {
+            'responses_for_assessment': True, 'response_for_question': True, 'report_answers': True, 'files_for_step': True,
+        })
+        self.assertEqual(report['queries']['response_for_question']['rows_returned'], 1)
+        self.assertFalse(ResponseData.objects.exists())
+
+    def test_unindexed_filter_is_reported_as_a_full_scan(self):
+        plan = explain(ResponseData.objects.filter(response_text='yes'))
+        self.assertTrue(plan['full_scan'])
+        self.assertEqual(plan['indexes'], set())
+
+
+class ScenarioBundleTests(TestCase):
+    url = '/assessment/scenarios/bundle/'
+
+    def setUp(self):
+        get_bundle_cache().clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scenario = create_scenario()
+            self.question = Question.objects.create(as_id=self.scenario, question_text='Question?', question_order='1')
+
+    def test_bundle_is_served_from_cache(self):
+        etag = get_scenario_bundle()['etag']
+        with self.assertNumQueries(0):
+            self.assertEqual(get_scenario_bundle()['etag'], etag)
+
+    def test_revalidation_returns_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['scenarios'][0]['name'], 'Scenario')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_the_etag(self):
+        etags = [get_scenario_bundle()['etag']]
+        changes = [
+            lambda: Question.objects.create(as_id=self.scenario, question_text='Another?', question_order='2'),
+            lambda: create_step(self.scenario),
+            lambda: self.question.delete(),
+        ]
+        for change in changes:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            etags.append(get_scenario_bundle()['etag'])
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_invalidation_waits_for_commit(self):
+        etag = get_scenario_bundle()['etag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            Question.objects.create(as_id=self.scenario, question_text='Another?', question_order='2')
+            self.assertEqual(get_scenario_bundle()['etag'], etag)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_scenario_bundle()['etag'], etag)
+
+
+class BlobReferenceTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+
+    def store(self, data=b'recording'):
+        return store_blob('step.mp4', ContentFile(data), storage=self.storage)
+
+    def test_same_content_is_stored_once(self):
+        first_path, first = self.store()
+        second_path, second = self.store()
+        self.assertEqual(first_path, second_path)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(MediaBlob.objects.get(pk=first.pk).ref_count, 2)
+        self.assertEqual(second.size, len(b'recording'))
+        self.assertNotEqual(self.store(b'other')[0], first_path)
+
+    def test_last_release_deletes_the_file_on_commit(self):
+        path, blob = self.store()
+        self.store()
+        with self.captureOnCommitCallbacks(execute=True):
+            release_blob(blob.pk, storage=self.storage)
+        self.assertTrue(self.storage.exists(path))
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_blob(blob.pk, storage=self.storage)
+        self.assertFalse(MediaBlob.objects.filter(pk=blob.pk).exists())
+        self.assertTrue(self.storage.exists(path))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.storage.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_file_stored_again_before_the_deferred_delete_is_kept(self):
+        path, blob = self.store()
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_blob(blob.pk, storage=self.storage)
+        _, again = self.store()
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.storage.exists(path))
+        self.assertEqual(MediaBlob.objects.get().pk, again.pk)
+
+    def test_rolled_back_patient_file_delete_keeps_the_blob(self):
+        assessment = create_assessment()
+        step = create_step(assessment.as_id)
+        with self.settings(STORAGES={**settings.STORAGES, 'patient_media': {
+            'BACKEND': 'assessments.storage.ContentAddressedStorage', 'OPTIONS': {'location': self.storage.location},
+        }}):
+            path, blob = store_blob('step.mp4', ContentFile(b'recording'))
+            patient_file = PatientFile.objects.create(assessment_id=assessment, step_id=step, file_path=path, blob_id=blob, file_type='video')
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    patient_file.delete()
+                    raise RuntimeError('rolled back')
+            self.assertTrue(self.storage.exists(path))
+            self.assertEqual(MediaBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                PatientFile.objects.get().delete()
+            self.assertFalse(self.storage.exists(path))
+
+    def test_missing_file_is_rewritten_on_store(self):
+        path, blob = self.store()
+        self.storage.delete(path)
+        with self.assertRaises(BlobMissing):
+            acquire_blob(path, storage=self.storage)
+        self.store()
+        self.assertTrue(self.storage.exists(path))
+        self.assertEqual(MediaBlob.objects.get(pk=blob.pk).ref_count, 2)
+
+    def test_staged_file_on_another_filesystem_is_copied(self):
+        fd, staged_path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as staged:
+            staged.write(b'recording')
+        blob_name = ContentAddressedStorage.blob_name('ab' * 32, '.mp4')
+        rename = os.replace
+
+        def cross_device_replace(source, destination):
+            if source == staged_path:
+                raise OSError(errno.EXDEV, 'Invalid cross-device link')
+            rename(source, destination)
+
+        with mock.patch('assessments.storage.os.replace', side_effect=cross_device_replace):
+            self.storage.place(staged_path, blob_name)
+        with self.storage.open(blob_name) as blob:
+            self.assertEqual(blob.read(), b'recording')
+        self.assertFalse(os.path.exists(staged_path))
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(blob_name))), [os.path.basename(blob_name)])
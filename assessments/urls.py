@@ -6,10 +6,22 @@ from .views import (
     QuestionViewSet,
     RecordingStepViewSet,
     ResponseDataCreateView,
+    ResponseDataImportView,
     PatientFileUploadView,
+    PatientFileBatchUploadView,
+    PatientFileStatusView,
+    PatientFileStreamView,
+    PatientFileStreamURLView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadSessionCompleteView,
     AssessmentCreateView,
     ResponseDataViewSet,
-    ReportCreateView
+    ReportCreateView,
+    ReportBatchCreateView,
+    ReportStreamView,
+    AnalysisMetricsView,
+    AnalysisJobStatusView
 )
 
 router = DefaultRouter()
@@ -20,11 +32,23 @@ urlpatterns = [
     path('questions/<int:assessment_id>/', QuestionViewSet.as_view({'get': 'list'}), name='questions-by-assessment'),
     path('recording-steps/<int:assessment_id>/', RecordingStepViewSet.as_view({'get': 'list'}), name='steps-by-assessment'),
     path('answer/create', ResponseDataCreateView.as_view(), name='create-response'),
+    path('answer/import/', ResponseDataImportView.as_view(), name='import-responses'),
     path('patient-file/upload/', PatientFileUploadView.as_view(), name='upload-file'),
+    path('patient-file/upload/batch/', PatientFileBatchUploadView.as_view(), name='upload-file-batch'),
+    path('patient-file/<int:pk>/status/', PatientFileStatusView.as_view(), name='patient-file-status'),
+    path('patient-file/<int:pk>/stream/', PatientFileStreamView.as_view(), name='patient-file-stream'),
+    path('patient-file/<int:pk>/stream-url/', PatientFileStreamURLView.as_view(), name='patient-file-stream-url'),
+    path('patient-file/uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('patient-file/uploads/<uuid:upload_id>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('patient-file/uploads/<uuid:upload_id>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
     path('create/', AssessmentCreateView.as_view(), name='create-assessment'),
 
     # path('assessment/', ResponseDataViewSet.as_view({'get': 'list'}), name='assessment'),
     path('assessment/', AssessmentDataViewSet.as_view({'get': 'list'}), name='assessment'),
 
     path('analyze-autism/', ReportCreateView.as_view(), name='analyze-autism'),
+    path('analyze-autism/stream/', ReportStreamView.as_view(), name='analyze-autism-stream'),
+    path('analyze-autism/metrics/', AnalysisMetricsView.as_view(), name='analyze-autism-metrics'),
+    path('analyze-autism/bulk/', ReportBatchCreateView.as_view(), name='analyze-autism-bulk'),
+    path('analyze-autism/<uuid:job_id>/', AnalysisJobStatusView.as_view(), name='analysis-job-status'),
 ] 
\ No newline at end of file
@@ -1,9 +1,10 @@
 from rest_framework import status, views, viewsets
-from rest_framework.decorators import action, api_view, parser_classes
+from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from .models import AssessmentScenario, Question, RecordingStep, ResponseData, Assessment, PatientFile
+from .models import AssessmentScenario, Question, RecordingStep, ResponseData, Assessment, PatientFile, UploadSession, AnalysisJob
 from accounts.models import User
 from .serializers import (
     AssessmentSerializer,
@@ -11,25 +12,62 @@ from .serializers import (
     QuestionSerializer,
     RecordingStepSerializer,
     ResponseDataSerializer,
-    PatientFileSerializer
 )
-import os
-import datetime
-from django.conf import settings
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-import cv2
-
-from django.http import JsonResponse
+from django.urls import reverse
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 import json
-from .services import analyze_autism_traits_with_gemini
+from .services.analysis_job_service import AnalysisQueueFull, analysis_job_payload, enqueue_analysis
+from .services.analysis_stream_service import analysis_event_stream
+from .services.circuit_breaker import prometheus_metrics, provider_metrics
+from .services.prompt_builder import prometheus_prompt_metrics, prompt_metrics
+from .services.summary_cache_service import summary_cache_stats
+from .services.media_service import patient_file_status_payload
+from .services.media_stream_service import build_media_response, get_stream_url_ttl, sign_stream_token, stream_token_allows, viewable_patient_files
+from .services.question_bank import SAMPLE_USER_ANSWERS
+from .services.report_batch_service import enqueue_report_batch
+from .services.scenario_bundle_service import BUNDLE_CACHE_CONTROL, get_scenario_bundle
+from .services.response_service import import_ndjson_answers, ingest_answers
+from .services.upload_service import (
+    CONTENT_RANGE_RE,
+    DEFAULT_UPLOAD_CHUNK_SIZE,
+    UploadTooLarge,
+    create_patient_file,
+    create_patient_files,
+    create_upload_session,
+    discard_patient_media,
+    finalize_upload_session,
+    get_max_batch_upload_size,
+    install_upload_guard,
+    save_patient_media,
+    upload_session_payload,
+    write_upload_chunk,
+)
 
 
 class AssessmentScenarioViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AssessmentScenario.objects.all()
     serializer_class = AssessmentScenarioSerializer
 
+    @action(detail=False, methods=['get'])
+    def bundle(self, request):
+        """
+        Every scenario with its questions and recording steps nested, in one response instead of
+        scenarios/, questions/<id>/ and recording-steps/<id>/ per scenario. Served from cache;
+        clients revalidate with If-None-Match and get a 304 while nothing has changed.
+        """
+        bundle = get_scenario_bundle()
+        response = get_conditional_response(request._request, etag=bundle['etag'])
+        if response is None:
+            response = Response({'status': 'success', 'scenarios': bundle['scenarios']})
+        response['ETag'] = bundle['etag']
+        response['Cache-Control'] = BUNDLE_CACHE_CONTROL
+        return response
+
 class AssessmentCreateView(views.APIView):
     def post(self, request):
         # Extract assessment creation input from request data
@@ -90,43 +128,58 @@ class RecordingStepViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class ResponseDataCreateView(views.APIView):
+    """
+    Saves a submission of answers in one transaction. Invalid answers are reported per item
+    (by their index in the list) and the valid ones are still saved.
+    """
+
     def post(self, request):
         answers = request.data.get('answers', [])
         if not isinstance(answers, list) or not answers:
             return Response({'status': 'error', 'message': 'Missing or invalid answers list.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        created_ids = []
-        for answer in answers:
-            question_id = answer.get('question_id')
-            assessment_id = answer.get('assessment_id')
-            response_text = answer.get('response_text', '')
-            print(assessment_id,question_id)
-            if not question_id or not assessment_id:
-                continue  # Skip invalid entries
-
-            question = get_object_or_404(Question, pk=question_id)
-            assessment = get_object_or_404(Assessment, pk=assessment_id)
-
-            print(question,assessment)
-            response = ResponseData.objects.create(
-                question_id=question,
-                assessment_id=assessment,
-                response_text=response_text,
+        responses, errors = ingest_answers(answers)
+        if not responses:
+            return Response({'status': 'error', 'message': 'No valid answers provided.', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'status': 'success', 'ids': [response.id for response in responses], 'errors': errors}, status=status.HTTP_201_CREATED)
+
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
+
+class ResponseDataImportView(views.APIView):
+    """
+    Bulk answer import for exported questionnaire data: POST an application/x-ndjson body with one
+    {"question_id", "assessment_id", "response_text"} object per line. The body is read line by line
+    and saved in batches, and the response streams NDJSON events back while it runs: error (per
+    rejected line), progress (after every batch) and done (totals).
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # The reply is always NDJSON, whatever the client accepts
+        return super().perform_content_negotiation(request, force=True)
+
+    def post(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in NDJSON_CONTENT_TYPES:
+            return Response(
+                {'status': 'error', 'message': 'Send the answers as application/x-ndjson, one JSON object per line.'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             )
-            created_ids.append(response.id)
+        events = import_ndjson_answers(request._request)
+        response = StreamingHttpResponse((json.dumps(event) + '\n' for event in events), content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'  # Let progress through nginx as it happens
+        return response
 
-        if not created_ids:
-            return Response({'status': 'error', 'message': 'No valid answers provided.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({'status': 'success', 'ids': created_ids}, status=status.HTTP_201_CREATED)
-    
 class ResponseDataViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ResponseDataSerializer
 
     def get_queryset(self):
         assessment_id = self.kwargs.get('assessment_id')
         question_id = self.request.query_params.get('question_id')
-        queryset = ResponseData.objects.all()
+        queryset = ResponseData.objects.order_by('created_at', 'id')  # Read off response_assessment_created, no sort
         if assessment_id:
             queryset = queryset.filter(assessment_id=assessment_id)
         if question_id:
@@ -141,7 +194,12 @@ class PatientFileUploadView(views.APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
-        assessment_id = request.data.get('assessment_id')
+        # The size guard has to be in place before request.data triggers multipart parsing
+        install_upload_guard(request)
+        try:
+            assessment_id = request.data.get('assessment_id')
+        except UploadTooLarge as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         step_id = request.data.get('step_id')
         file = request.FILES.get('file')
 
@@ -151,144 +209,308 @@ class PatientFileUploadView(views.APIView):
         assessment = get_object_or_404(Assessment, pk=assessment_id)
         step = get_object_or_404(RecordingStep, pk=step_id)
 
-        # Save file
-        upload_dir = 'patient_media'
-        file_name = default_storage.get_available_name(os.path.join(upload_dir, file.name))
-        full_path = default_storage.save(file_name, ContentFile(file.read()))
-
-        # Determine video duration
-        duration = datetime.timedelta(seconds=0)
-        if file.content_type.startswith('video/'):
-            try:
-                temp_file_path = os.path.join(settings.MEDIA_ROOT, file_name)
-                cap = cv2.VideoCapture(temp_file_path)
-                if cap.isOpened():
-                    fps = cap.get(cv2.CAP_PROP_FPS)
-                    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                    if fps > 0:
-                        seconds = int(frame_count / fps)
-                        duration = datetime.timedelta(seconds=seconds)
-                cap.release()
-            except Exception:
-                duration = datetime.timedelta(seconds=0)
-
-        pf = PatientFile.objects.create(
-            assessment_id=assessment,
-            step_id=step,
-            file_path=full_path,
-            file_type=file.content_type,
-            duration=duration,
-        )
+        # Save file (streamed in chunks, never fully held in memory)
+        stored_path, blob = save_patient_media(file)
+        try:
+            pf = create_patient_file(assessment, step, stored_path, file.content_type, blob=blob)
+        except Exception:
+            discard_patient_media([blob])
+            raise
 
-        return Response({'status': 'success', 'file_path': full_path, 'duration': str(duration)}, status=status.HTTP_201_CREATED)
+        return Response({'status': 'success', **patient_file_status_payload(pf)}, status=status.HTTP_201_CREATED)
 
-class ReportCreateView(views.APIView):
-    # If you need to disable CSRF, it's usually handled by DRF's authentication/permission classes
-    # or globally in settings.py for API use cases.
-    # For a public API endpoint, you might explicitly disable it via:
-    # authentication_classes = []
-    # permission_classes = []
-    # But generally, don't use @csrf_exempt on a DRF APIView method.
-
-    def post(self, request, *args, **kwargs): # Use 'post' method for POST requests
+
+class PatientFileBatchUploadView(views.APIView):
+    """
+    Uploads every step of a recording session in one multipart request.
+    Each file part is named step_<step_id>, alongside an assessment_id field.
+    """
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        install_upload_guard(request, max_request_size=get_max_batch_upload_size())
         try:
-            user_answers = request.data.get('user_answers', {})
             assessment_id = request.data.get('assessment_id')
+        except UploadTooLarge as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Every part is validated before anything is stored
+        files = {}
+        for field_name, parts in request.FILES.lists():
+            step_id = field_name[len('step_'):] if field_name.startswith('step_') else ''
+            if not step_id.isdigit():
+                return Response({'status': 'error', 'message': f'Unexpected file field "{field_name}", expected step_<step_id>.'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(parts) > 1 or int(step_id) in files:
+                return Response({'status': 'error', 'message': f'More than one file for recording step {int(step_id)}.'}, status=status.HTTP_400_BAD_REQUEST)
+            files[int(step_id)] = parts[0]
+
+        if not files or not assessment_id:
+            return Response({'status': 'error', 'message': 'Missing files or assessment_id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        assessment = get_object_or_404(Assessment, pk=assessment_id)
+        # One query for all steps; they must belong to the assessment's scenario
+        steps = RecordingStep.objects.filter(as_id=assessment.as_id_id).in_bulk(list(files))
+        missing = sorted(set(files) - set(steps))
+        if missing:
+            return Response({'status': 'error', 'message': f'Unknown recording steps for this assessment: {missing}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = []
+        try:
+            for step_id, file in files.items():
+                stored_path, blob = save_patient_media(file)
+                items.append((steps[step_id], stored_path, file.content_type, blob))
+            patient_files = create_patient_files(assessment, items)
+        except Exception:
+            # Nothing was recorded; give back the blobs stored so far so they don't linger unreferenced
+            discard_patient_media([blob for _, _, _, blob in items])
+            raise
+
+        return Response({'status': 'success', 'files': [patient_file_status_payload(pf) for pf in patient_files]}, status=status.HTTP_201_CREATED)
+
+
+class PatientFileStatusView(views.APIView):
+    """
+    Lets clients poll a file until the media worker has probed it.
+    media_status goes pending -> processing -> ready (or failed).
+    """
+
+    def get(self, request, pk):
+        patient_file = get_object_or_404(PatientFile, pk=pk)
+        return Response({'status': 'success', **patient_file_status_payload(patient_file)}, status=status.HTTP_200_OK)
+
+
+class PatientFileStreamURLView(views.APIView):
+    """
+    Hands out a short-lived signed link to PatientFileStreamView for <video>/<audio> src,
+    which can't carry the JWT. The link names a single file and expires after
+    PATIENT_FILE_STREAM_URL_TTL_SECONDS; fetch a new one when playback is restarted later.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        patient_file = get_object_or_404(viewable_patient_files(request.user), pk=pk)
+        url = reverse('patient-file-stream', kwargs={'pk': patient_file.pk}) + '?token=' + sign_stream_token(patient_file)
+        return Response(
+            {'status': 'success', 'url': request.build_absolute_uri(url), 'expires_in': get_stream_url_ttl()},
+            status=status.HTTP_200_OK,
+        )
 
-            # When using DRF's APIView, request.data already handles JSON parsing
-            # So, you don't need json.loads(request.body)
-            # data = request.data
-            
-            # Since you're hardcoding, we'll keep that for now for testing
-            # In production, uncomment request.data and remove the hardcoded part.
-            # user_answers = data.get('user_answers') # When getting from request.data
-
-            user_answers = {
-                # Factual/Concrete Questions
-                "What is the color of a fire truck?": "Red",
-                "How many legs does a spider have?": "Eight",
-                "What is the shape of a soccer ball?": "Sphere",
-                "What sound does a cat make?": "Meow",
-                "What do you use to write on paper?": "Pencil",
-                "What is frozen water called?": "Ice",
-                "What planet do humans live on?": "Earth",
-                "How many hours are in one day?": "24",
-                "What is the opposite of 'day'?": "Night",
-                "What comes after the number 5?": "6",
-
-                # Safety/Routine Questions
-                "What should you do before crossing the street?": "Look both ways",
-                "Where do you go when there's a fire?": "Exit",
-                "What do you wear when it's raining?": "Raincoat",
-                "How often should you brush your teeth?": "Twice daily",
-                "What do you do when lights turn red?": "Stop",
-
-                # Sensory/Objects Questions
-                "What texture is sandpaper?": "Rough",
-                "What is the taste of lemon?": "Sour",
-                "What instrument has black and white keys?": "Piano",
-                "What animal has black and white stripes?": "Zebra",
-                "Where do you find refrigerator?": "Kitchen",
-
-                # Nature/Science Questions
-                "What plant grows from acorn?": "Oak tree",
-                "What is the largest ocean?": "Pacific",
-                "What gas do humans breathe?": "Oxygen",
-                "What season comes after winter?": "Spring",
-                "What melts in sunshine?": "Snow",
-
-                # Time/Dates Questions
-                "How many days in one week?": "7",
-                "What month comes after April?": "May",
-                "What holiday is on December 25?": "Christmas",
-                "What meal comes after lunch?": "Dinner",
-                "When does sunrise happen?": "Morning",
-
-                # Food Questions
-                "What fruit is yellow and curved?": "Banana",
-                "What do you pour on cereal?": "Milk",
-                "Where does honey come from?": "Bees",
-                "What vegetable makes you cry?": "Onion",
-                "What is frozen dessert?": "Ice cream",
-
-                # Body/Health Questions
-                "How many fingers on one hand?": "5",
-                "Where is your elbow?": "Arm",
-                "What helps you see?": "Eyes",
-                "What exercise makes heart beat faster?": "Running",
-                "What do bandages protect?": "Cuts",
-
-                # Transportation Questions
-                "What vehicle flies in sky?": "Airplane",
-                "What has two wheels?": "Bicycle",
-                "Where do trains run?": "Tracks",
-                "What color is school bus?": "Yellow",
-                "What moves boats?": "Motor",
-
-                # Home Questions
-                "Where do you sleep?": "Bed",
-                "What keeps room bright?": "Light",
-                "What appliance cooks food?": "Stove",
-                "Where do clothes go?": "Closet",
-                "What cleans dishes?": "Dishwasher",
-
-                # Animals Questions
-                "What bird says 'hoot'?": "Owl",
-                "What sea animal has tentacles?": "Octopus",
-                "What farm animal gives milk?": "Cow",
-                "What insect makes web?": "Spider",
-                "What is fastest land animal?": "Cheetah"
-            }
-            
-            if user_answers:
-                analysis_result = analyze_autism_traits_with_gemini(user_answers)
-                updated = Assessment.objects.filter(id=assessment_id).update(result_summary=analysis_result)
-                if updated == 0:
-                    return Response({'error': f'Assessment with id {assessment_id} not found.'}, status=status.HTTP_404_NOT_FOUND)
-                # Use DRF's Response object for API responses
-                return Response({'analysis': analysis_result}, status=status.HTTP_200_OK)
+
+class PatientFileStreamView(views.APIView):
+    """
+    Byte-serving endpoint for recording playback: Range/206, conditional GET and optional
+    X-Accel-Redirect/X-Sendfile delivery. Patients can stream their own files, staff any file.
+    Media elements authenticate with the `?token=` from PatientFileStreamURLView; API clients
+    can send their JWT instead.
+    """
+    permission_classes = [AllowAny]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Media elements send Accept headers like video/*; the response is never rendered anyway
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        token = request.query_params.get('token')
+        if token is not None:
+            if not stream_token_allows(token, pk):
+                return Response({'status': 'error', 'message': 'Stream link is invalid or has expired.'}, status=status.HTTP_403_FORBIDDEN)
+            patient_file = get_object_or_404(PatientFile, pk=pk)
+        else:
+            if not request.user.is_authenticated:
+                self.permission_denied(request)
+            patient_file = get_object_or_404(viewable_patient_files(request.user), pk=pk)
+
+        response = build_media_response(request._request, patient_file)
+        if response is None:
+            return Response({'status': 'error', 'message': 'Media file is missing from storage.'}, status=status.HTTP_404_NOT_FOUND)
+        return response
+
+
+class UploadSessionCreateView(views.APIView):
+    """
+    Starts a resumable upload for a recording step.
+    Clients then PUT byte ranges to the session and call complete/ once every byte is in.
+    """
+
+    def post(self, request):
+        assessment_id = request.data.get('assessment_id')
+        step_id = request.data.get('step_id')
+        file_name = request.data.get('file_name')
+        content_type = request.data.get('content_type', '')
+        total_size = request.data.get('total_size')
+        sha256 = request.data.get('sha256')  # Optional; lets already-stored content skip the transfer
+
+        if not assessment_id or not step_id or not file_name or not total_size:
+            return Response({'status': 'error', 'message': 'Missing assessment_id, step_id, file_name, or total_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            total_size = int(total_size)
+        except (TypeError, ValueError):
+            return Response({'status': 'error', 'message': 'total_size must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        assessment = get_object_or_404(Assessment, pk=assessment_id)
+        step = get_object_or_404(RecordingStep, pk=step_id)
+
+        session, error = create_upload_session(assessment, step, file_name, content_type, total_size, sha256=sha256)
+        if error:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = upload_session_payload(session)
+        payload['chunk_size'] = DEFAULT_UPLOAD_CHUNK_SIZE
+        return Response({'status': 'success', **payload}, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailView(views.APIView):
+    """
+    GET reports the committed offset and received ranges so a client knows where to resume.
+    PUT writes one chunk; the body is raw bytes and the position comes from the Content-Range header
+    (`bytes <start>-<end>/<total>`). Chunks may be sent in parallel and in any order.
+    """
+
+    def get(self, request, upload_id):
+        session = get_object_or_404(UploadSession, pk=upload_id)
+        return Response({'status': 'success', **upload_session_payload(session)}, status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id):
+        session = get_object_or_404(UploadSession, pk=upload_id)
+
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response({'status': 'error', 'message': 'Missing or invalid Content-Range header.'}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = int(match.group(1)), int(match.group(2))
+        if match.group(3) != '*' and int(match.group(3)) != session.total_size:
+            return Response({'status': 'error', 'message': 'Content-Range total does not match the upload size.'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.stream is None:
+            return Response({'status': 'error', 'message': 'Chunk body is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The raw body is streamed straight into the part file; request.data is never touched
+        session, error = write_upload_chunk(session, start, end, request.stream)
+        if error and session is None:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_400_BAD_REQUEST)
+        if error:
+            return Response({'status': 'error', 'message': error, **upload_session_payload(session)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'success', **upload_session_payload(session)}, status=status.HTTP_200_OK)
+
+
+class UploadSessionCompleteView(views.APIView):
+    def post(self, request, upload_id):
+        session = get_object_or_404(UploadSession, pk=upload_id)
+        patient_file, error = finalize_upload_session(session)
+        if error:
+            session.refresh_from_db()
+            return Response({'status': 'error', 'message': error, **upload_session_payload(session)}, status=status.HTTP_409_CONFLICT)
+        return Response({'status': 'success', **patient_file_status_payload(patient_file)}, status=status.HTTP_201_CREATED)
+
+
+class ReportCreateView(views.APIView):
+    """
+    Queues an LLM analysis of the answers and returns 202 with a job id right away.
+    Poll analyze-autism/<job_id>/ for the result, which is also written to Assessment.result_summary.
+    """
+
+    def post(self, request, *args, **kwargs):
+        assessment_id = request.data.get('assessment_id')
+        # Hardcoded for testing; in production use request.data.get('user_answers')
+        user_answers = SAMPLE_USER_ANSWERS
+
+        if not user_answers:
             return Response({'error': 'No user answers provided'}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e: # Catch a broader exception for debugging
-            # For debugging, print the error
-            print(f"Error in ReportCreateView: {e}")
-            return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        assessment = Assessment.objects.filter(id=assessment_id).first() if str(assessment_id or '').isdigit() else None
+        if assessment is None:
+            return Response({'error': f'Assessment with id {assessment_id} not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # refresh=true skips the summary cache and asks the model again
+        bypass_cache = str(request.data.get('refresh', '')).lower() in ('1', 'true', 'yes')
+        job, error = enqueue_analysis(assessment, user_answers, bypass_cache=bypass_cache)
+        if error:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '30'})
+        return Response(
+            {'status': 'success', **analysis_job_payload(job)},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('analysis-job-status', args=[job.id])},
+        )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ReportStreamView(View):
+    """
+    Streaming variant of ReportCreateView: the summary arrives as Server-Sent Events while the
+    model generates it (token events, then done with the saved result, or error).
+    GET works with EventSource (?assessment_id=..&refresh=true); POST takes the same fields as JSON.
+    Needs the ASGI app (backendApi/asgi.py) to stream; under WSGI the events arrive all at once.
+    """
+
+    async def get(self, request):
+        return await self.stream(request, request.GET)
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON body.'}, status=status.HTTP_400_BAD_REQUEST)
+        return await self.stream(request, data)
+
+    async def stream(self, request, data):
+        assessment_id = data.get('assessment_id')
+        if not str(assessment_id or '').isdigit() or not await Assessment.objects.filter(id=assessment_id).aexists():
+            return JsonResponse({'status': 'error', 'message': f'Assessment with id {assessment_id} not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        bypass_cache = str(data.get('refresh', '')).lower() in ('1', 'true', 'yes')
+        # Hardcoded for testing, as in ReportCreateView
+        response = StreamingHttpResponse(
+            analysis_event_stream(int(assessment_id), SAMPLE_USER_ANSWERS, bypass_cache=bypass_cache),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Tell nginx not to buffer the stream
+        return response
+
+
+class AnalysisMetricsView(View):
+    """
+    Provider health for this process: circuit state and transitions, call/retry/failure counts
+    and latency histograms per backend, estimated prompt sizes, plus summary cache counters.
+    ?output=prometheus returns the provider metrics in Prometheus text format for scraping.
+    """
+
+    def get(self, request):
+        if request.GET.get('output') == 'prometheus':
+            return HttpResponse(prometheus_metrics() + prometheus_prompt_metrics(), content_type='text/plain; version=0.0.4')
+        return JsonResponse({
+            'status': 'success',
+            'providers': provider_metrics(),
+            'prompts': prompt_metrics(),
+            'summary_cache': summary_cache_stats(),
+        })
+
+
+class AnalysisJobStatusView(views.APIView):
+    def get(self, request, job_id):
+        job = get_object_or_404(AnalysisJob, pk=job_id)
+        return Response({'status': 'success', **analysis_job_payload(job)}, status=status.HTTP_200_OK)
+
+
+class ReportBatchCreateView(views.APIView):
+    """
+    Queues summaries for many assessments at once, built from their recorded answers.
+    Returns 202 with one job per assessment; each can be polled at analyze-autism/<job_id>/.
+    """
+
+    def post(self, request):
+        assessment_ids = request.data.get('assessment_ids')
+        if not isinstance(assessment_ids, list) or not all(str(i).isdigit() for i in assessment_ids):
+            return Response({'status': 'error', 'message': 'assessment_ids must be a list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        bypass_cache = str(request.data.get('refresh', '')).lower() in ('1', 'true', 'yes')
+        try:
+            jobs, error = enqueue_report_batch([int(i) for i in assessment_ids], bypass_cache=bypass_cache)
+        except AnalysisQueueFull as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '30'})
+        if error:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        queued = {job.assessment_id_id for job in jobs}
+        return Response({
+            'status': 'success',
+            'jobs': [{'assessment_id': job.assessment_id_id, 'job_id': str(job.id)} for job in jobs],
+            'not_found': [int(i) for i in assessment_ids if int(i) not in queued],
+        }, status=status.HTTP_202_ACCEPTED)
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve this app (e.g. ``uvicorn backendApi.asgi:application``) for the
+Server-Sent Events in ``assessment/analyze-autism/stream/`` to reach clients as
+they are generated.
 """
 
 import os